@@ -4,9 +4,13 @@ import sys
 import shutil
 import logging
 import time
+import threading
+import contextvars
 from collections import defaultdict
 from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file, make_response
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import tuple_, select, func, case, bindparam, column, String, values as sql_values
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from flask_migrate import Migrate
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -14,10 +18,10 @@ from datetime import datetime, timedelta
 import requests
 import certifi
 import urllib3
-from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
+from bs4 import BeautifulSoup, SoupStrainer
+import html
 import pandas as pd
 import json
 from decimal import Decimal, InvalidOperation
@@ -29,6 +33,18 @@ import re
 import xml.etree.ElementTree as ET
 from dotenv import load_dotenv
 from flask_wtf.csrf import CSRFProtect
+from fiyat_motoru import toplu_fiyat_cek
+from fiyat_cache import TekUcus, KaliciFiyatDeposu, FiyatCache, SinirliKume
+from saglayicilar import FiyatSaglayici, SaglayiciKaydi
+from http_katmani import (
+    SaglayiciAdapter, HizSinirlayici, KosulluGetirici, KayitOynatici,
+    havuz_boyutlarini_oku, havuz_istatistikleri
+)
+from zamanlayici import FiyatZamanlayici
+from saklama import FiyatGecmisiSaklama
+import veritabani
+from veritabani import sqlite_engine_secenekleri
+from tek_yazici import TekYazici
 
 
 # Set up logging
@@ -38,21 +54,18 @@ logging.getLogger("urllib3.connectionpool").setLevel(logging.WARNING)
 # .env dosyasını yükle
 load_dotenv()
 
+# Toplu fiyat güncellemesinin kullanıcıyı bekletebileceği toplam süre (sn). Retry
+# ayarları ve bütçeli çekimlerdeki HTTP zaman aşımı bu bütçeden türetilir: bir
+# istek, retry'ları ve aradaki beklemeyle birlikte bütçeyi aşmaz.
+TOPLU_GUNCELLEME_BUTCESI = float(os.environ.get("TOPLU_GUNCELLEME_BUTCESI", "8"))
+HTTP_RETRY_SAYISI = int(os.environ.get("HTTP_RETRY_SAYISI", "1"))
+HTTP_GERI_CEKILME = TOPLU_GUNCELLEME_BUTCESI / 16
+HTTP_ZAMAN_ASIMI = (TOPLU_GUNCELLEME_BUTCESI - HTTP_GERI_CEKILME * HTTP_RETRY_SAYISI) / (HTTP_RETRY_SAYISI + 1)
+# Kullanıcıyı bekletmeyen (arka plan) indirmeler bütçeye bağlı değildir
+HTTP_ARKA_PLAN_ZAMAN_ASIMI = float(os.environ.get("HTTP_ARKA_PLAN_ZAMAN_ASIMI", "15"))
+# Yalnızca süre bütçeli çekimler içinde ayarlanır (bkz. grup_fiyatlarini_cek)
+_butceli_zaman_asimi = contextvars.ContextVar('butceli_zaman_asimi', default=None)
 
-def http_session_olustur():
-    session = requests.Session()
-    retry = Retry(
-        total=3,
-        backoff_factor=1,
-        status_forcelist=[429, 500, 502, 503, 504]
-    )
-    adapter = HTTPAdapter(max_retries=retry)
-    session.mount('http://', adapter)
-    session.mount('https://', adapter)
-    return session
-
-
-http_session = http_session_olustur()
 
 def resource_path(relative_path):
     """PyInstaller paketindeki dosyaların yolunu bulur."""
@@ -64,6 +77,11 @@ def resource_path(relative_path):
 
 def get_writable_db_path():
     """Yazılabilir veritabanı yolunu döndürür ve gerekirse kopyalar."""
+    # Benchmark ve betikler gerçek veritabanına dokunmadan çalışabilsin
+    ozel_yol = os.environ.get("FINANS_DB_YOLU")
+    if ozel_yol:
+        return os.path.abspath(ozel_yol)
+
     if getattr(sys, 'frozen', False):
         # PyInstaller ile paketlenmiş durumda
         home_dir = os.path.expanduser("~")
@@ -97,6 +115,59 @@ def get_writable_db_path():
         db_path = os.path.join(instance_dir, "finans_takip.db")
         return os.path.abspath(db_path)
 
+
+# Host başına token kovası; tüm thread'ler ve fetcher'lar aynı sınırlayıcıyı paylaşır
+hiz_sinirlayici = HizSinirlayici()
+# Çevrimdışı profil/yük testi için: HTTP_KAYIT_MODU=kaydet yanıtları fixture olarak saklar,
+# HTTP_KAYIT_MODU=oynat canlı servislere çıkmadan onları sunar
+# (HTTP_OYNATMA_GECIKME_MS="50-300", HTTP_OYNATMA_HATA_ORANI=0.05 ile gecikme/hata enjekte edilir)
+# Fixture dizini veritabanının yanındadır (paketlenmiş sürümde kullanıcı veri klasörü)
+http_kayit_oynatici = KayitOynatici.ortamdan(os.path.join(os.path.dirname(get_writable_db_path()), "http_fixtures"))
+
+
+# Sağlayıcı host'larının havuzu, o sağlayıcının eşzamanlılığı artı arka plan
+# yenilemeleri için bu kadar ek bağlantı tutar
+HTTP_HAVUZ_EK = int(os.environ.get("HTTP_HAVUZ_EK", "2"))
+
+
+def http_adapteri_olustur(havuz_boyutu=10):
+    retry = Retry(
+        total=HTTP_RETRY_SAYISI,
+        backoff_factor=HTTP_GERI_CEKILME,
+        status_forcelist=[429, 500, 502, 503, 504]
+    )
+    return SaglayiciAdapter(
+        lambda host: saglayici_kaydi.devre_kesici(host),
+        hiz_sinirlayici,
+        kayit_oynatici=http_kayit_oynatici,
+        max_retries=retry,
+        pool_maxsize=havuz_boyutu
+    )
+
+
+def http_session_olustur():
+    session = requests.Session()
+    adapter = http_adapteri_olustur()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def http_havuzlarini_ayarla(session, kayit):
+    """Her sağlayıcı host'una eşzamanlılığına göre boyutlanmış ayrı bir bağlantı havuzu bağlar."""
+    boyutlar = havuz_boyutlarini_oku({
+        saglayici.host: saglayici.eszamanlilik + HTTP_HAVUZ_EK for saglayici in kayit
+    })
+    for host, boyut in boyutlar.items():
+        adapter = http_adapteri_olustur(boyut)
+        session.mount(f'https://{host}/', adapter)
+        session.mount(f'http://{host}/', adapter)
+
+
+http_session = http_session_olustur()
+# Koşullu GET (ETag/Last-Modified) ile doğrulanan sayfalar ve kalıcı TCMB dosyaları
+kosullu_getirici = KosulluGetirici(http_session)
+
 app = Flask(__name__)
 flask_env = os.environ.get("FLASK_ENV", "").lower()
 secret = os.environ.get("SESSION_SECRET")
@@ -113,17 +184,23 @@ app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 # Database configuration - use SQLite
 app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{get_writable_db_path()}'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# WAL, busy_timeout ve thread'ler arası bağlantı havuzu (bkz. veritabani.py)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = sqlite_engine_secenekleri()
 
 # CSRF koruması
 csrf = CSRFProtect(app)
 
 # Import and initialize database from models
-from models import db, User, Yatirim, FiyatGecmisi
+from models import db, User, Yatirim, FiyatGecmisi, VarlikFiyatGecmisi, VarlikGunlukFiyat
 from werkzeug.security import generate_password_hash
 
 db.init_app(app)
+veritabani.init_app(app, db)
 migrate = Migrate(app, db)
 
+# İsteğe bağlı tek yazıcı kuyruğu (TEK_YAZICI=1); kapalıyken yazmalar çağıran thread'de commit edilir
+yazici = TekYazici(app, db)
+
 # Flask-Login setup
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -186,56 +263,537 @@ def migrate_existing_data():
             
             db.session.commit()
             app.logger.info(f"{len(orphaned_investments)} yatırım kaydı admin kullanıcısına atandı.")
+
+        varlik_fiyat_gecmisini_tasi()
+        gunluk_fiyat_ozetini_doldur()
             
     except Exception as e:
         app.logger.error(f"Veri taşıma hatası: {e}")
 
+
+def varlik_fiyat_gecmisini_tasi():
+    """Kalem bazlı FiyatGecmisi kayıtlarını tek sorguda varlık bazlı tabloya taşır.
+
+    Yalnızca yeni tablo boşken çalışır; aynı (tip, kod, tarih) tekrarları atlanır.
+    """
+    if db.session.query(VarlikFiyatGecmisi.id).first() or not db.session.query(FiyatGecmisi.id).first():
+        return
+    sonuc = db.session.execute(db.text(
+        "INSERT OR IGNORE INTO varlik_fiyat_gecmisi (tip, kod, tarih, fiyat) "
+        "SELECT y.tip, UPPER(y.kod), fg.tarih, fg.fiyat "
+        "FROM fiyat_gecmisi fg JOIN yatirim y ON y.id = fg.yatirim_id "
+        "ORDER BY fg.tarih"
+    ))
+    db.session.commit()
+    app.logger.info(f"Fiyat geçmişi varlık bazına taşındı: {sonuc.rowcount} kayıt")
+
+
+def gunluk_fiyat_ozetini_doldur():
+    """Günlük fiyat özetini mevcut fiyat geçmişinden tek sorguda oluşturur (özet tablosu boşken)."""
+    if db.session.query(VarlikGunlukFiyat.id).first() or not db.session.query(VarlikFiyatGecmisi.id).first():
+        return
+    sonuc = db.session.execute(db.text(
+        "INSERT OR IGNORE INTO varlik_gunluk_fiyat "
+        "(tip, kod, gun, acilis, yuksek, dusuk, kapanis, ilk_guncelleme, son_guncelleme) "
+        "SELECT tip, kod, gun, acilis, MAX(fiyat), MIN(fiyat), kapanis, MIN(tarih), MAX(tarih) FROM ("
+        "  SELECT tip, kod, date(tarih) AS gun, tarih, fiyat,"
+        "    FIRST_VALUE(fiyat) OVER (PARTITION BY tip, kod, date(tarih) ORDER BY tarih) AS acilis,"
+        "    FIRST_VALUE(fiyat) OVER (PARTITION BY tip, kod, date(tarih) ORDER BY tarih DESC) AS kapanis"
+        "  FROM varlik_fiyat_gecmisi"
+        ") GROUP BY tip, kod, gun"
+    ))
+    db.session.commit()
+    app.logger.info(f"Günlük fiyat özeti oluşturuldu: {sonuc.rowcount} gün")
+
 # Uygulama başladığında veritabanını kontrol et
 try:
     init_database()
 except Exception as e:
     app.logger.error(f"Veritabanı initialization hatası: {e}")
 
-# Fiyat verisi için basit TTL cache
-_fiyat_cache = {}  # {cache_key: (veri, timestamp)}
+# Fiyat verisi için TTL'li, boyutu sınırlı LRU cache
 CACHE_TTL = 900  # 15 dakika
-_bist_ssl_fallback_warned_symbols = set()
-_cache_hit_logged_keys = set()
+# Stale-while-revalidate: TTL'i geçmiş kayıtlar bu süre boyunca bayat olarak sunulur
+FIYAT_CACHE_SWR = os.environ.get("FIYAT_CACHE_SWR", "1") == "1"
+CACHE_BAYAT_PENCERE = int(os.environ.get("CACHE_BAYAT_PENCERE", str(6 * 3600)))
+FIYAT_CACHE_MAX_KAYIT = int(os.environ.get("FIYAT_CACHE_MAX_KAYIT", "5000"))
+LOG_TEKILLESTIRME_MAX = 1000
+
+
+# Varlık tipi -> fiyat sağlayıcısı; sağlayıcılar fetcher'lardan sonra kaydedilir
+saglayici_kaydi = SaglayiciKaydi()
+
+
+def _tip_ttl(varlik_tipi):
+    """Tipin sağlayıcısı kendi cache politikasını belirtmişse onu, yoksa CACHE_TTL'i döndürür."""
+    saglayici = saglayici_kaydi.al(varlik_tipi)
+    if saglayici and saglayici.cache_ttl:
+        return saglayici.cache_ttl
+    return CACHE_TTL
+
+
+def _zaman_asimi(varlik_tipi, varsayilan=HTTP_ARKA_PLAN_ZAMAN_ASIMI):
+    """Sağlayıcının zaman aşımı; süre bütçeli bir toplu güncelleme içindeyse bütçeden türetilen kısa süre."""
+    saglayici = saglayici_kaydi.al(varlik_tipi)
+    zaman_asimi = saglayici.zaman_asimi if saglayici else varsayilan
+    butceli = _butceli_zaman_asimi.get()
+    return min(zaman_asimi, butceli) if butceli else zaman_asimi
+
+
+def _cache_saklama_suresi():
+    ttl = max([CACHE_TTL] + [s.cache_ttl for s in saglayici_kaydi if s.cache_ttl])
+    return ttl + CACHE_BAYAT_PENCERE if FIYAT_CACHE_SWR else ttl
+
+
+_fiyat_cache = FiyatCache(FIYAT_CACHE_MAX_KAYIT, _cache_saklama_suresi)
+_bist_ssl_fallback_warned_symbols = SinirliKume(LOG_TEKILLESTIRME_MAX)
+_cache_hit_logged_keys = SinirliKume(LOG_TEKILLESTIRME_MAX)
 ALTIN_VERBOSE_DEBUG = os.environ.get("ALTIN_VERBOSE_DEBUG", "0") == "1"
+KALICI_CACHE_MAX_YAS = 7 * 24 * 3600  # Diskte tutulacak en eski cache kaydı (sn)
+
+# finans_takip.db'nin yanında, yeniden başlatmalarda korunan fiyat cache'i
+_kalici_cache = None
+if os.environ.get("FIYAT_CACHE_KALICI", "1") == "1":
+    try:
+        _kalici_cache = KaliciFiyatDeposu(
+            os.path.join(os.path.dirname(get_writable_db_path()), "fiyat_cache.db")
+        )
+        _kalici_cache.temizle(KALICI_CACHE_MAX_YAS)
+    except Exception as e:
+        app.logger.error(f"Kalıcı fiyat cache başlatılamadı: {e}")
+        _kalici_cache = None
 
 
 def _log_cache_hit_once(kaynak, kod):
-    key = f"{kaynak}:{kod}"
-    if key not in _cache_hit_logged_keys:
+    if _cache_hit_logged_keys.ekle(f"{kaynak}:{kod}"):
         app.logger.debug(f"{kaynak} cache hit: {kod}")
-        _cache_hit_logged_keys.add(key)
 
 
 def _cache_key(varlik_tipi, kod):
     return f"{varlik_tipi}:{kod.upper()}"
 
 
-def cache_den_al(varlik_tipi, kod):
+def cache_kaydi_al(varlik_tipi, kod):
+    """Kaydı (veri, yas_sn) olarak döndürür; TTL'i geçmiş ama saklama süresindeki kayıtlar dahil."""
     key = _cache_key(varlik_tipi, kod)
-    kayit = _fiyat_cache.get(key)
-    if not kayit:
-        return None
+    kayit = _fiyat_cache.al(key, _tip_ttl(varlik_tipi))
+    if kayit is None and _kalici_cache:
+        disk_kaydi = _kalici_cache.oku(key)
+        if disk_kaydi and time.time() - disk_kaydi[1] < _cache_saklama_suresi():
+            veri, ts = disk_kaydi
+            _fiyat_cache.kaydet(key, veri, ts)
+            kayit = (veri, time.time() - ts)
+    return kayit
 
-    veri, ts = kayit
-    if time.time() - ts < CACHE_TTL:
-        return veri
 
-    _fiyat_cache.pop(key, None)
+def cache_den_al(varlik_tipi, kod):
+    kayit = cache_kaydi_al(varlik_tipi, kod)
+    if kayit and kayit[1] < _tip_ttl(varlik_tipi):
+        return kayit[0]
     return None
 
 
 def cache_kaydet(varlik_tipi, kod, veri):
     if not veri:
         return
-    _fiyat_cache[_cache_key(varlik_tipi, kod)] = (veri, time.time())
+    key = _cache_key(varlik_tipi, kod)
+    ts = time.time()
+    _fiyat_cache.kaydet(key, veri, ts)
+    if _kalici_cache:
+        _kalici_cache.yaz(key, veri, ts)
+
+
+def cache_isit():
+    """Kalıcı cache'ten yalnızca kayıtlı yatırımların ihtiyaç duyduğu anahtarları belleğe yükler."""
+    if not _kalici_cache:
+        return
+    with app.app_context():
+        try:
+            varliklar = db.session.query(Yatirim.tip, Yatirim.kod).distinct().all()
+        except Exception as e:
+            app.logger.error(f"Cache ısıtma sorgu hatası: {e}")
+            return
+    kayitlar = _kalici_cache.yukle(_cache_key(tip, kod) for tip, kod in varliklar)
+    _fiyat_cache.toplu_kaydet(kayitlar)
+    app.logger.info(f"Fiyat cache ısıtıldı: {len(kayitlar)}/{len(varliklar)} varlık diskten yüklendi")
+
+
+# Uygulama başladığında kayıtlı yatırımların fiyatlarını diskteki cache'ten yükle
+cache_isit()
+
+
+# Aynı anahtar için eşzamanlı cache miss'leri tek ağ isteğine indirger
+_tek_ucus = TekUcus()
+
+
+def tekil_cekim(varlik_tipi, kaynak):
+    """Fetcher'ı single-flight ile sarar: aynı kod için süren çekim varsa onun sonucu beklenir.
+
+    Cache isabetleri uçuşa hiç girmez; böylece single-flight sayaçları yalnızca
+    gerçek dış istekleri ve onlara eklenen bekleyenleri sayar. Fetcher'ın kendi
+    cache kontrolü, uçuş başlarken biten bir önceki çekimi yakalamak için kalır.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(kod):
+            cached_veri = cache_den_al(varlik_tipi, kod)
+            if cached_veri:
+                _log_cache_hit_once(kaynak, kod.upper())
+                return cached_veri
+            return _tek_ucus.calistir(_cache_key(varlik_tipi, kod), lambda: fn(kod))
+        return wrapper
+    return decorator
+
+
+# TEFAS toplu fiyat indeksi: tüm fonların son yayımlanan fiyatları, yayın günü ve
+# bir sonraki yoklama zamanı (monotonic)
+_tefas_toplu_indeks = {'indeks': {}, 'yayin_gunu': None, 'sonraki_yoklama': 0.0}
+_tefas_indeks_kilidi = threading.Lock()
+_tefas_indirme_kilidi = threading.Lock()  # Aynı anda tek toplu indirme
+_tefas_indeks_yenileniyor = False
+TEFAS_TOPLU_URL = "https://www.tefas.gov.tr/api/DB/BindHistoryInfo"
+TEFAS_TOPLU_FON_TIPLERI = ('YAT', 'EMK')  # Yatırım ve emeklilik fonları
+TEFAS_TOPLU_GERI_GUN = 7  # Hafta sonu/tatil için geriye bakılacak gün
+TEFAS_TOPLU_HATA_BEKLEME = 120  # Başarısız toplu indirmeden sonra tekrar denemeden önce (sn)
+# Günün fiyatları henüz yayımlanmadıysa (yayın günü < bugün) yeniden yoklama aralığı (sn)
+TEFAS_TOPLU_YOKLAMA = int(os.environ.get("TEFAS_TOPLU_YOKLAMA", "1800"))
+
+
+def tefas_toplu_fiyat_parse(kayitlar):
+    """BindHistoryInfo satırlarını her fonun en güncel fiyatını tutan {FONKODU: satır} indeksine çevirir."""
+    indeks = {}
+    for kayit in kayitlar:
+        kod = (kayit.get('FONKODU') or '').strip().upper()
+        fiyat = kayit.get('FIYAT')
+        if not kod or fiyat in (None, ''):
+            continue
+        try:
+            fiyat = Decimal(str(fiyat))
+            fiyat_tarihi = datetime.fromtimestamp(int(kayit.get('TARIH')) / 1000)
+        except (InvalidOperation, ValueError, TypeError):
+            continue
+        if fiyat <= 0:
+            continue
+
+        mevcut = indeks.get(kod)
+        if mevcut is None or fiyat_tarihi > mevcut['fiyat_tarihi']:
+            indeks[kod] = {
+                'isim': (kayit.get('FONUNVAN') or f"{kod} Fonu").strip(),
+                'guncel_fiyat': fiyat,
+                'fiyat_tarihi': fiyat_tarihi
+            }
+    return indeks
+
+
+def _tefas_toplu_fiyat_indir():
+    """TEFAS tarihsel fiyat servisinden son günlerin tüm fon fiyatlarını tek istekte (fon tipi başına) çeker."""
+    bitis = datetime.now()
+    baslangic = bitis - timedelta(days=TEFAS_TOPLU_GERI_GUN)
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+        'Accept': 'application/json',
+        'X-Requested-With': 'XMLHttpRequest',
+        'Referer': 'https://www.tefas.gov.tr/TarihselVeriler.aspx'
+    }
+
+    indeks = {}
+    for fon_tipi in TEFAS_TOPLU_FON_TIPLERI:
+        form = {
+            'fontip': fon_tipi,
+            'sfontur': '',
+            'fonkod': '',
+            'fongrup': '',
+            'bastarih': baslangic.strftime('%d.%m.%Y'),
+            'bittarih': bitis.strftime('%d.%m.%Y'),
+            'fonturkod': '',
+            'fonunvantip': '',
+            'kurucukod': ''
+        }
+        try:
+            response = http_session.post(TEFAS_TOPLU_URL, data=form, headers=headers, timeout=HTTP_ARKA_PLAN_ZAMAN_ASIMI)
+            response.raise_for_status()
+            kayitlar = response.json().get('data') or []
+        except (requests.exceptions.RequestException, ValueError, AttributeError) as e:
+            app.logger.warning(f"TEFAŞ toplu fiyat indirme hatası ({fon_tipi}): {str(e)}")
+            continue
+
+        for kod, satir in tefas_toplu_fiyat_parse(kayitlar).items():
+            if kod not in indeks or satir['fiyat_tarihi'] > indeks[kod]['fiyat_tarihi']:
+                indeks[kod] = satir
+
+    app.logger.info(f"TEFAŞ toplu fiyat indeksi alındı: {len(indeks)} fon")
+    return indeks
+
+
+def _tefas_indeksi_bayat_mi():
+    """Bugünün fiyatları indekste varsa gün değişene kadar yeniden indirilmez; yoksa yoklama aralığı beklenir."""
+    if _tefas_toplu_indeks['yayin_gunu'] == datetime.now().date():
+        return False
+    return time.monotonic() >= _tefas_toplu_indeks['sonraki_yoklama']
+
+
+def _tefas_indeksi_indir_ve_kaydet():
+    with _tefas_indirme_kilidi:
+        with _tefas_indeks_kilidi:
+            if not _tefas_indeksi_bayat_mi():
+                return _tefas_toplu_indeks['indeks']  # Beklerken başka bir thread yeniledi
+        indeks = _tefas_toplu_fiyat_indir()
+        with _tefas_indeks_kilidi:
+            if indeks:
+                _tefas_toplu_indeks['indeks'] = indeks
+                _tefas_toplu_indeks['yayin_gunu'] = max(satir['fiyat_tarihi'] for satir in indeks.values()).date()
+                _tefas_toplu_indeks['sonraki_yoklama'] = time.monotonic() + TEFAS_TOPLU_YOKLAMA
+            else:
+                # İndirme başarısızsa önceki indeks korunur
+                _tefas_toplu_indeks['sonraki_yoklama'] = time.monotonic() + TEFAS_TOPLU_HATA_BEKLEME
+            return _tefas_toplu_indeks['indeks']
+
+
+def _tefas_indeksini_arka_planda_yenile():
+    global _tefas_indeks_yenileniyor
+    try:
+        _tefas_indeksi_indir_ve_kaydet()
+    except Exception as e:
+        app.logger.error(f"TEFAŞ toplu fiyat indeksi yenilenemedi: {e}", exc_info=True)
+    finally:
+        with _tefas_indeks_kilidi:
+            _tefas_indeks_yenileniyor = False
+
+
+def tefas_toplu_fiyat_indeksi():
+    """TEFAS toplu fiyat indeksini döndürür.
+
+    Yenileme yayın gününe bağlıdır: bugünün fiyatları alındıysa gün değişene kadar
+    indirilmez, alınmadıysa TEFAS_TOPLU_YOKLAMA aralığıyla yoklanır. Bayat indeks
+    arka planda yenilenirken sunulmaya devam eder; yalnızca hiç indeks yokken
+    çağıran indirmeyi bekler.
+    """
+    global _tefas_indeks_yenileniyor
+    with _tefas_indeks_kilidi:
+        indeks = _tefas_toplu_indeks['indeks']
+        if not _tefas_indeksi_bayat_mi():
+            return indeks
+        if indeks:
+            if not _tefas_indeks_yenileniyor:
+                _tefas_indeks_yenileniyor = True
+                _yenileme_executor.submit(_tefas_indeksini_arka_planda_yenile)
+            return indeks
+    return _tefas_indeksi_indir_ve_kaydet()
 
 
 # Veri çekme fonksiyonları
+# FonAnaliz sayfası için ayrıştırma modu: "hizli" (regex + sınırlı soup) veya "tam" (tüm ağaç)
+TEFAS_PARSE_MODU = os.environ.get("TEFAS_PARSE_MODU", "hizli")
+
+_TEFAS_FON_ADI_RE = re.compile(
+    r'<span[^>]*\bid="MainContent_FormViewMainIndicators_LabelFund"[^>]*>(.*?)</span>', re.S | re.I)
+_TEFAS_BASLIK_RE = re.compile(
+    r'<h2[^>]*\bclass="[^"]*\bmain-indicators-header\b[^"]*"[^>]*>(.*?)</h2>', re.S | re.I)
+_TEFAS_TITLE_RE = re.compile(r'<title[^>]*>(.*?)</title>', re.S | re.I)
+_TEFAS_FIYAT_RE = re.compile(
+    r'<span[^>]*\bid="MainContent_FormViewMainIndicators_LabelPrice"[^>]*>(.*?)</span>', re.S | re.I)
+_TEFAS_TOP_LIST_RE = re.compile(
+    r'<ul[^>]*\bclass="[^"]*\btop-list\b[^"]*"[^>]*>\s*<li[^>]*>(?:(?!</li>).)*?<span[^>]*>(.*?)</span>', re.S | re.I)
+_HTML_ETIKET_RE = re.compile(r'<[^>]+>')
+
+
+def _html_metni(parca):
+    return html.unescape(_HTML_ETIKET_RE.sub('', parca)).strip()
+
+
+def _tefas_regex_metni(sayfa, desen):
+    eslesme = desen.search(sayfa['metin'])
+    return _html_metni(eslesme.group(1)) if eslesme else None
+
+
+def _tefas_fiyat_ana_gostergeler(sayfa):
+    # Yalnızca main-indicators bölümünü ağaca çevir
+    soup = BeautifulSoup(sayfa['icerik'], 'html.parser', parse_only=SoupStrainer('div', class_='main-indicators'))
+    for item in soup.find_all('li'):
+        if 'Fiyat' in item.text or 'TL' in item.text:
+            span = item.find('span')
+            return span.text.strip() if span else None
+    return None
+
+
+def _tefas_fiyat_tum_spanlar(sayfa):
+    # Son çare: yalnızca span'lardan oluşan ağaçta fiyata çevrilebilen "TL" ya da sayısal metin ara
+    for span in BeautifulSoup(sayfa['icerik'], 'html.parser', parse_only=SoupStrainer('span')).find_all('span'):
+        text = span.text.strip()
+        if ('TL' in text) or (',' in text and text.replace(',', '').replace('.', '').isdigit()):
+            if _tefas_fiyat_cevir(text) is not None:
+                return text
+    return None
+
+
+# Fiyat seçici stratejileri, en belirgin olandan genele doğru. Yalnızca kesin
+# seçiciler arasında en son başarılı olan önce denenir; genel yedekler her zaman
+# sonda ve bu sırayla denenir, hiçbir zaman öne alınmaz.
+_TEFAS_FIYAT_STRATEJILERI = {
+    'etiket_id': lambda sayfa: _tefas_regex_metni(sayfa, _TEFAS_FIYAT_RE),
+    'top_list': lambda sayfa: _tefas_regex_metni(sayfa, _TEFAS_TOP_LIST_RE),
+    'ana_gostergeler': _tefas_fiyat_ana_gostergeler,
+    'tum_spanlar': _tefas_fiyat_tum_spanlar,
+}
+_TEFAS_KESIN_STRATEJILER = ('etiket_id', 'top_list')
+_tefas_son_fiyat_stratejisi = 'etiket_id'
+
+
+def _tefas_strateji_sirasi():
+    ilk = _tefas_son_fiyat_stratejisi
+    kesin = [ilk] + [ad for ad in _TEFAS_KESIN_STRATEJILER if ad != ilk]
+    return kesin + [ad for ad in _TEFAS_FIYAT_STRATEJILERI if ad not in _TEFAS_KESIN_STRATEJILER]
+
+
+def _tefas_fiyat_cevir(fiyat_text):
+    """Fiyat metnini Decimal'e çevirir (TL/₺ işaretleri temizlenir); çevrilemezse None."""
+    fiyat_text = fiyat_text.replace('TL', '').replace('₺', '').strip()
+    try:
+        # Önce binlik ayraçları kaldır, sonra virgülü noktaya çevir
+        return Decimal(fiyat_text.replace('.', '').replace(',', '.'))
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def _tefas_fiyat_decimal(fiyat_text, fon_kodu_upper):
+    fiyat = _tefas_fiyat_cevir(fiyat_text)
+    if fiyat is None:
+        app.logger.error(f"TEFAŞ fiyatı ({fon_kodu_upper}) Decimal'e çevrilemedi: '{fiyat_text}'")
+    return fiyat
+
+
+def tefas_fon_sayfasi_parse(html_icerik, fon_kodu_upper):
+    """FonAnaliz sayfasından (fon_adi, fiyat) çıkarır; fiyat bulunamazsa None döndürür.
+
+    Fon adı ve fiyat önce derlenmiş regex'lerle aranır; tam ağaç kurulmaz.
+    Bulunamazsa yalnızca ilgili bölgeyi ağaca çeviren SoupStrainer'lı
+    stratejilere düşülür. Bir stratejinin metni geçerli pozitif bir fiyata
+    çevrilemezse sıradakine geçilir. Kesin seçicilerden son başarılı olan
+    hatırlanıp ilk denenir; genel yedekler hatırlanmaz.
+    """
+    global _tefas_son_fiyat_stratejisi
+    if TEFAS_PARSE_MODU == 'tam':
+        return _tefas_fon_sayfasi_parse_tam(html_icerik, fon_kodu_upper)
+
+    metin = html_icerik.decode('utf-8', errors='replace') if isinstance(html_icerik, bytes) else html_icerik
+    sayfa = {'icerik': html_icerik, 'metin': metin}
+
+    fon_adi = _tefas_regex_metni(sayfa, _TEFAS_FON_ADI_RE) or _tefas_regex_metni(sayfa, _TEFAS_BASLIK_RE)
+    if not fon_adi:
+        fon_adi = _tefas_regex_metni(sayfa, _TEFAS_TITLE_RE) or f"{fon_kodu_upper} Fonu"
+        if "bulunamadı" in fon_adi.lower():
+            app.logger.warning(f"TEFAŞ sayfasında {fon_kodu_upper} için kayıt bulunamadı görünüyor (başlıktan tespit).")
+
+    ilk = _tefas_son_fiyat_stratejisi
+    for ad in _tefas_strateji_sirasi():
+        fiyat_text = _TEFAS_FIYAT_STRATEJILERI[ad](sayfa)
+        fiyat = _tefas_fiyat_cevir(fiyat_text) if fiyat_text else None
+        if fiyat is None or fiyat <= 0:
+            continue
+        if ad != ilk and ad in _TEFAS_KESIN_STRATEJILER:
+            app.logger.info(f"TEFAŞ fiyat seçicisi değişti: {ilk} -> {ad}")
+            _tefas_son_fiyat_stratejisi = ad
+        app.logger.debug(f"TEFAŞ'tan okunan ham değerler: Ad='{fon_adi}', Fiyat='{fiyat_text}' ({ad})")
+        return fon_adi, fiyat
+
+    app.logger.warning(f"TEFAŞ sayfasında {fon_kodu_upper} için fiyat bulunamadı.")
+    return None
+
+
+def _tefas_fon_sayfasi_parse_tam(html_icerik, fon_kodu_upper):
+    """Eski yol: tüm sayfayı ağaca çevirip seçicileri sırayla dener (TEFAS_PARSE_MODU=tam)."""
+    soup = BeautifulSoup(html_icerik, 'html.parser')
+
+    # FON ADI İÇİN OLASI SEÇİCİLER
+    fon_adi = None
+
+    # 1. İlk seçenek: Önceki seçici
+    fon_adi_element = soup.find('span', {'id': 'MainContent_FormViewMainIndicators_LabelFund'})
+
+    # 2. İkinci seçenek: Yeni header'dan
+    if not fon_adi_element:
+        fon_adi_element = soup.find('h2', class_='main-indicators-header')
+
+    # 3. Başlığı al (son çare)
+    if fon_adi_element:
+        fon_adi = fon_adi_element.text.strip()
+    else:
+        fon_adi = soup.title.string if soup.title else f"{fon_kodu_upper} Fonu"
+        # Eğer başlıkta "bulunamadı" benzeri bir ifade varsa, sayfa hata vermiş olabilir
+        if fon_adi and "bulunamadı" in fon_adi.lower():
+            app.logger.warning(f"TEFAŞ sayfasında {fon_kodu_upper} için kayıt bulunamadı görünüyor (başlıktan tespit).")
+            # Continue with default handling for now
+            pass
+
+    # FİYAT İÇİN OLASI SEÇİCİLER
+    # 1. Önceki seçici ile fiyat 
+    fiyat_element = soup.find('span', {'id': 'MainContent_FormViewMainIndicators_LabelPrice'})
+
+    # 2. Top-list ile fiyat bulma (önceki kodunuzdan)
+    if not fiyat_element:
+        price_list = soup.find('ul', class_='top-list')
+        if price_list:
+            first_item = price_list.find('li')
+            if first_item:
+                fiyat_element = first_item.find('span')
+
+    # 3. Ana göstergeler bölümünde fiyat arama
+    if not fiyat_element:
+        main_indicators = soup.find('div', class_='main-indicators')
+        if main_indicators:
+            items = main_indicators.find_all('li')
+            for item in items:
+                if 'Fiyat' in item.text or 'TL' in item.text:
+                    fiyat_element = item.find('span')
+                    break
+
+    # Eğer hala fiyat bulunamadıysa en son çare olarak genel sayfa içinde uygun metinleri ara
+    if not fiyat_element:
+        # Tüm span'ları kontrol et, "TL" içeren veya sayısal değer içeren span'ları bul
+        spans = soup.find_all('span')
+        for span in spans:
+            text = span.text.strip()
+            if ('TL' in text) or (',' in text and text.replace(',', '').replace('.', '').isdigit()):
+                fiyat_element = span
+                break
+
+    if not fiyat_element:
+        app.logger.warning(f"TEFAŞ sayfasında {fon_kodu_upper} için fiyat bulunamadı.")
+        return None
+
+    fiyat_text = fiyat_element.text.strip()
+    app.logger.debug(f"TEFAŞ'tan okunan ham değerler: Ad='{fon_adi}', Fiyat='{fiyat_text}'")
+    fiyat = _tefas_fiyat_decimal(fiyat_text, fon_kodu_upper)
+    return (fon_adi, fiyat) if fiyat is not None else None
+
+
+def _tefas_toplu_satir_verisi(fon_kodu_upper, toplu_satir):
+    veri = {
+        'isim': toplu_satir['isim'],
+        'guncel_fiyat': toplu_satir['guncel_fiyat'],
+        'tarih': datetime.now()
+    }
+    cache_kaydet('fon', fon_kodu_upper, veri)
+    return veri
+
+
+def tefas_yerel_fiyat(fon_kodu):
+    """Ağa çıkmadan fon fiyatı: önce cache, sonra bellekteki toplu indeks (indirme tetiklenmez)."""
+    fon_kodu_upper = fon_kodu.upper()
+    veri = cache_den_al('fon', fon_kodu_upper)
+    if veri:
+        return veri
+    with _tefas_indeks_kilidi:
+        toplu_satir = _tefas_toplu_indeks['indeks'].get(fon_kodu_upper)
+    return _tefas_toplu_satir_verisi(fon_kodu_upper, toplu_satir) if toplu_satir else None
+
+
+def _cache_bulucu(varlik_tipi):
+    """Sağlayıcının `yerel` çağrısı: yalnızca cache'e bakar."""
+    return lambda kod: cache_den_al(varlik_tipi, kod)
+
+
+@tekil_cekim('fon', 'TEFAS')
 def tefas_fon_verisi_cek(fon_kodu):
     """TEFAŞ'tan fon verisi çeker - Güncellenmiş Versiyon"""
     fon_kodu_upper = fon_kodu.upper()
@@ -244,6 +802,11 @@ def tefas_fon_verisi_cek(fon_kodu):
         _log_cache_hit_once("TEFAS", fon_kodu_upper)
         return cached_veri
 
+    # Önce günlük toplu indeks; yalnızca orada olmayan kodlar için sayfa taranır
+    toplu_satir = tefas_toplu_fiyat_indeksi().get(fon_kodu_upper)
+    if toplu_satir:
+        return _tefas_toplu_satir_verisi(fon_kodu_upper, toplu_satir)
+
     url = f"https://www.tefas.gov.tr/FonAnaliz.aspx?FonKod={fon_kodu_upper}"
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
@@ -252,83 +815,18 @@ def tefas_fon_verisi_cek(fon_kodu):
     app.logger.info(f"TEFAŞ Verisi Çekiliyor: {fon_kodu_upper} - URL: {url}")
     
     try:
-        response = http_session.get(url, headers=headers, timeout=15)
-        
-        if response.status_code != 200:
-            app.logger.warning(f"TEFAŞ sayfası ({fon_kodu_upper}) HTTP {response.status_code} hatası verdi.")
-            return None
-            
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # FON ADI İÇİN OLASI SEÇİCİLER
-        fon_adi = None
-        
-        # 1. İlk seçenek: Önceki seçici
-        fon_adi_element = soup.find('span', {'id': 'MainContent_FormViewMainIndicators_LabelFund'})
-        
-        # 2. İkinci seçenek: Yeni header'dan
-        if not fon_adi_element:
-            fon_adi_element = soup.find('h2', class_='main-indicators-header')
-            
-        # 3. Başlığı al (son çare)
-        if fon_adi_element:
-            fon_adi = fon_adi_element.text.strip()
-        else:
-            fon_adi = soup.title.string if soup.title else f"{fon_kodu_upper} Fonu"
-            # Eğer başlıkta "bulunamadı" benzeri bir ifade varsa, sayfa hata vermiş olabilir
-            if fon_adi and "bulunamadı" in fon_adi.lower():
-                app.logger.warning(f"TEFAŞ sayfasında {fon_kodu_upper} için kayıt bulunamadı görünüyor (başlıktan tespit).")
-                # Continue with default handling for now
-                pass
-        
-        # FİYAT İÇİN OLASI SEÇİCİLER
-        # 1. Önceki seçici ile fiyat 
-        fiyat_element = soup.find('span', {'id': 'MainContent_FormViewMainIndicators_LabelPrice'})
-        
-        # 2. Top-list ile fiyat bulma (önceki kodunuzdan)
-        if not fiyat_element:
-            price_list = soup.find('ul', class_='top-list')
-            if price_list:
-                first_item = price_list.find('li')
-                if first_item:
-                    fiyat_element = first_item.find('span')
-        
-        # 3. Ana göstergeler bölümünde fiyat arama
-        if not fiyat_element:
-            main_indicators = soup.find('div', class_='main-indicators')
-            if main_indicators:
-                items = main_indicators.find_all('li')
-                for item in items:
-                    if 'Fiyat' in item.text or 'TL' in item.text:
-                        fiyat_element = item.find('span')
-                        break
-        
-        # Eğer hala fiyat bulunamadıysa en son çare olarak genel sayfa içinde uygun metinleri ara
-        if not fiyat_element:
-            # Tüm span'ları kontrol et, "TL" içeren veya sayısal değer içeren span'ları bul
-            spans = soup.find_all('span')
-            for span in spans:
-                text = span.text.strip()
-                if ('TL' in text) or (',' in text and text.replace(',', '').replace('.', '').isdigit()):
-                    fiyat_element = span
-                    break
+        durum, sonuc = kosullu_getirici.getir(
+            url, lambda icerik: tefas_fon_sayfasi_parse(icerik, fon_kodu_upper),
+            headers=headers, timeout=_zaman_asimi('fon')
+        )
         
-        if not fiyat_element:
-            app.logger.warning(f"TEFAŞ sayfasında {fon_kodu_upper} için fiyat bulunamadı.")
+        if durum not in (200, 304):
+            app.logger.warning(f"TEFAŞ sayfası ({fon_kodu_upper}) HTTP {durum} hatası verdi.")
             return None
             
-        fiyat_text = fiyat_element.text.strip()
-        app.logger.debug(f"TEFAŞ'tan okunan ham değerler: Ad='{fon_adi}', Fiyat='{fiyat_text}'")
-        
-        # Fiyatı Decimal'e çevir (TL veya diğer birim işaretlerini temizle)
-        fiyat_text = fiyat_text.replace('TL', '').replace('₺', '').strip()
-        
-        try:
-            # Önce binlik ayraçları kaldır, sonra virgülü noktaya çevir
-            fiyat = Decimal(fiyat_text.replace('.', '').replace(',', '.'))
-        except (InvalidOperation, ValueError):
-            app.logger.error(f"TEFAŞ fiyatı ({fon_kodu_upper}) Decimal'e çevrilemedi: '{fiyat_text}'")
+        if sonuc is None:
             return None
+        fon_adi, fiyat = sonuc
             
         veri = {
             'isim': fon_adi,
@@ -371,7 +869,7 @@ def tefas_alternatif_arama(fon_kodu):
         }
         
         app.logger.info(f"TEFAŞ Alternatif API deneniyor: {fon_kodu_upper}")
-        response = http_session.get(api_url, headers=headers, timeout=15)
+        response = http_session.get(api_url, headers=headers, timeout=_zaman_asimi('fon'))
         
         if response.status_code == 200:
             data = response.json()
@@ -392,102 +890,180 @@ def tefas_alternatif_arama(fon_kodu):
         app.logger.error(f"TEFAŞ alternatif API hatası: {str(e)}")
         return None
 
-def bist_hisse_verisi_cek(hisse_kodu):
-    """İş Yatırım'dan hisse verisi çeker"""
-    hisse_kodu_upper = hisse_kodu.upper()
-    cached_veri = cache_den_al('hisse', hisse_kodu_upper)
-    if cached_veri:
-        _log_cache_hit_once("BIST", hisse_kodu_upper)
-        return cached_veri
+BIST_API_URL = "https://www.isyatirim.com.tr/tr-tr/_layouts/Isyatirim.Website/Common/Data.aspx/OneEndeks"
+BIST_TOPLU_ESZAMANLILIK = 4  # OneEndeks sembol başına tek istek kabul ediyor
+# Motor hisseleri bu boyutta partilere böler; İş Yatırım hız sınırında (4 istek/sn)
+# bir parti ~1 sn'de biter, süre bütçesi dolduğunda gelen partiler yazılır
+BIST_TOPLU_PARTI = int(os.environ.get("BIST_TOPLU_PARTI", "4"))
+
 
-    api_url = f"https://www.isyatirim.com.tr/tr-tr/_layouts/Isyatirim.Website/Common/Data.aspx/OneEndeks?endeks={hisse_kodu_upper}"
+def _bist_yanit_parse(hisse_kodu_upper, data):
+    """OneEndeks JSON yanıtından fiyat verisini çıkarır."""
+    if not isinstance(data, list) or len(data) == 0:
+        return None
+
+    hisse_bilgisi = data[0]
+    if "last" not in hisse_bilgisi or "symbol" not in hisse_bilgisi:
+        return None
 
+    try:
+        fiyat = Decimal(str(hisse_bilgisi["last"]).replace(',', '.'))
+    except (InvalidOperation, ValueError, KeyError) as e:
+        app.logger.error(f"BIST fiyat parse hatası ({hisse_kodu_upper}): {e}")
+        return None
+
+    return {
+        'isim': hisse_bilgisi["symbol"].strip(),
+        'guncel_fiyat': fiyat,
+        'tarih': datetime.now()
+    }
+
+
+def _bist_sembol_cek(hisse_kodu_upper, verify):
+    """Tek sembol için OneEndeks yanıtını parse edilmiş olarak döndürür."""
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
         'Referer': 'https://www.isyatirim.com.tr/'
     }
+    response = http_session.get(BIST_API_URL, params={'endeks': hisse_kodu_upper}, headers=headers, timeout=_zaman_asimi('hisse'), verify=verify)
+    response.raise_for_status()
+    data = response.json()
+    app.logger.debug(f"BIST API veri boyutu ({hisse_kodu_upper}): {len(data) if isinstance(data, list) else 0}")
+    return _bist_yanit_parse(hisse_kodu_upper, data)
+
+
+def bist_hisse_verisi_cek_toplu(hisse_kodlari):
+    """İş Yatırım'dan birden çok hisseyi tek seferde çeker; {kod: veri} döndürür.
+
+    Cache'te olmayan her sembol bir kez istenir. SSL doğrulama kararı (gerekirse
+    development fallback) ilk istekte verilir ve partinin kalanı için kullanılır.
+    """
+    kodlar = list(dict.fromkeys(kod.upper() for kod in hisse_kodlari))
+    sonuclar = {}
+    eksikler = []
+    for kod in kodlar:
+        cached_veri = cache_den_al('hisse', kod)
+        if cached_veri:
+            _log_cache_hit_once("BIST", kod)
+            sonuclar[kod] = cached_veri
+        else:
+            eksikler.append(kod)
 
+    if not eksikler:
+        return sonuclar
+
+    verify = certifi.where()
+    ilk_kod = eksikler[0]
     try:
-        response = http_session.get(api_url, headers=headers, timeout=15, verify=certifi.where())
-        response.raise_for_status()
+        sonuclar[ilk_kod] = _tek_ucus.calistir(_cache_key('hisse', ilk_kod), lambda: _bist_sembol_cek(ilk_kod, verify))
     except requests.exceptions.SSLError as ssl_err:
         if os.environ.get("FLASK_ENV", "").lower() == "production":
             app.logger.error(f"BIST SSL doğrulama hatası (production): {ssl_err}")
-            return None
+            return sonuclar
 
-        if hisse_kodu_upper not in _bist_ssl_fallback_warned_symbols:
+        if _bist_ssl_fallback_warned_symbols.ekle(ilk_kod):
             app.logger.warning(f"BIST SSL doğrulama hatası, development fallback kullanılacak: {ssl_err}")
-            _bist_ssl_fallback_warned_symbols.add(hisse_kodu_upper)
         urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        verify = False
         try:
-            response = http_session.get(api_url, headers=headers, timeout=15, verify=False)
-            response.raise_for_status()
+            sonuclar[ilk_kod] = _bist_sembol_cek(ilk_kod, verify)
         except Exception as e:
-            app.logger.error(f"BIST veri çekme hatası (SSL fallback sonrası): {str(e)}")
-            return None
+            app.logger.error(f"BIST veri çekme hatası (SSL fallback sonrası, {ilk_kod}): {str(e)}")
     except Exception as e:
-        app.logger.error(f"BIST veri çekme hatası: {str(e)}")
-        return None
+        app.logger.error(f"BIST veri çekme hatası ({ilk_kod}): {str(e)}")
 
-    try:
-        data = response.json()
-        app.logger.debug(f"BIST API veri boyutu: {len(data) if isinstance(data, list) else 0}")
+    def sembol_cek(kod):
+        try:
+            return kod, _tek_ucus.calistir(_cache_key('hisse', kod), lambda: _bist_sembol_cek(kod, verify))
+        except Exception as e:
+            app.logger.error(f"BIST veri çekme hatası ({kod}): {str(e)}")
+            return kod, None
 
-        if isinstance(data, list) and len(data) > 0:
-            hisse_bilgisi = data[0]
+    kalanlar = eksikler[1:]
+    if kalanlar:
+        with ThreadPoolExecutor(max_workers=min(BIST_TOPLU_ESZAMANLILIK, len(kalanlar))) as executor:
+            # Bütçeli zaman aşımı gibi context değişkenleri worker thread'lerine taşınır
+            isler = [executor.submit(contextvars.copy_context().run, sembol_cek, kod) for kod in kalanlar]
+            for is_ in isler:
+                kod, veri = is_.result()
+                sonuclar[kod] = veri
 
-            if "last" in hisse_bilgisi and "symbol" in hisse_bilgisi:
-                isim = hisse_bilgisi["symbol"]
+    # Cache'i tek geçişte doldur
+    for kod in eksikler:
+        cache_kaydet('hisse', kod, sonuclar.get(kod))
 
-                try:
-                    fiyat = Decimal(str(hisse_bilgisi["last"]).replace(',', '.'))
-                except (InvalidOperation, ValueError, KeyError) as e:
-                    app.logger.error(f"BIST fiyat parse hatası ({hisse_kodu_upper}): {e}")
-                    return None
+    return {kod: veri for kod, veri in sonuclar.items() if veri}
+
+
+def bist_hisse_verisi_cek(hisse_kodu):
+    """İş Yatırım'dan hisse verisi çeker"""
+    return bist_hisse_verisi_cek_toplu([hisse_kodu]).get(hisse_kodu.upper())
+
+# XML içindeki 'Aciklama' etiketine göre eşleştirme (YANITTAN ALINAN GERÇEK DEĞERLER!)
+ALTIN_TIPI_MAP = {
+    'GA': 'Gram Altın',       # XML'deki Açıklama ile eşleşiyor
+    'C': 'Çeyrek Altın',      # XML'deki Açıklama ile eşleşiyor
+    'Y': 'Yarım Altın',       # XML'deki Açıklama ile eşleşiyor
+    'T': 'Teklik Altın',      # XML'deki Açıklama 'Teklik Altın' (Cumhuriyet değil)
+    # 'ONS': 'ONS',           # ONS için XML'de doğrudan eşleşme yok
+}
+ALTINKAYNAK_SERVIS_URL = 'http://data.altinkaynak.com/DataService.asmx'
+
+# Altinkaynak GetGold tablosu: (tablo, timestamp)
+_altin_fiyat_tablosu = None
+_altin_tablo_kilidi = threading.Lock()
 
-                veri = {
-                    'isim': isim.strip(),
-                    'guncel_fiyat': fiyat,
-                    'tarih': datetime.now()
-                }
-                cache_kaydet('hisse', hisse_kodu_upper, veri)
-                return veri
 
+def _altin_aciklama_normalize(aciklama):
+    return ' '.join(aciklama.split()).lower()
+
+
+def _altin_decimal(metin):
+    if not metin:
         return None
-    except Exception as e:
-        app.logger.error(f"BIST veri çekme hatası: {str(e)}")
+    try:
+        return Decimal(metin.replace(',', '.'))
+    except (InvalidOperation, TypeError):
         return None
 
-def altin_verisi_cek(altin_turu_kodu):
-    """Altinkaynak servisine manuel SOAP isteği göndererek altın fiyatlarını çeker."""
-    service_url = 'http://data.altinkaynak.com/DataService.asmx'
-    altin_turu_kodu_upper = altin_turu_kodu.upper()
-    cached_veri = cache_den_al('altin', altin_turu_kodu_upper)
-    if cached_veri:
-        _log_cache_hit_once("Altin", altin_turu_kodu_upper)
-        return cached_veri
 
-    app.logger.info(f"Altın Verisi Çekiliyor (Altinkaynak Manuel SOAP): {altin_turu_kodu_upper} - URL: {service_url}")
+def altin_fiyat_tablosu_parse(inner_xml_string):
+    """GetGoldResult içeriğindeki tüm <Kur> satırlarını normalize Aciklama anahtarlı sözlüğe çevirir."""
+    inner_root = ET.fromstring(inner_xml_string)
+    kur_elements = inner_root.findall('./Kur')  # Doğrudan root altındaki Kur'ları ara
+    if ALTIN_VERBOSE_DEBUG:
+        app.logger.debug(f"Toplam {len(kur_elements)} adet <Kur> elementi bulundu.")
 
-    alt_username = os.environ.get('ALTINKAYNAK_USERNAME')
-    alt_password = os.environ.get('ALTINKAYNAK_PASSWORD')
+    tablo = {}
+    for i, kur_element in enumerate(kur_elements):
+        aciklama_raw = kur_element.findtext('Aciklama')
+        satis_str = kur_element.findtext('Satis')
+        log_prefix = f"[Kur {i+1}/{len(kur_elements)}]"
 
-    if not alt_username or not alt_password:
-        app.logger.error('ALTINKAYNAK_USERNAME veya ALTINKAYNAK_PASSWORD tanımlanmamış.')
-        return None
+        if not aciklama_raw or not satis_str:
+            app.logger.warning(f"{log_prefix} Aciklama veya Satis etiketi bulunamadı veya boş.")
+            continue
 
-    # XML içindeki 'Aciklama' etiketine göre eşleştirme (YANITTAN ALINAN GERÇEK DEĞERLER!)
-    altin_tipi_map = {
-        'GA': 'Gram Altın',       # XML'deki Açıklama ile eşleşiyor
-        'C': 'Çeyrek Altın',      # XML'deki Açıklama ile eşleşiyor
-        'Y': 'Yarım Altın',       # XML'deki Açıklama ile eşleşiyor
-        'T': 'Teklik Altın',      # XML'deki Açıklama 'Teklik Altın' (Cumhuriyet değil)
-        # 'ONS': 'ONS',           # ONS için XML'de doğrudan eşleşme yok
-    }
+        aciklama_clean = aciklama_raw.strip()
+        fiyat = _altin_decimal(satis_str)
+        if fiyat is None:
+            app.logger.error(f"{log_prefix} Altinkaynak Inner XML fiyatı ('{aciklama_clean}') çevirme hatası: '{satis_str}'")
+            continue
+
+        if ALTIN_VERBOSE_DEBUG:
+            app.logger.debug(f"{log_prefix} Aciklama: '{aciklama_clean}', Satis: '{satis_str}'")
+
+        tablo[_altin_aciklama_normalize(aciklama_clean)] = {
+            'isim': aciklama_clean,
+            'alis_fiyat': _altin_decimal(kur_element.findtext('Alis')),
+            'satis_fiyat': fiyat,
+        }
+    return tablo
 
-    if altin_turu_kodu_upper not in altin_tipi_map:
-        app.logger.error(f"Desteklenmeyen altın türü: {altin_turu_kodu_upper}")
-        return None
+
+def _altin_fiyat_tablosu_indir(alt_username, alt_password):
+    """Altinkaynak servisine tek bir manuel SOAP GetGold isteği gönderip tüm altın satırlarını döndürür."""
+    app.logger.info(f"Altın Fiyat Tablosu Çekiliyor (Altinkaynak Manuel SOAP) - URL: {ALTINKAYNAK_SERVIS_URL}")
 
     # SOAP 1.1 İstek XML'ini oluşturma (f-string ile)
     soap_xml = f"""<?xml version="1.0" encoding="utf-8"?>
@@ -511,236 +1087,295 @@ def altin_verisi_cek(altin_turu_kodu):
     }
 
     try:
-        # POST isteğini gönderme
-        response = http_session.post(service_url, headers=headers, data=soap_xml.encode('utf-8'), timeout=20)
+        response = http_session.post(ALTINKAYNAK_SERVIS_URL, headers=headers, data=soap_xml.encode('utf-8'), timeout=_zaman_asimi('altin'))
         response.raise_for_status() # HTTP 4xx/5xx hatalarını kontrol et
-
-        # Yanıt XML'ini parse etme
-        try:
-            response_xml_root = ET.fromstring(response.content)
-            namespaces = {
-                'soap': 'http://schemas.xmlsoap.org/soap/envelope/',
-                'ak': 'http://data.altinkaynak.com/'
-            }
-            get_gold_result_element = response_xml_root.find('.//soap:Body/ak:GetGoldResponse/ak:GetGoldResult', namespaces)
-
-            if get_gold_result_element is None or get_gold_result_element.text is None:
-                 get_gold_result_element = response_xml_root.find('.//{http://data.altinkaynak.com/}GetGoldResult')
-                 if get_gold_result_element is None or get_gold_result_element.text is None:
-                    app.logger.warning("Altinkaynak yanıt XML'inde GetGoldResult etiketi veya içeriği bulunamadı.")
-                    app.logger.debug(f"Alınan yanıt içeriği (ilk 500kr): {response.text[:500]}")
-                    if "Nesne başvurusu" in response.text:
-                        app.logger.error("Altinkaynak servisi 'Nesne başvurusu' hatası döndürdü (yetkilendirme hatası olabilir)")
-                    return None
-
-            inner_xml_string = get_gold_result_element.text
-            # TAM YANITI LOGLA (DEBUG İÇİN) - Eğer çok uzunsa sorun olabilir, gerekirse kısaltılabilir.
-            if ALTIN_VERBOSE_DEBUG:
-                app.logger.debug(f"Altinkaynak GetGoldResult İçerik Stringi (ilk 1000kr): {inner_xml_string[:1000]}...")
-
-            # --- Bu string'i de XML olarak parse et ---
-            try:
-                inner_root = ET.fromstring(inner_xml_string)
-                if ALTIN_VERBOSE_DEBUG:
-                    app.logger.debug(f"Inner XML root tag adı: '{inner_root.tag}'")
-                altin_bulundu = False
-
-                # Inner XML içindeki altın kayıtlarını bul (Yapı: <Kur>...</Kur>)
-                kur_elements = inner_root.findall('./Kur') # Doğrudan root altındaki Kur'ları ara
-                if ALTIN_VERBOSE_DEBUG:
-                    app.logger.debug(f"Toplam {len(kur_elements)} adet <Kur> elementi bulundu.")
-
-                for i, kur_element in enumerate(kur_elements):
-                    aciklama_raw = kur_element.findtext('Aciklama')
-                    satis_str = kur_element.findtext('Satis')
-                    log_prefix = f"[Kur {i+1}/{len(kur_elements)}]"
-
-                    if aciklama_raw and satis_str:
-                        aciklama_clean = aciklama_raw.strip()
-                        target_aciklama = altin_tipi_map[altin_turu_kodu_upper]
-                        aranan_lower = target_aciklama.lower()
-                        bulunan_lower = aciklama_clean.lower()
-                        eslesme_sonucu = (aranan_lower == bulunan_lower)
-
-                        if ALTIN_VERBOSE_DEBUG:
-                            app.logger.debug(f"{log_prefix} Aciklama Raw: '{aciklama_raw}', Clean: '{aciklama_clean}', Satis: '{satis_str}'")
-                            app.logger.debug(f"{log_prefix} KARŞILAŞTIRMA: Aranan (lower): '{aranan_lower}', Bulunan (lower): '{bulunan_lower}', SONUÇ (==): {eslesme_sonucu}")
-
-                        if eslesme_sonucu: # Tam eşleşme kontrolü
-                            try:
-                                fiyat = Decimal(satis_str.replace(',', '.'))
-                            except (InvalidOperation, TypeError) as e_decimal:
-                                app.logger.error(f"{log_prefix} Altinkaynak Inner XML fiyatı ('{aciklama_clean}') çevirme hatası: '{satis_str}', Hata: {e_decimal}")
-                                continue # Sonraki kayda geç
-
-                            # Also get buying price if available
-                            alis_str = kur_element.findtext('Alis')
-                            alis_fiyat = None
-                            if alis_str:
-                                try:
-                                    alis_fiyat = Decimal(alis_str.replace(',', '.'))
-                                except (InvalidOperation, TypeError):
-                                    pass
-
-                            veri = {
-                                'isim': aciklama_clean,
-                                'guncel_fiyat': fiyat,  # Selling price
-                                'alis_fiyat': alis_fiyat,  # Buying price
-                                'satis_fiyat': fiyat,   # Selling price (explicit)
-                                'tarih': datetime.now()
-                            }
-                            cache_kaydet('altin', altin_turu_kodu_upper, veri)
-                            app.logger.info(f"Altinkaynak Altın Verisi (Manuel SOAP) Başarıyla Çekildi: {altin_turu_kodu_upper} ({aciklama_clean}) - Fiyat: {fiyat}")
-                            altin_bulundu = True
-                            return veri # Eşleşme bulundu, döngüden ve fonksiyondan çık
-                    else:
-                         app.logger.warning(f"{log_prefix} Aciklama veya Satis etiketi bulunamadı veya boş.")
-
-                # Eğer döngü bittiyse ve altın bulunamadıysa
-                if not altin_bulundu:
-                    app.logger.warning(f"Döngü bitti. Altinkaynak Inner XML içinde aranan altın türü bulunamadı: '{target_aciklama}' (Kod: {altin_turu_kodu_upper})")
-                    return None
-                
-            except ET.ParseError as e:
-                app.logger.error(f"Altın veri XML'i parse edilemedi: {str(e)}")
-                app.logger.debug(f"Parse edilemeyen XML: {inner_xml_string[:200]}")
-                return None
-                
-        except ET.ParseError as e:
-            app.logger.error(f"SOAP yanıt XML'i parse edilemedi: {str(e)}")
-            app.logger.debug(f"Parse edilemeyen yanıt: {response.text[:200]}")
-            return None
-
     except requests.exceptions.Timeout:
-         app.logger.error(f"Altinkaynak Manuel SOAP isteği zaman aşımına uğradı ({altin_turu_kodu_upper}).")
-         return None
+        app.logger.error("Altinkaynak Manuel SOAP isteği zaman aşımına uğradı.")
+        return None
     except requests.exceptions.RequestException as e:
-        app.logger.error(f"Altinkaynak Manuel SOAP isteği hatası ({altin_turu_kodu_upper}): {str(e)}")
+        app.logger.error(f"Altinkaynak Manuel SOAP isteği hatası: {str(e)}")
         if hasattr(e, 'response') and e.response is not None:
-             app.logger.error(f"Altinkaynak Hata Yanıt Kodu: {e.response.status_code}, Yanıt: {e.response.text[:200]}")
-             if "Nesne başvurusu" in e.response.text:
-                  app.logger.error("Altinkaynak sunucusu hala 'Nesne Başvurusu' hatası veriyor (HTTP Hata Kodu üzerinden).")
+            app.logger.error(f"Altinkaynak Hata Yanıt Kodu: {e.response.status_code}, Yanıt: {e.response.text[:200]}")
+            if "Nesne başvurusu" in e.response.text:
+                app.logger.error("Altinkaynak sunucusu hala 'Nesne Başvurusu' hatası veriyor (HTTP Hata Kodu üzerinden).")
+        return None
+
+    try:
+        response_xml_root = ET.fromstring(response.content)
+    except ET.ParseError as e:
+        app.logger.error(f"SOAP yanıt XML'i parse edilemedi: {str(e)}")
+        app.logger.debug(f"Parse edilemeyen yanıt: {response.text[:200]}")
+        return None
+
+    namespaces = {
+        'soap': 'http://schemas.xmlsoap.org/soap/envelope/',
+        'ak': 'http://data.altinkaynak.com/'
+    }
+    get_gold_result_element = response_xml_root.find('.//soap:Body/ak:GetGoldResponse/ak:GetGoldResult', namespaces)
+    if get_gold_result_element is None or get_gold_result_element.text is None:
+        get_gold_result_element = response_xml_root.find('.//{http://data.altinkaynak.com/}GetGoldResult')
+    if get_gold_result_element is None or get_gold_result_element.text is None:
+        app.logger.warning("Altinkaynak yanıt XML'inde GetGoldResult etiketi veya içeriği bulunamadı.")
+        app.logger.debug(f"Alınan yanıt içeriği (ilk 500kr): {response.text[:500]}")
+        if "Nesne başvurusu" in response.text:
+            app.logger.error("Altinkaynak servisi 'Nesne başvurusu' hatası döndürdü (yetkilendirme hatası olabilir)")
         return None
+
+    inner_xml_string = get_gold_result_element.text
+    if ALTIN_VERBOSE_DEBUG:
+        app.logger.debug(f"Altinkaynak GetGoldResult İçerik Stringi (ilk 1000kr): {inner_xml_string[:1000]}...")
+
+    try:
+        tablo = altin_fiyat_tablosu_parse(inner_xml_string)
+    except ET.ParseError as e:
+        app.logger.error(f"Altın veri XML'i parse edilemedi: {str(e)}")
+        app.logger.debug(f"Parse edilemeyen XML: {inner_xml_string[:200]}")
+        return None
+
+    app.logger.info(f"Altinkaynak altın tablosu alındı ({len(tablo)} satır)")
+    return tablo
+
+
+def altin_fiyat_tablosu_al():
+    """Altinkaynak altın tablosunu döndürür; CACHE_TTL süresince tek GetGold çağrısı tüm türlere hizmet eder."""
+    global _altin_fiyat_tablosu
+    alt_username = os.environ.get('ALTINKAYNAK_USERNAME')
+    alt_password = os.environ.get('ALTINKAYNAK_PASSWORD')
+
+    if not alt_username or not alt_password:
+        app.logger.error('ALTINKAYNAK_USERNAME veya ALTINKAYNAK_PASSWORD tanımlanmamış.')
+        return None
+
+    with _altin_tablo_kilidi:
+        if _altin_fiyat_tablosu and time.time() - _altin_fiyat_tablosu[1] < CACHE_TTL:
+            return _altin_fiyat_tablosu[0]
+
+        tablo = _altin_fiyat_tablosu_indir(alt_username, alt_password)
+        if tablo:
+            _altin_fiyat_tablosu = (tablo, time.time())
+        return tablo
+
+
+@tekil_cekim('altin', 'Altin')
+def altin_verisi_cek(altin_turu_kodu):
+    """Altinkaynak GetGold tablosundan altın fiyatını döndürür."""
+    altin_turu_kodu_upper = altin_turu_kodu.upper()
+    cached_veri = cache_den_al('altin', altin_turu_kodu_upper)
+    if cached_veri:
+        _log_cache_hit_once("Altin", altin_turu_kodu_upper)
+        return cached_veri
+
+    if altin_turu_kodu_upper not in ALTIN_TIPI_MAP:
+        app.logger.error(f"Desteklenmeyen altın türü: {altin_turu_kodu_upper}")
+        return None
+
+    try:
+        tablo = altin_fiyat_tablosu_al()
+        if not tablo:
+            return None
+
+        target_aciklama = ALTIN_TIPI_MAP[altin_turu_kodu_upper]
+        satir = tablo.get(_altin_aciklama_normalize(target_aciklama))
+        if not satir:
+            app.logger.warning(f"Altinkaynak tablosunda aranan altın türü bulunamadı: '{target_aciklama}' (Kod: {altin_turu_kodu_upper})")
+            return None
+
+        veri = {
+            'isim': satir['isim'],
+            'guncel_fiyat': satir['satis_fiyat'],  # Selling price
+            'alis_fiyat': satir['alis_fiyat'],  # Buying price
+            'satis_fiyat': satir['satis_fiyat'],   # Selling price (explicit)
+            'tarih': datetime.now()
+        }
+        cache_kaydet('altin', altin_turu_kodu_upper, veri)
+        app.logger.info(f"Altinkaynak Altın Verisi Başarıyla Alındı: {altin_turu_kodu_upper} ({satir['isim']}) - Fiyat: {satir['satis_fiyat']}")
+        return veri
+
     except Exception as e:
-        app.logger.error(f"Altinkaynak Altın verisi çekme (Manuel SOAP Genel) hatası ({altin_turu_kodu_upper}): {str(e)}", exc_info=True)
+        app.logger.error(f"Altinkaynak Altın verisi çekme (Genel) hatası ({altin_turu_kodu_upper}): {str(e)}", exc_info=True)
+        return None
+
+# TCMB günlük kur tablosu: {gun: (tablo, tablo_tarihi, timestamp)}
+_tcmb_kur_tablosu = {}
+_tcmb_kur_kilidi = threading.Lock()
+TCMB_GUNCEL_URL = "https://www.tcmb.gov.tr/kurlar/today.xml"
+
+
+def _tcmb_metin(currency, etiket):
+    metin = currency.findtext(etiket)
+    return metin.strip() if metin and metin.strip() else None
+
+
+def _tcmb_decimal(metin):
+    if not metin:
+        return None
+    try:
+        return Decimal(metin.replace(',', '.'))
+    except (InvalidOperation, ValueError):
+        app.logger.warning(f"TCMB fiyat parse hatası: {metin}")
         return None
 
+
+def tcmb_kur_tablosu_parse(xml_icerik):
+    """TCMB kur XML'ini tek geçişte {kod: {'isim', 'alis_fiyat', 'satis_fiyat'}} sözlüğüne çevirir."""
+    root = ET.fromstring(xml_icerik)
+    tablo = {}
+    for currency in root.findall('Currency'):
+        kod = currency.get('Kod') or currency.get('CurrencyCode')
+        if not kod:
+            continue
+        tablo[kod.upper()] = {
+            'isim': _tcmb_metin(currency, 'CurrencyName') or f"{kod}/TRY",
+            'alis_fiyat': _tcmb_decimal(_tcmb_metin(currency, 'ForexBuying')),
+            'satis_fiyat': _tcmb_decimal(_tcmb_metin(currency, 'ForexSelling')),
+        }
+
+    tablo_tarihi = None
+    tarih_str = root.get('Tarih')
+    if tarih_str:
+        try:
+            tablo_tarihi = datetime.strptime(tarih_str, '%d.%m.%Y').date()
+        except ValueError:
+            pass
+    return tablo, tablo_tarihi
+
+
+def _tcmb_kur_tablosu_indir():
+    """Yayımlanmış en güncel kur dosyasını indirir; today.xml yoksa son iş günlerine bakar."""
+    adaylar = [(TCMB_GUNCEL_URL, None)]
+    for days_back in range(10):  # Try up to 10 days back
+        target_date = datetime.now() - timedelta(days=days_back)
+        if target_date.weekday() >= 5:  # Saturday = 5, Sunday = 6
+            continue
+        url = f"https://www.tcmb.gov.tr/kurlar/{target_date.strftime('%Y%m')}/{target_date.strftime('%d%m%Y')}.xml"
+        adaylar.append((url, target_date.date()))
+
+    bugun = datetime.now().date()
+    for url, url_tarihi in adaylar:
+        app.logger.debug(f"TCMB URL deneniyor: {url}")
+        try:
+            # Geçmiş günlerin dosyası yayımlandıktan sonra değişmez; bir kez indirilir
+            durum, sonuc = kosullu_getirici.getir(
+                url, tcmb_kur_tablosu_parse,
+                degismez=url_tarihi is not None and url_tarihi < bugun,
+                timeout=_zaman_asimi('doviz')
+            )
+        except requests.exceptions.RequestException as e:
+            app.logger.warning(f"TCMB URL isteği hatası: {url} - {str(e)}")
+            continue
+        except ET.ParseError as e:
+            app.logger.error(f"TCMB XML parse hatası ({url}): {str(e)}")
+            continue
+
+        if sonuc is None:
+            app.logger.warning(f"TCMB URL başarısız ({durum}): {url}")
+            continue
+
+        tablo, tablo_tarihi = sonuc
+        app.logger.info(f"TCMB kur tablosu alındı: {url} ({len(tablo)} döviz, HTTP {durum})")
+        return tablo, tablo_tarihi or url_tarihi
+
+    return None
+
+
+def tcmb_kur_tablosu_al():
+    """Günün TCMB kur tablosunu döndürür; dosya tüm dövizler için bir kez indirilip parse edilir.
+
+    Bugüne ait tablo gün boyunca geçerlidir. Önceki iş gününe ait tablo (hafta sonu,
+    tatil, 15:30 yayınından önce) CACHE_TTL dolunca yeniden denenir.
+    """
+    bugun = datetime.now().date()
+    with _tcmb_kur_kilidi:
+        kayit = _tcmb_kur_tablosu.get(bugun)
+        if kayit:
+            tablo, tablo_tarihi, ts = kayit
+            if tablo_tarihi == bugun or time.time() - ts < CACHE_TTL:
+                return tablo
+
+        sonuc = _tcmb_kur_tablosu_indir()
+        if sonuc is None:
+            app.logger.error("TCMB'den son 10 gün içinde kur tablosu alınamadı")
+            return kayit[0] if kayit else None
+
+        tablo, tablo_tarihi = sonuc
+        _tcmb_kur_tablosu.clear()
+        _tcmb_kur_tablosu[bugun] = (tablo, tablo_tarihi, time.time())
+        return tablo
+
+
+@tekil_cekim('doviz', 'Doviz')
 def doviz_verisi_cek(doviz_kodu):
-    """TCMB'den döviz verisi çeker"""
+    """TCMB'den döviz verisi çeker (günlük kur tablosu üzerinden)"""
     doviz_kodu_upper = doviz_kodu.upper()
     cached_veri = cache_den_al('doviz', doviz_kodu_upper)
     if cached_veri:
         _log_cache_hit_once("Doviz", doviz_kodu_upper)
         return cached_veri
 
-    app.logger.info(f"Döviz Verisi Çekiliyor: {doviz_kodu_upper}")
-    
     try:
-        # Try current date first, then try previous business days
-        for days_back in range(10):  # Try up to 10 days back
-            target_date = datetime.now() - timedelta(days=days_back)
-            
-            # Skip weekends for business days
-            if target_date.weekday() >= 5:  # Saturday = 5, Sunday = 6
-                continue
-            
-            # TCMB URL format: ddmmyyyy.xml
-            date_str = target_date.strftime('%d%m%Y')
-            month_year = target_date.strftime('%Y%m')
-            url = f"https://www.tcmb.gov.tr/kurlar/{month_year}/{date_str}.xml"
-            
-            app.logger.debug(f"TCMB URL deneniyor: {url}")
-            
-            try:
-                response = http_session.get(url, timeout=15)
-                if response.status_code == 200:
-                    app.logger.info(f"TCMB verisi başarıyla alındı: {url}")
-                    break
-                else:
-                    app.logger.warning(f"TCMB URL başarısız ({response.status_code}): {url}")
-                    continue
-            except requests.exceptions.RequestException as e:
-                app.logger.warning(f"TCMB URL isteği hatası: {url} - {str(e)}")
-                continue
-        else:
-            # If no successful response after all attempts
-            app.logger.error(f"TCMB'den {doviz_kodu_upper} için son 10 gün içinde veri alınamadı")
+        tablo = tcmb_kur_tablosu_al()
+        if tablo is None:
             return None
-        
-        # Parse XML response
-        try:
-            root = ET.fromstring(response.content)
-        except ET.ParseError as e:
-            app.logger.error(f"TCMB XML parse hatası: {str(e)}")
+
+        kur = tablo.get(doviz_kodu_upper)
+        if not kur:
+            app.logger.warning(f"TCMB XML'inde döviz kodu bulunamadı: {doviz_kodu_upper}")
+            app.logger.debug(f"TCMB'de mevcut döviz kodları: {sorted(tablo)}")
             return None
-        
-        # Find currency in XML
-        for currency in root.findall('Currency'):
-            currency_code = currency.get('Kod') or currency.get('CurrencyCode')
-            if currency_code == doviz_kodu_upper:
-                app.logger.info(f"TCMB'de {doviz_kodu_upper} kodu bulundu")
-                
-                # Get currency name
-                currency_name_elem = currency.find('Isim') or currency.find('CurrencyName')
-                currency_name = currency_name_elem.text if currency_name_elem is not None else f"{doviz_kodu_upper}/TRY"
-                
-                # Get prices - try different element names
-                buying_elem = currency.find('BanknoteBuying') or currency.find('ForexBuying')
-                selling_elem = currency.find('BanknoteSelling') or currency.find('ForexSelling')
-                
-                alis_fiyat = None
-                satis_fiyat = None
-                
-                # Parse buying price
-                if buying_elem is not None and buying_elem.text:
-                    try:
-                        alis_fiyat = Decimal(buying_elem.text.replace(',', '.'))
-                        app.logger.debug(f"Alış fiyatı bulundu: {buying_elem.text}")
-                    except (InvalidOperation, ValueError) as e:
-                        app.logger.warning(f"Alış fiyatı parse hatası: {buying_elem.text} - {str(e)}")
-                
-                # Parse selling price
-                if selling_elem is not None and selling_elem.text:
-                    try:
-                        satis_fiyat = Decimal(selling_elem.text.replace(',', '.'))
-                        app.logger.debug(f"Satış fiyatı bulundu: {selling_elem.text}")
-                    except (InvalidOperation, ValueError) as e:
-                        app.logger.warning(f"Satış fiyatı parse hatası: {selling_elem.text} - {str(e)}")
-                
-                # Use selling price as main price, fallback to buying price
-                guncel_fiyat = satis_fiyat if satis_fiyat else alis_fiyat
-                
-                if guncel_fiyat:
-                    veri = {
-                        'isim': currency_name,
-                        'guncel_fiyat': guncel_fiyat,
-                        'alis_fiyat': alis_fiyat,
-                        'satis_fiyat': satis_fiyat,
-                        'tarih': datetime.now()
-                    }
-                    cache_kaydet('doviz', doviz_kodu_upper, veri)
-                    app.logger.info(f"TCMB Döviz Verisi Başarıyla Çekildi: {doviz_kodu_upper} - Veri: {veri}")
-                    return veri
-                else:
-                    app.logger.error(f"TCMB'den {doviz_kodu_upper} için fiyat bilgisi parse edilemedi")
-                    return None
-        
-        app.logger.warning(f"TCMB XML'inde döviz kodu bulunamadı: {doviz_kodu_upper}")
-        
-        # Log available currencies for debugging
-        available_currencies = []
-        for currency in root.findall('Currency'):
-            kod = currency.get('Kod') or currency.get('CurrencyCode')
-            if kod:
-                available_currencies.append(kod)
-        
-        app.logger.debug(f"TCMB'de mevcut döviz kodları: {available_currencies}")
-        return None
-        
+
+        # Use selling price as main price, fallback to buying price
+        guncel_fiyat = kur['satis_fiyat'] or kur['alis_fiyat']
+        if not guncel_fiyat:
+            app.logger.error(f"TCMB'den {doviz_kodu_upper} için fiyat bilgisi parse edilemedi")
+            return None
+
+        veri = {
+            'isim': kur['isim'],
+            'guncel_fiyat': guncel_fiyat,
+            'alis_fiyat': kur['alis_fiyat'],
+            'satis_fiyat': kur['satis_fiyat'],
+            'tarih': datetime.now()
+        }
+        cache_kaydet('doviz', doviz_kodu_upper, veri)
+        app.logger.info(f"TCMB Döviz Verisi Başarıyla Çekildi: {doviz_kodu_upper} - Veri: {veri}")
+        return veri
+
     except Exception as e:
         app.logger.error(f"Döviz veri çekme genel hatası ({doviz_kodu_upper}): {str(e)}", exc_info=True)
         return None
 
+def altinkaynak_bilgileri_var():
+    return bool(os.environ.get('ALTINKAYNAK_USERNAME') and os.environ.get('ALTINKAYNAK_PASSWORD'))
+
+
+# Yeni bir varlık tipi için burada bir sağlayıcı kaydetmek yeterlidir; route'lar,
+# toplu çekim motoru ve zamanlayıcı tipleri bu kayıttan okur.
+saglayici_kaydi.kaydet(FiyatSaglayici(
+    'fon', host='www.tefas.gov.tr', fetch_one=tefas_fon_verisi_cek,
+    eszamanlilik=8, zaman_asimi=HTTP_ARKA_PLAN_ZAMAN_ASIMI, kaynak='TEFAS', yerel=tefas_yerel_fiyat
+))
+saglayici_kaydi.kaydet(FiyatSaglayici(
+    'hisse', host='www.isyatirim.com.tr', fetch_one=bist_hisse_verisi_cek,
+    fetch_many=bist_hisse_verisi_cek_toplu, eszamanlilik=BIST_TOPLU_ESZAMANLILIK, zaman_asimi=HTTP_ARKA_PLAN_ZAMAN_ASIMI,
+    kaynak='İş Yatırım', yerel=_cache_bulucu('hisse'), parti_boyutu=BIST_TOPLU_PARTI
+))
+saglayici_kaydi.kaydet(FiyatSaglayici(
+    'altin', host='data.altinkaynak.com', fetch_one=altin_verisi_cek,
+    eszamanlilik=1, zaman_asimi=HTTP_ARKA_PLAN_ZAMAN_ASIMI, etiket='altın',  # Tek GetGold yanıtı tüm altın türlerini içerir
+    hazir=altinkaynak_bilgileri_var,
+    hazir_degil_mesaji='ALTINKAYNAK_USERNAME/ALTINKAYNAK_PASSWORD eksik', kaynak='Altinkaynak',
+    yerel=_cache_bulucu('altin')
+))
+saglayici_kaydi.kaydet(FiyatSaglayici(
+    'doviz', host='www.tcmb.gov.tr', fetch_one=doviz_verisi_cek,
+    eszamanlilik=1, zaman_asimi=HTTP_ARKA_PLAN_ZAMAN_ASIMI, etiket='döviz', kaynak='TCMB',  # Günlük kur dosyası tüm dövizleri içerir
+    yerel=_cache_bulucu('doviz')
+))
+
+
+http_havuzlarini_ayarla(http_session, saglayici_kaydi)
+
+
 def fiyat_guncelle(yatirim_id):
     """Tek bir yatırımın fiyatını günceller"""
     yatirim = Yatirim.query.get(yatirim_id)
@@ -751,66 +1386,276 @@ def fiyat_guncelle(yatirim_id):
     if yatirim.user_id != current_user.id:
         return False, "Bu yatırıma erişim yetkiniz yok"
     
-    veri = None
-    
-    if yatirim.tip == 'fon':
-        veri = tefas_fon_verisi_cek(yatirim.kod)
-    elif yatirim.tip == 'hisse':
-        veri = bist_hisse_verisi_cek(yatirim.kod)
-    elif yatirim.tip == 'altin':
-        veri = altin_verisi_cek(yatirim.kod)
-    elif yatirim.tip == 'doviz':
-        veri = doviz_verisi_cek(yatirim.kod)
+    _, veri = fiyat_verisi_cek_by_tip_kod(yatirim.tip, yatirim.kod)
     
     if veri:
-        yatirim.guncel_fiyat = veri['guncel_fiyat']
-        yatirim.son_guncelleme = veri['tarih']
-        
-        # Altın ve Döviz için alış ve satış fiyatlarını da kaydet
-        if yatirim.tip in ['altin', 'doviz']:
-            if veri.get('alis_fiyat'):
-                yatirim.guncel_alis_fiyat = veri['alis_fiyat']
-            if veri.get('satis_fiyat'):
-                yatirim.guncel_satis_fiyat = veri['satis_fiyat']
-        
-        if not yatirim.isim and veri.get('isim'):
-            yatirim.isim = veri['isim']
-        
-        # Fiyat geçmişine kaydet
-        fiyat_gecmisi = FiyatGecmisi(
-            yatirim_id=yatirim.id,
-            tarih=veri['tarih'],
-            fiyat=veri['guncel_fiyat'],
-            user_id=current_user.id
-        )
-        db.session.add(fiyat_gecmisi)
-        
-        db.session.commit()
+        # Yatırımı ve fiyat geçmişini güncelle; dönen sayfa yeni fiyatı okuduğu için yazmayı bekle
+        fiyatlari_kaydet([yatirim.id], {(yatirim.tip, yatirim.kod.upper()): (True, veri)})
         return True, "Fiyat güncellendi"
     else:
+        saglayici = saglayici_kaydi.al(yatirim.tip)
+        if saglayici and not saglayici.kullanilabilir_mi():
+            return False, f"{saglayici.kaynak} şu anda erişilemiyor"
         return False, "Fiyat verisi alınamadı"
 
 
 def fiyat_verisi_cek_by_tip_kod(tip, kod):
     """DB yazmadan, tip+kod bazında sadece fiyat verisini çeker."""
-    try:
-        if tip == 'fon':
-            veri = tefas_fon_verisi_cek(kod)
-        elif tip == 'hisse':
-            veri = bist_hisse_verisi_cek(kod)
-        elif tip == 'altin':
-            veri = altin_verisi_cek(kod)
-        elif tip == 'doviz':
-            veri = doviz_verisi_cek(kod)
-        else:
-            return False, None
+    saglayici = saglayici_kaydi.al(tip)
+    if saglayici is None:
+        return False, None
 
+    try:
+        veri = saglayici.fetch_one(kod)
         return (veri is not None), veri
     except Exception as e:
         app.logger.error(f"fiyat_verisi_cek_by_tip_kod hatası ({tip}:{kod}): {e}", exc_info=True)
         return False, None
 
 
+# Bayat kayıtlar için arka plan yenileme kuyruğu
+_yenileme_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='fiyat-yenileme')
+_yenileme_bekleyenler = set()
+_yenileme_kilidi = threading.Lock()
+
+
+def _arka_planda_yenile(tip, kod):
+    """Aynı varlık için en fazla bir yenileme işini kuyruğa ekler."""
+    key = _cache_key(tip, kod)
+    with _yenileme_kilidi:
+        if key in _yenileme_bekleyenler:
+            return
+        _yenileme_bekleyenler.add(key)
+
+    def yenile():
+        try:
+            fiyat_verisi_cek_by_tip_kod(tip, kod)
+        finally:
+            with _yenileme_kilidi:
+                _yenileme_bekleyenler.discard(key)
+
+    _yenileme_executor.submit(yenile)
+
+
+def fiyat_verisi_al(tip, kod):
+    """Fiyatı stale-while-revalidate ile döndürür: (veri, yas_sn, bayat).
+
+    Taze kayıt varsa doğrudan döner. TTL'i geçmiş ama bayat penceresindeki kayıt
+    hemen `bayat=True` ile döner ve arka planda yenilenir. Hiç kayıt yoksa canlı
+    çekim beklenir.
+    """
+    kayit = cache_kaydi_al(tip, kod)
+    if kayit:
+        veri, yas = kayit
+        if yas < _tip_ttl(tip):
+            return veri, yas, False
+        _fiyat_cache.bayat_sunuldu(_cache_key(tip, kod))
+        _arka_planda_yenile(tip, kod)
+        return veri, yas, True
+
+    _, veri = fiyat_verisi_cek_by_tip_kod(tip, kod)
+    return veri, 0, False
+
+
+def fiyat_gruplari_olustur(yatirimlar):
+    """Yatırımları {(tip, kod): {'tip', 'kod', 'yatirimlar'}} olarak gruplar; her varlık bir kez çekilir."""
+    gruplar = {}
+    for yatirim in yatirimlar:
+        key = (yatirim.tip, yatirim.kod.upper())
+        if key not in gruplar:
+            gruplar[key] = {
+                'tip': yatirim.tip,
+                'kod': yatirim.kod.upper(),
+                'yatirimlar': []
+            }
+        gruplar[key]['yatirimlar'].append(yatirim)
+    return gruplar
+
+
+def grup_fiyatlarini_cek(gruplar, sure_limiti=None, zaman_asimi=None):
+    """Dış API çağrılarını sağlayıcıların sınırlarıyla ve tek süre limitiyle paralel yapar.
+
+    Süre limitinde sonuçlanmayan gruplar dönen sözlükte yer almaz. `zaman_asimi`
+    verilirse bu çekimdeki HTTP istekleri sağlayıcı süresinden kısa olanıyla sınırlanır.
+    """
+    jeton = _butceli_zaman_asimi.set(zaman_asimi)
+    try:
+        return toplu_fiyat_cek(list(gruplar), saglayici_kaydi, sure_limiti=sure_limiti)
+    finally:
+        _butceli_zaman_asimi.reset(jeton)
+
+
+def ertelenen_gruplari_tamamla(yatirim_idleri):
+    """Süre bütçesine sığmayan grupların fiyatlarını arka planda çekip kaydeder."""
+    def tamamla():
+        with app.app_context():
+            try:
+                yatirimlar = Yatirim.query.filter(Yatirim.id.in_(yatirim_idleri)).all()
+                gruplar = fiyat_gruplari_olustur(yatirimlar)
+                sayaclar = fiyatlari_kaydet(yatirim_idleri, grup_fiyatlarini_cek(gruplar))
+                basarili = sum(sayac['basarili'] for sayac in sayaclar.values())
+                app.logger.info(
+                    f"Ertelenen fiyat güncellemesi tamamlandı: {basarili}/{len(yatirimlar)} yatırım güncellendi"
+                )
+            except Exception as e:
+                db.session.rollback()
+                app.logger.error(f"Ertelenen fiyat güncellemesi hatası: {e}", exc_info=True)
+
+    threading.Thread(target=tamamla, name='fiyat-ertelenen', daemon=True).start()
+
+
+def grup_fiyatlarini_yaz(gruplar, cekim_sonuclari):
+    """Çekilen fiyatları yatırımlara ve fiyat geçmişine işler; commit çağırana aittir.
+
+    Yazmalar ORM unit of work yerine toplu Core ifadeleriyle yapılır: fiyat
+    geçmişi ve günlük özet için birer executemany, yatırımlar için (tip, kod,
+    user_id) başına bir UPDATE. Fiyat geçmişine kalem başına değil varlık başına
+    bir kayıt yazılır; aynı (tip, kod, tarih) zaten varsa atlanır.
+    `gruplar` içindeki yatırımların yalnızca `tip`, `kod` ve `user_id`
+    alanları kullanılır. Tip bazında {'basarili': n, 'hata': m} yatırım
+    sayılarını döndürür.
+    """
+    sayaclar = defaultdict(lambda: {'basarili': 0, 'hata': 0})
+    gecmis_satirlari = []
+    ozet_satirlari = []
+    yatirim_satirlari = []
+    for key, grup in gruplar.items():
+        basarili, veri = cekim_sonuclari.get(key, (False, None))
+        if not basarili or not veri:
+            sayaclar[grup['tip']]['hata'] += len(grup['yatirimlar'])
+            continue
+
+        fiyat, tarih = veri['guncel_fiyat'], veri['tarih']
+        gecmis_satirlari.append({'tip': grup['tip'], 'kod': grup['kod'], 'tarih': tarih, 'fiyat': fiyat})
+        ozet_satirlari.append({
+            'tip': grup['tip'], 'kod': grup['kod'], 'gun': tarih.date(), 'acilis': fiyat,
+            'yuksek': fiyat, 'dusuk': fiyat, 'kapanis': fiyat, 'ilk_guncelleme': tarih, 'son_guncelleme': tarih
+        })
+        for user_id in {yatirim.user_id for yatirim in grup['yatirimlar']}:
+            yatirim_satirlari.append({
+                'b_tip': grup['tip'], 'b_kod': grup['kod'], 'b_user_id': user_id,
+                'guncel_fiyat': fiyat, 'son_guncelleme': tarih, 'b_son_guncelleme': tarih,
+                'alis_fiyat': veri.get('alis_fiyat') or None,
+                'satis_fiyat': veri.get('satis_fiyat') or None,
+                'isim': veri.get('isim') or None,
+            })
+        sayaclar[grup['tip']]['basarili'] += len(grup['yatirimlar'])
+
+    if gecmis_satirlari:
+        db.session.execute(sqlite_insert(VarlikFiyatGecmisi).on_conflict_do_nothing(), gecmis_satirlari)
+        db.session.execute(gunluk_ozet_upsert(), ozet_satirlari)
+        db.session.execute(_yatirim_fiyat_guncelleme(), yatirim_satirlari)
+    return dict(sayaclar)
+
+
+def _yatirim_fiyat_guncelleme():
+    """Bir kullanıcının bir varlığa ait tüm kalemlerini güncelleyen UPDATE (executemany ile).
+
+    Ertelenmiş veya geç gelen eski tarihli bir fiyat, daha yeni fiyatın üzerine yazılmaz.
+    """
+    yatirim = Yatirim.__table__.c
+    return (
+        Yatirim.__table__.update()
+        .where(
+            yatirim.user_id == bindparam('b_user_id'),
+            yatirim.tip == bindparam('b_tip'),
+            func.upper(yatirim.kod) == bindparam('b_kod'),
+            yatirim.son_guncelleme.is_(None) | (yatirim.son_guncelleme <= bindparam('b_son_guncelleme'))
+        )
+        .values(
+            guncel_fiyat=bindparam('guncel_fiyat'),
+            son_guncelleme=bindparam('son_guncelleme'),
+            # Sağlayıcı alış/satış veya isim vermediyse mevcut değer korunur
+            guncel_alis_fiyat=func.coalesce(bindparam('alis_fiyat', type_=yatirim.guncel_alis_fiyat.type),
+                                            yatirim.guncel_alis_fiyat),
+            guncel_satis_fiyat=func.coalesce(bindparam('satis_fiyat', type_=yatirim.guncel_satis_fiyat.type),
+                                             yatirim.guncel_satis_fiyat),
+            isim=case(
+                ((yatirim.isim.is_(None)) | (yatirim.isim == ''), bindparam('isim', type_=yatirim.isim.type)),
+                else_=yatirim.isim
+            ),
+        )
+    )
+
+
+def gunluk_ozet_upsert():
+    """Fiyatları günlük özete işleyen upsert'i döndürür (executemany ile satır listesiyle çalıştırılır).
+
+    Günün ilk yazılan fiyatı satırı açar; sonrakiler en yüksek/en düşüğü
+    genişletir, daha eski tarihliyse açılışı, daha yeni tarihliyse kapanışı
+    günceller (geç gelen ertelenmiş yazımlar da doğru yere oturur). Aynı fiyatın
+    tekrar yazılması özeti değiştirmez.
+    """
+    ozet = VarlikGunlukFiyat.__table__.c
+    ekle = sqlite_insert(VarlikGunlukFiyat)
+    daha_eski = ekle.excluded.ilk_guncelleme < ozet.ilk_guncelleme
+    daha_yeni = ekle.excluded.son_guncelleme >= ozet.son_guncelleme
+    return ekle.on_conflict_do_update(
+        index_elements=['tip', 'kod', 'gun'],
+        set_={
+            'acilis': case((daha_eski, ekle.excluded.acilis), else_=ozet.acilis),
+            'ilk_guncelleme': case((daha_eski, ekle.excluded.ilk_guncelleme), else_=ozet.ilk_guncelleme),
+            'yuksek': func.max(ozet.yuksek, ekle.excluded.yuksek),
+            'dusuk': func.min(ozet.dusuk, ekle.excluded.dusuk),
+            'kapanis': case((daha_yeni, ekle.excluded.kapanis), else_=ozet.kapanis),
+            'son_guncelleme': case((daha_yeni, ekle.excluded.son_guncelleme), else_=ozet.son_guncelleme),
+        }
+    )
+
+
+def fiyatlari_kaydet(yatirim_idleri, cekim_sonuclari):
+    """Çekilen fiyatları yazıcı üzerinden kaydeder ve commit edilmesini bekler.
+
+    Kalemlerin tip/kod/sahip bilgisi yazıcının kendi bağlantısında id ile yeniden
+    okunur (ORM nesnesi yüklenmez); tip bazında sayaçları döndürür.
+    """
+    def yaz():
+        yatirimlar = db.session.execute(
+            select(Yatirim.id, Yatirim.tip, Yatirim.kod, Yatirim.user_id).where(Yatirim.id.in_(yatirim_idleri))
+        ).all()
+        return grup_fiyatlarini_yaz(fiyat_gruplari_olustur(yatirimlar), cekim_sonuclari)
+
+    return yazici.gonder(yaz)
+
+
+def zamanlanmis_fiyat_yenile(tipler):
+    """Zamanlayıcı görevi: tüm kullanıcıların verilen tiplerdeki varlıklarını yeniler."""
+    tipler = [tip for tip in tipler if tip in saglayici_kaydi and saglayici_kaydi.al(tip).hazir_mi()]
+    if not tipler:
+        return {}
+
+    with app.app_context():
+        yatirimlar = Yatirim.query.filter(Yatirim.tip.in_(tipler)).all()
+        gruplar = fiyat_gruplari_olustur(yatirimlar)
+        sayaclar = fiyatlari_kaydet([yatirim.id for yatirim in yatirimlar], grup_fiyatlarini_cek(gruplar))
+    return sayaclar
+
+
+zamanlayici = FiyatZamanlayici(app, gorev=zamanlanmis_fiyat_yenile)
+if os.environ.get("FIYAT_ZAMANLAYICI", "0") == "1":
+    zamanlayici.baslat()
+
+# Fiyat geçmişi saklama/sıkıştırma (bkz. saklama.py); günlük görev isteğe bağlı
+fiyat_saklama = FiyatGecmisiSaklama(app, db, yazici)
+if os.environ.get("FIYAT_SAKLAMA", "0") == "1":
+    fiyat_saklama.baslat()
+
+
+@app.template_filter('fiyat_yasi')
+def fiyat_yasi_filtresi(tarih):
+    """Fiyatın ne kadar eski olduğunu okunur metne çevirir."""
+    if not tarih:
+        return ''
+    saniye = (datetime.now() - tarih).total_seconds()
+    if saniye < 60:
+        return 'az önce'
+    if saniye < 3600:
+        return f'{int(saniye // 60)} dk önce'
+    if saniye < 86400:
+        return f'{int(saniye // 3600)} sa önce'
+    return f'{int(saniye // 86400)} gün önce'
+
+
 def hesapla_portfoy_ozeti(yatirimlar):
     """Verilen yatırım listesi için portföy özet istatistiklerini hesaplar."""
     toplam_yatirim = Decimal('0')
@@ -1027,6 +1872,40 @@ class YatirimPerformans:
         self.kalem_sayisi = len(kalemler)
 
 
+def onceki_fiyatlar_sorgusu(varliklar, tarih, tarih_kolonu=VarlikFiyatGecmisi.tarih,
+                            fiyat_kolonu=VarlikFiyatGecmisi.fiyat):
+    """Her (tip, kod) için `tarih`ten önceki son fiyatı tek sorguda getiren SELECT'i döndürür.
+
+    Varsayılan olarak ham fiyat geçmişini, günlük özet kolonları verilirse
+    (`VarlikGunlukFiyat.gun`, `.kapanis`) özet tablosunu sorgular.
+
+    Varlık listesi VALUES CTE'si olarak verilir ve her varlık için (tip, kod, tarih)
+    indeksinde geriye doğru tek bir arama yapılır (LIMIT 1 alt sorgusu). Pencere
+    fonksiyonu veya gruplu MAX(tarih) birleşimi ise tarihten önceki tüm geçmişi
+    taradığından çok daha yavaştır (bkz. benchmarks/onceki_fiyat_benchmark.py).
+    """
+    varlik_tablosu = sql_values(
+        column('tip', String), column('kod', String), name='varliklar'
+    ).data(sorted(varliklar)).cte()
+    tablo = fiyat_kolonu.table
+    son_fiyat = (
+        select(fiyat_kolonu)
+        .where(
+            tablo.c.tip == varlik_tablosu.c.tip,
+            tablo.c.kod == varlik_tablosu.c.kod,
+            tarih_kolonu < tarih
+        )
+        .order_by(tarih_kolonu.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    return select(varlik_tablosu.c.tip, varlik_tablosu.c.kod, son_fiyat.label('fiyat'))
+
+
+# Bu süreden uzun grafikler ham fiyat geçmişi yerine günlük özet tablosundan okunur
+GRAFIK_GUNLUK_OZET_ESIGI = int(os.environ.get("GRAFIK_GUNLUK_OZET_ESIGI", "90"))
+
+
 def portfoy_gecmis_grafigi(user_id, gun_sayisi=30):
     """Kullanicinin son N gunluk portfoy deger gecmisini gercek fiyat verisiyle hesaplar."""
     baslangic = datetime.now() - timedelta(days=gun_sayisi - 1)
@@ -1034,49 +1913,47 @@ def portfoy_gecmis_grafigi(user_id, gun_sayisi=30):
     if not yatirimlar:
         return []
 
-    son_fiyatlar = {}
-    for yatirim in yatirimlar:
-        onceki_kayit = (
-            FiyatGecmisi.query
-            .filter(
-                FiyatGecmisi.yatirim_id == yatirim.id,
-                FiyatGecmisi.tarih < baslangic
-            )
-            .order_by(FiyatGecmisi.tarih.desc())
-            .first()
-        )
-        if onceki_kayit and onceki_kayit.fiyat:
-            son_fiyatlar[yatirim.id] = onceki_kayit.fiyat
-        elif yatirim.guncel_fiyat:
-            son_fiyatlar[yatirim.id] = yatirim.guncel_fiyat
-        else:
-            son_fiyatlar[yatirim.id] = yatirim.alis_fiyati
-
-    yatirim_idleri = [y.id for y in yatirimlar]
-    gecmis_kayitlar = (
-        FiyatGecmisi.query
-        .filter(
-            FiyatGecmisi.yatirim_id.in_(yatirim_idleri),
-            FiyatGecmisi.tarih >= baslangic
+    # Fiyat geçmişi varlık bazında tutulur; aynı varlığın kalemleri aynı fiyatı paylaşır
+    varliklar = {(y.tip, y.kod.upper()) for y in yatirimlar}
+
+    # Uzun dönemlerde gün başına tek satır (kapanış) okunur; kısa dönemler ham geçmişi kullanır
+    if gun_sayisi >= GRAFIK_GUNLUK_OZET_ESIGI:
+        tablo, tarih_kolonu, fiyat_kolonu = VarlikGunlukFiyat, VarlikGunlukFiyat.gun, VarlikGunlukFiyat.kapanis
+        sinir = baslangic.date()
+    else:
+        tablo, tarih_kolonu, fiyat_kolonu = VarlikFiyatGecmisi, VarlikFiyatGecmisi.tarih, VarlikFiyatGecmisi.fiyat
+        sinir = baslangic
+
+    # Pencere başındaki fiyatlar: varlık sayısından bağımsız olarak tek sorgu
+    son_fiyatlar = {
+        (tip, kod): fiyat
+        for tip, kod, fiyat in db.session.execute(
+            onceki_fiyatlar_sorgusu(varliklar, sinir, tarih_kolonu, fiyat_kolonu)
         )
-        .order_by(FiyatGecmisi.tarih.asc())
-        .all()
-    )
+        if fiyat
+    }
+
+    gecmis_kayitlar = db.session.execute(
+        select(tablo.tip, tablo.kod, tarih_kolonu, fiyat_kolonu)
+        .where(tuple_(tablo.tip, tablo.kod).in_(varliklar), tarih_kolonu >= sinir)
+        .order_by(tarih_kolonu.asc())
+    ).all()
 
     gunluk_kayitlar = defaultdict(list)
-    for kayit in gecmis_kayitlar:
-        gunluk_kayitlar[kayit.tarih.date()].append(kayit)
+    for tip, kod, tarih, fiyat in gecmis_kayitlar:
+        gun = tarih.date() if isinstance(tarih, datetime) else tarih
+        gunluk_kayitlar[gun].append(((tip, kod), fiyat))
 
     sonuc = []
     for i in range(gun_sayisi):
         gun = (baslangic + timedelta(days=i)).date()
 
-        for kayit in gunluk_kayitlar.get(gun, []):
-            son_fiyatlar[kayit.yatirim_id] = kayit.fiyat
+        for varlik, fiyat in gunluk_kayitlar.get(gun, []):
+            son_fiyatlar[varlik] = fiyat
 
         gunluk_toplam = Decimal('0')
         for yatirim in yatirimlar:
-            fiyat = son_fiyatlar.get(yatirim.id) or yatirim.guncel_fiyat or yatirim.alis_fiyati
+            fiyat = son_fiyatlar.get((yatirim.tip, yatirim.kod.upper())) or yatirim.guncel_fiyat or yatirim.alis_fiyati
             gunluk_toplam += Decimal(fiyat) * Decimal(yatirim.miktar)
 
         sonuc.append((gun.strftime('%Y-%m-%d'), float(gunluk_toplam)))
@@ -1264,49 +2141,39 @@ def yatirim_ekle():
             
             # Duplicate check removed - allow multiple entries of same investment code
             
-            yatirim = Yatirim(
-                tip=tip,
-                kod=kod,
-                alis_tarihi=alis_tarihi,
-                alis_fiyati=alis_fiyati,
-                miktar=miktar,
-                notlar=notlar,
-                kategori=kategori,
-                user_id=current_user.id
-            )
-            
-            db.session.add(yatirim)
-            db.session.commit()
+            user_id = current_user.id
+
+            def ekle():
+                yatirim = Yatirim(
+                    tip=tip,
+                    kod=kod,
+                    alis_tarihi=alis_tarihi,
+                    alis_fiyati=alis_fiyati,
+                    miktar=miktar,
+                    notlar=notlar,
+                    kategori=kategori,
+                    user_id=user_id
+                )
+                db.session.add(yatirim)
+                db.session.flush()
+                return yatirim.id
+
+            yatirim_id = yazici.gonder(ekle)
             
             # İlk fiyat güncelleme ve isim doğrulama
-            fiyat_guncelle(yatirim.id)
+            fiyat_guncelle(yatirim_id)
+            yatirim = Yatirim.query.get(yatirim_id)
             
             # Yatırım ismini API'den gelen verilerle doğrula
             try:
-                if tip == 'fon':
-                    api_veri = tefas_fon_verisi_cek(kod)
-                    if api_veri and 'isim' in api_veri:
-                        api_isim = api_veri['isim']
-                        if yatirim.isim and yatirim.isim != api_isim:
-                            # İsim farklıysa güncelle ve kullanıcıyı bilgilendir
-                            yatirim.isim = api_isim
-                            db.session.commit()
-                            flash(f'{kod} kodlu fon eklendi. İsim güncellendi: {api_isim}', 'info')
-                        elif not yatirim.isim:
-                            # İsim yoksa API'den al
-                            yatirim.isim = api_isim
-                            db.session.commit()
-                elif tip == 'hisse':
-                    api_veri = bist_hisse_verisi_cek(kod)
-                    if api_veri and 'isim' in api_veri:
-                        api_isim = api_veri['isim']
-                        if yatirim.isim and yatirim.isim != api_isim:
-                            yatirim.isim = api_isim
-                            db.session.commit()
-                            flash(f'{kod} kodlu hisse eklendi. İsim güncellendi: {api_isim}', 'info')
-                        elif not yatirim.isim:
-                            yatirim.isim = api_isim
-                            db.session.commit()
+                _, api_veri = fiyat_verisi_cek_by_tip_kod(tip, kod)
+                if api_veri and 'isim' in api_veri:
+                    api_isim = api_veri['isim']
+                    if yatirim.isim != api_isim:
+                        yazici.gonder(lambda: Yatirim.query.filter_by(id=yatirim_id).update({'isim': api_isim}))
+                    if yatirim.isim and yatirim.isim != api_isim:
+                        # İsim farklıysa kullanıcıyı bilgilendir
+                        flash(f'{kod} kodlu {saglayici_kaydi.al(tip).etiket} eklendi. İsim güncellendi: {api_isim}', 'info')
             except Exception as e:
                 app.logger.warning(f"İsim doğrulama hatası: {e}")
             
@@ -1390,90 +2257,65 @@ def fiyat_guncelle_route(yatirim_id):
 def toplu_fiyat_guncelle():
     yatirimlar = Yatirim.query.filter_by(user_id=current_user.id).all()
 
-    altin_creds_var = bool(os.environ.get('ALTINKAYNAK_USERNAME') and os.environ.get('ALTINKAYNAK_PASSWORD'))
-
     basarili_count = 0
     hata_count = 0
-    atlanan_altin_count = 0
+    atlanan = defaultdict(int)
+    erisilemeyen = defaultdict(int)
 
     # Aynı varlığı (kod+tip) sadece bir kez çekmek için grupla
-    gruplar = {}
-    for yatirim in yatirimlar:
-        key = f"{yatirim.tip}:{yatirim.kod.upper()}"
-        if key not in gruplar:
-            gruplar[key] = {
-                'tip': yatirim.tip,
-                'kod': yatirim.kod.upper(),
-                'yatirimlar': []
-            }
-        gruplar[key]['yatirimlar'].append(yatirim)
-
-    # Altın credentials yoksa altın gruplarını baştan atla
-    cekilecek_gruplar = []
-    for grup in gruplar.values():
-        if grup['tip'] == 'altin' and not altin_creds_var:
-            atlanan_altin_count += len(grup['yatirimlar'])
-            continue
-        cekilecek_gruplar.append(grup)
-
-    # Dış API çağrılarını paralel yap
-    cekim_sonuclari = {}
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        future_to_key = {
-            executor.submit(fiyat_verisi_cek_by_tip_kod, grup['tip'], grup['kod']): f"{grup['tip']}:{grup['kod']}"
-            for grup in cekilecek_gruplar
-        }
-        for future in as_completed(future_to_key):
-            key = future_to_key[future]
-            try:
-                cekim_sonuclari[key] = future.result()
-            except Exception as e:
-                app.logger.error(f"Paralel fiyat çekme hatası ({key}): {e}", exc_info=True)
-                cekim_sonuclari[key] = (False, None)
-
-    # DB yazımları tek thread'de (SQLAlchemy session güvenliği)
-    for key, grup in gruplar.items():
-        if grup['tip'] == 'altin' and not altin_creds_var:
-            continue
-
-        basarili, veri = cekim_sonuclari.get(key, (False, None))
-        if not basarili or not veri:
-            hata_count += len(grup['yatirimlar'])
-            continue
-
-        for yatirim in grup['yatirimlar']:
-            yatirim.guncel_fiyat = veri['guncel_fiyat']
-            yatirim.son_guncelleme = veri['tarih']
+    gruplar = fiyat_gruplari_olustur(yatirimlar)
+
+    # Ayarları eksik sağlayıcıların (ör. Altinkaynak kullanıcı bilgisi) gruplarını baştan atla
+    kapali_tipler = set()
+    for key in list(gruplar):
+        saglayici = saglayici_kaydi.al(key[0])
+        if saglayici is not None and not saglayici.hazir_mi():
+            atlanan[key[0]] += len(gruplar.pop(key)['yatirimlar'])
+        elif saglayici is not None and not saglayici.kullanilabilir_mi():
+            # Devre kesicisi açık: sağlayıcı istek atmaz, yalnızca yereldeki fiyatları verir
+            kapali_tipler.add(key[0])
+
+    # Bütçe içinde gelen fiyatlar hemen yazılır; yetişmeyen gruplar arka planda tamamlanır
+    cekim_sonuclari = grup_fiyatlarini_cek(
+        gruplar, sure_limiti=TOPLU_GUNCELLEME_BUTCESI, zaman_asimi=HTTP_ZAMAN_ASIMI
+    )
+    ertelenenler = {key: gruplar.pop(key) for key in list(gruplar) if key not in cekim_sonuclari}
 
-            if yatirim.tip in ['altin', 'doviz']:
-                if veri.get('alis_fiyat'):
-                    yatirim.guncel_alis_fiyat = veri['alis_fiyat']
-                if veri.get('satis_fiyat'):
-                    yatirim.guncel_satis_fiyat = veri['satis_fiyat']
+    # Devresi açık sağlayıcıdan yerelde bulunamayanlar hata değil, erişilemeyen sayılır
+    for key in list(gruplar):
+        if key[0] in kapali_tipler and not cekim_sonuclari[key][0]:
+            erisilemeyen[key[0]] += len(gruplar.pop(key)['yatirimlar'])
 
-            if not yatirim.isim and veri.get('isim'):
-                yatirim.isim = veri['isim']
+    # DB yazımları tek transaction'da (tek yazıcı etkinse onun thread'inde)
+    yatirim_idleri = [yatirim.id for grup in gruplar.values() for yatirim in grup['yatirimlar']]
+    for sayac in fiyatlari_kaydet(yatirim_idleri, cekim_sonuclari).values():
+        basarili_count += sayac['basarili']
+        hata_count += sayac['hata']
 
-            fiyat_gecmisi = FiyatGecmisi(
-                yatirim_id=yatirim.id,
-                tarih=veri['tarih'],
-                fiyat=veri['guncel_fiyat'],
-                user_id=current_user.id
-            )
-            db.session.add(fiyat_gecmisi)
-            basarili_count += 1
-
-    db.session.commit()
+    if ertelenenler:
+        ertelenen_gruplari_tamamla([
+            yatirim.id for grup in ertelenenler.values() for yatirim in grup['yatirimlar']
+        ])
 
     if basarili_count > 0:
         flash(f'{basarili_count} yatırımın fiyatı güncellendi!', 'success')
 
-    if atlanan_altin_count > 0:
+    if ertelenenler:
+        kodlar = ', '.join(sorted(kod for _, kod in ertelenenler))
         flash(
-            f'{atlanan_altin_count} altın yatırımı atlandı (ALTINKAYNAK_USERNAME/ALTINKAYNAK_PASSWORD eksik).',
+            f'{len(ertelenenler)} varlığın fiyatı {TOPLU_GUNCELLEME_BUTCESI:g} sn içinde gelmedi, '
+            f'arka planda güncelleniyor: {kodlar}',
             'info'
         )
 
+    for tip, adet in atlanan.items():
+        saglayici = saglayici_kaydi.al(tip)
+        flash(f'{adet} {saglayici.etiket} yatırımı atlandı ({saglayici.hazir_degil_mesaji}).', 'info')
+
+    for tip, adet in erisilemeyen.items():
+        saglayici = saglayici_kaydi.al(tip)
+        flash(f'{saglayici.kaynak} şu anda erişilemiyor; {adet} {saglayici.etiket} yatırımı güncellenmedi.', 'warning')
+
     if hata_count > 0:
         flash(f'{hata_count} yatırımın fiyatı güncellenemedi!', 'warning')
 
@@ -1525,29 +2367,51 @@ def api_yatirim_dogrula():
         return jsonify({'success': False, 'error': 'Tip ve kod gerekli'})
     
     try:
-        if tip == 'fon':
-            result = tefas_fon_verisi_cek(kod)
-        elif tip == 'hisse':
-            result = bist_hisse_verisi_cek(kod)
-        elif tip == 'altin':
-            result = altin_verisi_cek(kod)
-        elif tip == 'doviz':
-            result = doviz_verisi_cek(kod)
-        else:
+        if tip not in saglayici_kaydi:
             return jsonify({'success': False, 'error': 'Geçersiz yatırım tipi'})
+
+        result, yas, bayat = fiyat_verisi_al(tip, kod)
         
         if result:
             return jsonify({
                 'success': True,
                 'isim': result.get('isim', 'Bilinmeyen'),
-                'guncel_fiyat': float(result.get('guncel_fiyat', 0))
+                'guncel_fiyat': float(result.get('guncel_fiyat', 0)),
+                'bayat': bayat,
+                'fiyat_yasi': int(yas)
             })
-        else:
-            return jsonify({'success': False, 'error': 'Veri çekilemedi'})
+        saglayici = saglayici_kaydi.al(tip)
+        if not saglayici.kullanilabilir_mi():
+            return jsonify({'success': False, 'error': f'{saglayici.kaynak} şu anda erişilemiyor'})
+        return jsonify({'success': False, 'error': 'Veri çekilemedi'})
             
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/api/cache_istatistikleri')
+@login_required
+def api_cache_istatistikleri():
+    """Fiyat cache'inin isabet/ıska/tahliye/bayat sayaçlarını ve birleştirilen istekleri döndürür."""
+    return jsonify({
+        'fiyat_cache': _fiyat_cache.istatistikler(),
+        'tekil_cekim': _tek_ucus.istatistikler(),
+        'kosullu_http': kosullu_getirici.istatistikler(),
+        'http_kayit': http_kayit_oynatici.istatistikler() if http_kayit_oynatici else None,
+        'tek_yazici': yazici.istatistikler()
+    })
+
+@app.route('/api/saglayici_durumu')
+@login_required
+def api_saglayici_durumu():
+    """Sağlayıcıların devre kesici, hız sınırı, bağlantı havuzu ve negatif cache durumlarını döndürür."""
+    durum = saglayici_kaydi.istatistikler()
+    havuzlar = havuz_istatistikleri(http_session)
+    for tip, bilgi in durum.items():
+        host = saglayici_kaydi.al(tip).host
+        bilgi['hiz_siniri'] = hiz_sinirlayici.istatistikler(host)
+        bilgi['baglanti_havuzu'] = havuzlar.get(host)
+    return jsonify(durum)
+
 @app.route('/api/yatirim_grup/<kod>')
 @login_required
 def api_yatirim_grup(kod):
@@ -1666,9 +2530,13 @@ def view_shared_portfolio(portfolio_id):
         flash('Bu portföy özel olarak paylaşılmış', 'error')
         return redirect(url_for('community_portfolios'))
     
-    # Görüntülenme sayısını artır
-    portfoy.view_count += 1
-    db.session.commit()
+    # Görüntülenme sayısını artır; sayfa yeni değeri beklemez
+    yazici.gonder(
+        lambda: PaylasilanPortfoy.query.filter_by(id=portfolio_id).update(
+            {PaylasilanPortfoy.view_count: PaylasilanPortfoy.view_count + 1}
+        ),
+        bekle=False
+    )
     
     yatirimlar = PaylasilanYatirim.query.filter_by(portfoy_id=portfolio_id).all()
     
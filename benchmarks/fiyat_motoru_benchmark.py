@@ -0,0 +1,112 @@
+"""Toplu fiyat çekimi: eski ThreadPoolExecutor(5) yolu ile asyncio motoru karşılaştırması.
+
+Yerel bir stub sunucu her sağlayıcıyı sabit gecikmeyle taklit eder; iki yol da
+aynı requests oturumu üzerinden aynı istek kümesini çeker.
+
+Kullanım: python benchmarks/fiyat_motoru_benchmark.py [fon_sayisi] [gecikme_ms]
+"""
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fiyat_motoru import toplu_fiyat_cek  # noqa: E402
+from saglayicilar import FiyatSaglayici, SaglayiciKaydi  # noqa: E402
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    gecikme = 0.3
+
+    def do_GET(self):
+        time.sleep(self.gecikme)
+        govde = b'{"fiyat": "1,2345"}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(govde)))
+        self.end_headers()
+        self.wfile.write(govde)
+
+    def log_message(self, *args):
+        pass
+
+
+def istek_listesi(fon_sayisi):
+    istekler = [('fon', f'F{i:03d}') for i in range(fon_sayisi)]
+    istekler += [('hisse', f'H{i:02d}') for i in range(10)]
+    istekler += [('altin', kod) for kod in ('GA', 'C', 'Y', 'T')]
+    istekler += [('doviz', kod) for kod in ('USD', 'EUR', 'GBP')]
+    return istekler
+
+
+def fetcher_olustur(port):
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=32)
+    session.mount('http://', adapter)
+
+    def fetcher(tip, kod):
+        response = session.get(f'http://127.0.0.1:{port}/{tip}/{kod}', timeout=15)
+        return response.status_code == 200, response.json()
+
+    return fetcher
+
+
+def kayit_olustur(fetcher):
+    """Uygulamadaki sağlayıcılarla aynı host ve eşzamanlılık sınırlarını kullanan stub kayıt."""
+    kayit = SaglayiciKaydi()
+    for tip, host, eszamanlilik in (
+        ('fon', 'www.tefas.gov.tr', 8),
+        ('hisse', 'www.isyatirim.com.tr', 4),
+        ('altin', 'data.altinkaynak.com', 1),
+        ('doviz', 'www.tcmb.gov.tr', 1),
+    ):
+        kayit.kaydet(FiyatSaglayici(
+            tip, host=host, eszamanlilik=eszamanlilik,
+            fetch_one=lambda kod, tip=tip: fetcher(tip, kod)[1]
+        ))
+    return kayit
+
+
+def thread_pool_yolu(istekler, fetcher):
+    sonuclar = {}
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        futures = {executor.submit(fetcher, tip, kod): (tip, kod) for tip, kod in istekler}
+        for future in as_completed(futures):
+            sonuclar[futures[future]] = future.result()
+    return sonuclar
+
+
+def olc(ad, fn):
+    baslangic = time.perf_counter()
+    sonuclar = fn()
+    sure = time.perf_counter() - baslangic
+    basarili = sum(1 for ok, _ in sonuclar.values() if ok)
+    print(f"{ad:<22} {sure:7.2f} s  ({basarili}/{len(sonuclar)} başarılı)")
+
+
+def main():
+    fon_sayisi = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    StubHandler.gecikme = (int(sys.argv[2]) if len(sys.argv) > 2 else 300) / 1000
+
+    sunucu = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=sunucu.serve_forever, daemon=True).start()
+    port = sunucu.server_address[1]
+
+    istekler = istek_listesi(fon_sayisi)
+    fetcher = fetcher_olustur(port)
+    print(f"{len(istekler)} grup, istek başına {StubHandler.gecikme * 1000:.0f} ms gecikme")
+
+    olc("ThreadPoolExecutor(5)", lambda: thread_pool_yolu(istekler, fetcher))
+    kayit = kayit_olustur(fetcher)
+    olc("asyncio motoru", lambda: toplu_fiyat_cek(istekler, kayit))
+
+    sunucu.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""Grafik başlangıcı için "tarihten önceki son fiyat" sorgusu karşılaştırması.
+
+Geçici bir veritabanına N kalem (varsayılan 1000, her biri ayrı varlık) için
+2 yıllık günlük fiyat geçmişi yazılır; son 30 günlük grafiğin başlangıç fiyatları
+farklı yöntemlerle, yalnızca (tip, kod, tarih) benzersiz indeksiyle ve ek bir
+(tip, kod, tarih, fiyat) kapsayan indeksiyle ölçülür.
+
+Kullanım: python benchmarks/onceki_fiyat_benchmark.py [kalem] [gun] [tekrar]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import create_engine, func, select, text, tuple_
+from sqlalchemy.orm import Session
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("FIYAT_CACHE_KALICI", "0")
+# app import edilirken açılıp migrate edilen veritabanı geçici dizinde olsun
+_uygulama_db_dizini = tempfile.TemporaryDirectory(prefix='finans-benchmark-')
+os.environ.setdefault("FINANS_DB_YOLU", os.path.join(_uygulama_db_dizini.name, "finans_takip.db"))
+
+import app as uygulama  # noqa: E402
+from models import VarlikFiyatGecmisi  # noqa: E402
+
+V = VarlikFiyatGecmisi
+
+
+def hazirla(engine, kalem, gun):
+    V.__table__.create(engine)
+    with engine.begin() as conn:
+        baslangic = datetime.now() - timedelta(days=gun)
+        satirlar = [
+            {'tip': 'fon', 'kod': f'F{k:04d}', 'tarih': baslangic + timedelta(days=g, hours=10),
+             'fiyat': Decimal('1') + Decimal(k) + Decimal(g) / 1000}
+            for k in range(kalem) for g in range(gun)
+        ]
+        conn.execute(V.__table__.insert(), satirlar)
+
+
+def tek_tek(session, varliklar, tarih):
+    """Eski yöntem: varlık başına bir ORM sorgusu."""
+    sonuc = {}
+    for tip, kod in varliklar:
+        kayit = (
+            session.query(V)
+            .filter(V.tip == tip, V.kod == kod, V.tarih < tarih)
+            .order_by(V.tarih.desc())
+            .first()
+        )
+        if kayit:
+            sonuc[(tip, kod)] = kayit.fiyat
+    return sonuc
+
+
+def pencere(session, varliklar, tarih):
+    sira = func.row_number().over(partition_by=(V.tip, V.kod), order_by=V.tarih.desc()).label('sira')
+    alt = (
+        select(V.tip, V.kod, V.fiyat, sira)
+        .where(tuple_(V.tip, V.kod).in_(varliklar), V.tarih < tarih)
+        .subquery()
+    )
+    return {(t, k): f for t, k, f in session.execute(select(alt.c.tip, alt.c.kod, alt.c.fiyat).where(alt.c.sira == 1))}
+
+
+def gruplu_max(session, varliklar, tarih):
+    son = (
+        select(V.tip, V.kod, func.max(V.tarih).label('tarih'))
+        .where(tuple_(V.tip, V.kod).in_(varliklar), V.tarih < tarih)
+        .group_by(V.tip, V.kod)
+        .subquery()
+    )
+    sorgu = select(V.tip, V.kod, V.fiyat).join(
+        son, (V.tip == son.c.tip) & (V.kod == son.c.kod) & (V.tarih == son.c.tarih)
+    )
+    return {(t, k): f for t, k, f in session.execute(sorgu)}
+
+
+def tek_sorgu(session, varliklar, tarih):
+    """Uygulamanın kullandığı yöntem: VALUES + varlık başına LIMIT 1 alt sorgusu."""
+    return {(t, k): f for t, k, f in session.execute(uygulama.onceki_fiyatlar_sorgusu(varliklar, tarih)) if f}
+
+
+def olc(fn, session, varliklar, tarih, tekrar):
+    sonuc = fn(session, varliklar, tarih)
+    baslangic = time.perf_counter()
+    for _ in range(tekrar):
+        fn(session, varliklar, tarih)
+    return (time.perf_counter() - baslangic) / tekrar, sonuc
+
+
+def main():
+    kalem = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    gun = int(sys.argv[2]) if len(sys.argv) > 2 else 730
+    tekrar = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+    yontemler = (('tek tek (eski)', tek_tek), ('pencere fonksiyonu', pencere),
+                 ('gruplu MAX + join', gruplu_max), ('tek sorgu, LIMIT 1', tek_sorgu))
+
+    with tempfile.TemporaryDirectory() as dizin:
+        engine = create_engine(f"sqlite:///{os.path.join(dizin, 'gecmis.db')}")
+        hazirla(engine, kalem, gun)
+        varliklar = {('fon', f'F{k:04d}') for k in range(kalem)}
+        tarih = datetime.now() - timedelta(days=29)
+        print(f"{kalem} kalem x {gun} gün = {kalem * gun} satır")
+        print(f"{'yöntem':<22} {'benzersiz (ms)':>15} {'+kapsayan (ms)':>14}")
+
+        sureler = {ad: [] for ad, _ in yontemler}
+        beklenen = None
+        for indeksli in (False, True):
+            if indeksli:
+                with engine.begin() as conn:
+                    conn.execute(text(
+                        "CREATE INDEX ix_varlik_fiyat_gecmisi_tip_kod_tarih_fiyat "
+                        "ON varlik_fiyat_gecmisi (tip, kod, tarih, fiyat)"
+                    ))
+            with Session(engine) as session:
+                for ad, fn in yontemler:
+                    sure, sonuc = olc(fn, session, varliklar, tarih, tekrar)
+                    beklenen = beklenen or sonuc
+                    if sonuc != beklenen:
+                        print(f"  UYARI: {ad} farklı sonuç döndürdü")
+                    sureler[ad].append(sure)
+        for ad, (benzersiz, kapsayan) in sureler.items():
+            print(f"{ad:<22} {benzersiz * 1000:15.1f} {kapsayan * 1000:14.1f}")
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
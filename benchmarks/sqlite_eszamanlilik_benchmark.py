@@ -0,0 +1,107 @@
+"""SQLite eşzamanlı okuma/yazma: varsayılan ayarlar ile WAL + pragmalar karşılaştırması.
+
+Yazıcı thread'ler fiyat geçmişine satır ekleyip sayaç güncelleyerek commit eder
+(toplu güncelleme, view_count artışı), okuyucu thread'ler son fiyatları okur.
+Her yapılandırma geçici bir veritabanında aynı süre boyunca çalıştırılır.
+
+Kullanım: python benchmarks/sqlite_eszamanlilik_benchmark.py [sure_sn] [yazici] [okuyucu]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from veritabani import sqlite_engine_secenekleri, sqlite_pragmalarini_bagla  # noqa: E402
+
+
+def hazirla(engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE fiyat_gecmisi (id INTEGER PRIMARY KEY, yatirim_id INTEGER NOT NULL, "
+            "tarih DATETIME NOT NULL, fiyat NUMERIC(20, 6) NOT NULL)"
+        ))
+        conn.execute(text("CREATE INDEX ix_fg_yatirim_tarih ON fiyat_gecmisi (yatirim_id, tarih)"))
+        conn.execute(text("CREATE TABLE sayac (id INTEGER PRIMARY KEY, view_count INTEGER NOT NULL)"))
+        conn.execute(text("INSERT INTO sayac (id, view_count) VALUES (1, 0)"))
+        conn.execute(
+            text("INSERT INTO fiyat_gecmisi (yatirim_id, tarih, fiyat) VALUES (:y, :t, :f)"),
+            [{'y': i % 50, 't': datetime.now(), 'f': 1.0 + i} for i in range(5000)]
+        )
+
+
+def calistir(engine, sure, yazici, okuyucu):
+    dur = threading.Event()
+    sayaclar = {'yazma': 0, 'okuma': 0, 'kilit_hatasi': 0}
+    kilit = threading.Lock()
+
+    def say(ad):
+        with kilit:
+            sayaclar[ad] += 1
+
+    def yaz(no):
+        i = 0
+        while not dur.is_set():
+            try:
+                with engine.begin() as conn:
+                    conn.execute(
+                        text("INSERT INTO fiyat_gecmisi (yatirim_id, tarih, fiyat) VALUES (:y, :t, :f)"),
+                        {'y': (no * 7 + i) % 50, 't': datetime.now(), 'f': 1.5}
+                    )
+                    conn.execute(text("UPDATE sayac SET view_count = view_count + 1 WHERE id = 1"))
+                say('yazma')
+            except OperationalError:
+                say('kilit_hatasi')
+            i += 1
+
+    def oku():
+        while not dur.is_set():
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text(
+                        "SELECT yatirim_id, MAX(tarih) FROM fiyat_gecmisi GROUP BY yatirim_id"
+                    )).fetchall()
+                say('okuma')
+            except OperationalError:
+                say('kilit_hatasi')
+
+    threadler = [threading.Thread(target=yaz, args=(n,)) for n in range(yazici)]
+    threadler += [threading.Thread(target=oku) for _ in range(okuyucu)]
+    for t in threadler:
+        t.start()
+    time.sleep(sure)
+    dur.set()
+    for t in threadler:
+        t.join()
+    return {ad: deger / sure if ad != 'kilit_hatasi' else deger for ad, deger in sayaclar.items()}
+
+
+def main():
+    sure = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    yazici = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    okuyucu = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    print(f"{sure:g} sn, {yazici} yazıcı, {okuyucu} okuyucu thread")
+    print(f"{'yapılandırma':<22} {'yazma/sn':>10} {'okuma/sn':>10} {'kilit hatası':>13}")
+
+    with tempfile.TemporaryDirectory() as dizin:
+        for ad, ayarli in (('varsayılan', False), ('WAL + pragmalar', True)):
+            url = f"sqlite:///{os.path.join(dizin, ad.replace(' ', '_') + '.db')}"
+            if ayarli:
+                engine = create_engine(url, **sqlite_engine_secenekleri())
+                sqlite_pragmalarini_bagla(engine)
+            else:
+                engine = create_engine(url, connect_args={'check_same_thread': False})
+            hazirla(engine)
+            sonuc = calistir(engine, sure, yazici, okuyucu)
+            engine.dispose()
+            print(f"{ad:<22} {sonuc['yazma']:10.0f} {sonuc['okuma']:10.0f} {sonuc['kilit_hatasi']:13d}")
+
+
+if __name__ == '__main__':
+    main()
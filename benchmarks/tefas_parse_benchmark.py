@@ -0,0 +1,80 @@
+"""FonAnaliz sayfası ayrıştırma: tam BeautifulSoup ağacı ile hızlı yol karşılaştırması.
+
+Kaydedilmiş TEFAS sayfaları verilirse onlar, verilmezse FonAnaliz düzenini
+taklit eden sentetik sayfalar kullanılır. Fon başına CPU süresi ölçülür.
+
+Kullanım: python benchmarks/tefas_parse_benchmark.py [tekrar] [sayfa.html ...]
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("FIYAT_CACHE_KALICI", "0")
+# app import edilirken açılıp migrate edilen veritabanı geçici dizinde olsun
+_uygulama_db_dizini = tempfile.TemporaryDirectory(prefix='finans-benchmark-')
+os.environ.setdefault("FINANS_DB_YOLU", os.path.join(_uygulama_db_dizini.name, "finans_takip.db"))
+
+import app as uygulama  # noqa: E402
+
+
+def sentetik_sayfa(kod, duzen):
+    """FonAnaliz benzeri, ~150 KB'lık sayfa; `duzen` fiyatın hangi seçiciyle bulunacağını belirler."""
+    script = '<script type="text/javascript">' + 'var x = {"a": [1, 2, 3]};\n' * 400 + '</script>'
+    getiri_tablosu = '<table class="fund-profile">' + ''.join(
+        f'<tr><td><span>{ay}. ay</span></td><td><span>%{ay * 1.7:.2f}</span></td></tr>' for ay in range(1, 400)
+    ) + '</table>'
+    if duzen == 'etiket_id':
+        gostergeler = (
+            '<span id="MainContent_FormViewMainIndicators_LabelFund">ÖRNEK PORTFÖY &amp; HİSSE FONU</span>'
+            '<ul class="top-list"><li>Son Fiyat (TL)<span id="MainContent_FormViewMainIndicators_LabelPrice">'
+            '1,234567</span></li></ul>'
+        )
+    elif duzen == 'top_list':
+        gostergeler = (
+            '<h2 class="main-indicators-header">ÖRNEK PORTFÖY HİSSE FONU</h2>'
+            '<ul class="top-list"><li>Son Fiyat (TL)<span>1,234567</span></li><li>Günlük Getiri<span>%0,5</span></li></ul>'
+        )
+    else:
+        gostergeler = '<p>Son fiyat</p>'
+    return (
+        f'<html><head><title>{kod} - TEFAS</title>{script}</head><body>'
+        f'<div class="main-indicators">{gostergeler}</div>{getiri_tablosu}'
+        f'<span>1.234,56 TL</span></body></html>'
+    ).encode('utf-8')
+
+
+def olc(sayfalar, mod, tekrar):
+    uygulama.TEFAS_PARSE_MODU = mod
+    baslangic = time.process_time()
+    for _ in range(tekrar):
+        for kod, icerik in sayfalar:
+            sonuc = uygulama.tefas_fon_sayfasi_parse(icerik, kod)
+    sure = (time.process_time() - baslangic) / (tekrar * len(sayfalar))
+    return sure, sonuc
+
+
+def main():
+    logging.disable(logging.WARNING)
+    tekrar = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    dosyalar = sys.argv[2:]
+    if dosyalar:
+        gruplar = {'kaydedilmiş': [(os.path.splitext(os.path.basename(d))[0].upper(), open(d, 'rb').read())
+                                   for d in dosyalar]}
+    else:
+        gruplar = {duzen: [(f'F{i:02d}', sentetik_sayfa(f'F{i:02d}', duzen)) for i in range(10)]
+                   for duzen in ('etiket_id', 'top_list', 'tum_spanlar')}
+
+    print(f"{'sayfalar':<14} {'tam (ms/fon)':>13} {'hızlı (ms/fon)':>15} {'kat':>6}")
+    for ad, sayfalar in gruplar.items():
+        tam, tam_sonuc = olc(sayfalar, 'tam', tekrar)
+        hizli, hizli_sonuc = olc(sayfalar, 'hizli', tekrar)
+        if tam_sonuc != hizli_sonuc:
+            print(f"  UYARI: sonuçlar farklı: tam={tam_sonuc} hızlı={hizli_sonuc}")
+        print(f"{ad:<14} {tam * 1000:13.2f} {hizli * 1000:15.2f} {tam / hizli:6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""Toplu güncellemenin yazma aşaması: ORM unit of work ile toplu Core ifadeleri karşılaştırması.
+
+Geçici bir veritabanında K kullanıcı x V varlık x L kalem oluşturulur; her
+turda tüm varlıklar için yeni bir fiyat yazılır (fiyat geçmişi, günlük özet ve
+kalemlerin güncel fiyatı). Ağ çağrısı yoktur, yalnızca yazma ve commit ölçülür.
+
+Kullanım: python benchmarks/toplu_yazma_benchmark.py [kullanici] [varlik] [kalem] [tur]
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from flask import Flask
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("FIYAT_CACHE_KALICI", "0")
+# app import edilirken açılıp migrate edilen veritabanı geçici dizinde olsun
+_uygulama_db_dizini = tempfile.TemporaryDirectory(prefix='finans-benchmark-')
+os.environ.setdefault("FINANS_DB_YOLU", os.path.join(_uygulama_db_dizini.name, "finans_takip.db"))
+
+import app as uygulama  # noqa: E402
+from models import db, User, Yatirim, VarlikFiyatGecmisi  # noqa: E402
+from veritabani import sqlite_engine_secenekleri, sqlite_pragmalarini_bagla  # noqa: E402
+
+
+def orm_ile_yaz(gruplar, cekim_sonuclari):
+    """Önceki yazma yolu: ORM nesneleri üzerinden kalem kalem güncelleme, varlık başına tek tek INSERT."""
+    sayaclar = defaultdict(lambda: {'basarili': 0, 'hata': 0})
+    for key, grup in gruplar.items():
+        basarili, veri = cekim_sonuclari.get(key, (False, None))
+        if not basarili or not veri:
+            sayaclar[grup['tip']]['hata'] += len(grup['yatirimlar'])
+            continue
+        db.session.execute(
+            sqlite_insert(VarlikFiyatGecmisi)
+            .values(tip=grup['tip'], kod=grup['kod'], tarih=veri['tarih'], fiyat=veri['guncel_fiyat'])
+            .on_conflict_do_nothing()
+        )
+        db.session.execute(uygulama.gunluk_ozet_upsert(), [{
+            'tip': grup['tip'], 'kod': grup['kod'], 'gun': veri['tarih'].date(), 'acilis': veri['guncel_fiyat'],
+            'yuksek': veri['guncel_fiyat'], 'dusuk': veri['guncel_fiyat'], 'kapanis': veri['guncel_fiyat'],
+            'ilk_guncelleme': veri['tarih'], 'son_guncelleme': veri['tarih']
+        }])
+        for yatirim in grup['yatirimlar']:
+            yatirim.guncel_fiyat = veri['guncel_fiyat']
+            yatirim.son_guncelleme = veri['tarih']
+            if veri.get('alis_fiyat'):
+                yatirim.guncel_alis_fiyat = veri['alis_fiyat']
+            if veri.get('satis_fiyat'):
+                yatirim.guncel_satis_fiyat = veri['satis_fiyat']
+            if not yatirim.isim and veri.get('isim'):
+                yatirim.isim = veri['isim']
+            sayaclar[grup['tip']]['basarili'] += 1
+    return dict(sayaclar)
+
+
+def hazirla(kullanici, varlik, kalem):
+    for k in range(kullanici):
+        user = User(username=f'k{k}', email=f'k{k}@ornek', password_hash='-')
+        db.session.add(user)
+        db.session.flush()
+        for v in range(varlik):
+            for _ in range(kalem):
+                db.session.add(Yatirim(
+                    tip='fon', kod=f'F{v:04d}', alis_tarihi=datetime(2025, 1, 1),
+                    alis_fiyati=Decimal('1'), miktar=Decimal('10'), user_id=user.id
+                ))
+    db.session.commit()
+
+
+def tur_calistir(yazma, orm_nesneleri, tur_no):
+    if orm_nesneleri:
+        yatirimlar = Yatirim.query.all()
+    else:
+        yatirimlar = db.session.execute(db.select(Yatirim.id, Yatirim.tip, Yatirim.kod, Yatirim.user_id)).all()
+    gruplar = uygulama.fiyat_gruplari_olustur(yatirimlar)
+    tarih = datetime(2026, 1, 1) + timedelta(minutes=15 * tur_no)
+    sonuclar = {
+        key: (True, {'guncel_fiyat': Decimal('1.5') + Decimal(tur_no) / 100, 'tarih': tarih, 'isim': key[1]})
+        for key in gruplar
+    }
+    baslangic = time.perf_counter()
+    sayaclar = yazma(gruplar, sonuclar)
+    db.session.commit()
+    sure = time.perf_counter() - baslangic
+    db.session.remove()
+    return sure, sum(sayac['basarili'] for sayac in sayaclar.values())
+
+
+def main():
+    logging.disable(logging.WARNING)
+    kullanici = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    varlik = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    kalem = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    tur = int(sys.argv[4]) if len(sys.argv) > 4 else 5
+    print(f"{kullanici} kullanıcı x {varlik} varlık x {kalem} kalem = {kullanici * varlik * kalem} kalem/tur, {tur} tur")
+    print(f"{'yöntem':<18} {'ms/tur':>9} {'kalem/sn':>10}")
+
+    for ad, yazma, orm_nesneleri in (('ORM (eski)', orm_ile_yaz, True),
+                                      ('toplu Core', uygulama.grup_fiyatlarini_yaz, False)):
+        with tempfile.TemporaryDirectory() as dizin:
+            bench_app = Flask(__name__)
+            bench_app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(dizin, 'yazma.db')}"
+            bench_app.config['SQLALCHEMY_ENGINE_OPTIONS'] = sqlite_engine_secenekleri()
+            db.init_app(bench_app)
+            with bench_app.app_context():
+                sqlite_pragmalarini_bagla(db.engine)
+                db.create_all()
+                hazirla(kullanici, varlik, kalem)
+                toplam_sure = toplam_kalem = 0
+                for tur_no in range(tur):
+                    sure, yazilan = tur_calistir(yazma, orm_nesneleri, tur_no)
+                    toplam_sure += sure
+                    toplam_kalem += yazilan
+                guncel = Yatirim.query.filter(Yatirim.guncel_fiyat.is_(None)).count()
+                if guncel:
+                    print(f"  UYARI: {guncel} kalem güncellenmedi")
+                db.engine.dispose()
+            print(f"{ad:<18} {toplam_sure / tur * 1000:9.1f} {toplam_kalem / toplam_sure:10.0f}")
+
+
+if __name__ == '__main__':
+    main()
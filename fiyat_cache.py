@@ -0,0 +1,338 @@
+"""Fiyat cache'i için yardımcı yapılar."""
+import atexit
+import contextlib
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from decimal import Decimal
+
+logger = logging.getLogger(__name__)
+
+
+class _Ucus:
+    __slots__ = ('olay', 'sonuc', 'hata')
+
+    def __init__(self):
+        self.olay = threading.Event()
+        self.sonuc = None
+        self.hata = None
+
+
+class TekUcus:
+    """Aynı anahtar için eşzamanlı çekimleri tek çağrıda birleştirir (single-flight).
+
+    Bir anahtar için ilk gelen çağrı işi yapar; iş sürerken aynı anahtarla
+    gelen çağrılar onun sonucunu (veya hatasını) bekleyip paylaşır.
+    """
+
+    def __init__(self):
+        self._kilit = threading.Lock()
+        self._ucustakiler = {}
+        self._cekilen = defaultdict(int)
+        self._birlestirilen = defaultdict(int)
+
+    @staticmethod
+    def _tip(anahtar):
+        return anahtar.split(':', 1)[0]
+
+    def calistir(self, anahtar, fn):
+        with self._kilit:
+            ucus = self._ucustakiler.get(anahtar)
+            lider = ucus is None
+            if lider:
+                ucus = _Ucus()
+                self._ucustakiler[anahtar] = ucus
+                self._cekilen[self._tip(anahtar)] += 1
+            else:
+                self._birlestirilen[self._tip(anahtar)] += 1
+
+        if not lider:
+            ucus.olay.wait()
+            if ucus.hata is not None:
+                raise ucus.hata
+            return ucus.sonuc
+
+        try:
+            ucus.sonuc = fn()
+            return ucus.sonuc
+        except BaseException as e:
+            ucus.hata = e
+            raise
+        finally:
+            with self._kilit:
+                self._ucustakiler.pop(anahtar, None)
+            ucus.olay.set()
+
+    def istatistikler(self):
+        """Tip bazında {'cekilen', 'birlestirilen', 'ucustaki'} sayaçlarını döndürür."""
+        with self._kilit:
+            tipler = set(self._cekilen) | set(self._birlestirilen)
+            ucustaki = defaultdict(int)
+            for anahtar in self._ucustakiler:
+                ucustaki[self._tip(anahtar)] += 1
+            return {
+                tip: {
+                    'cekilen': self._cekilen[tip],
+                    'birlestirilen': self._birlestirilen[tip],
+                    'ucustaki': ucustaki[tip],
+                }
+                for tip in sorted(tipler)
+            }
+
+
+def _anahtar_tipi(anahtar):
+    return anahtar.split(':', 1)[0]
+
+
+class FiyatCache:
+    """Boyutu sınırlı, LRU tahliyeli ve thread-safe fiyat cache'i.
+
+    Kayıtlar `anahtar -> (veri, ts)` biçimindedir. `saklama_suresi()` saniyeden
+    eski kayıtlar okunurken ve periyodik süpürmelerde silinir. İsabet, ıska,
+    tahliye, süresi dolan ve bayat sunum sayaçları varlık tipi bazında tutulur.
+    """
+
+    SUPURME_ARALIGI = 300
+
+    def __init__(self, max_kayit, saklama_suresi):
+        self.max_kayit = max_kayit
+        self._saklama_suresi = saklama_suresi
+        self._kayitlar = OrderedDict()
+        self._kilit = threading.Lock()
+        self._sayaclar = defaultdict(lambda: defaultdict(int))
+        self._son_supurme = time.time()
+
+    def al(self, anahtar, ttl):
+        """Kaydı (veri, yas_sn) olarak döndürür; saklama süresi dolmuşsa siler ve None döner."""
+        tip = _anahtar_tipi(anahtar)
+        with self._kilit:
+            kayit = self._kayitlar.get(anahtar)
+            if kayit is None:
+                self._sayaclar[tip]['iska'] += 1
+                return None
+
+            veri, ts = kayit
+            yas = time.time() - ts
+            if yas >= self._saklama_suresi():
+                del self._kayitlar[anahtar]
+                self._sayaclar[tip]['suresi_dolan'] += 1
+                self._sayaclar[tip]['iska'] += 1
+                return None
+
+            self._kayitlar.move_to_end(anahtar)
+            self._sayaclar[tip]['isabet' if yas < ttl else 'suresi_gecmis'] += 1
+            return veri, yas
+
+    def kaydet(self, anahtar, veri, ts):
+        with self._kilit:
+            self._kayitlar[anahtar] = (veri, ts)
+            self._kayitlar.move_to_end(anahtar)
+            self._tahliye_et()
+        if time.time() - self._son_supurme >= self.SUPURME_ARALIGI:
+            self.supur()
+
+    def toplu_kaydet(self, kayitlar):
+        """{anahtar: (veri, ts)} kayıtlarını ekler (ör. diskten ısıtma)."""
+        with self._kilit:
+            for anahtar, kayit in kayitlar.items():
+                self._kayitlar[anahtar] = kayit
+                self._kayitlar.move_to_end(anahtar)
+            self._tahliye_et()
+
+    def _tahliye_et(self):
+        while len(self._kayitlar) > self.max_kayit:
+            anahtar, _ = self._kayitlar.popitem(last=False)
+            self._sayaclar[_anahtar_tipi(anahtar)]['tahliye'] += 1
+
+    def supur(self):
+        """Saklama süresi dolmuş tüm kayıtları siler."""
+        sinir = time.time() - self._saklama_suresi()
+        with self._kilit:
+            self._son_supurme = time.time()
+            for anahtar in [a for a, (_, ts) in self._kayitlar.items() if ts <= sinir]:
+                del self._kayitlar[anahtar]
+                self._sayaclar[_anahtar_tipi(anahtar)]['suresi_dolan'] += 1
+
+    def bayat_sunuldu(self, anahtar):
+        with self._kilit:
+            self._sayaclar[_anahtar_tipi(anahtar)]['bayat'] += 1
+
+    def sil(self, anahtar):
+        with self._kilit:
+            self._kayitlar.pop(anahtar, None)
+
+    def temizle(self):
+        with self._kilit:
+            self._kayitlar.clear()
+
+    def __len__(self):
+        return len(self._kayitlar)
+
+    def istatistikler(self):
+        """Toplam kayıt sayısı ve tip bazında sayaçları döndürür."""
+        with self._kilit:
+            kayit_sayilari = defaultdict(int)
+            for anahtar in self._kayitlar:
+                kayit_sayilari[_anahtar_tipi(anahtar)] += 1
+            tipler = set(self._sayaclar) | set(kayit_sayilari)
+            return {
+                'kayit': len(self._kayitlar),
+                'max_kayit': self.max_kayit,
+                'tipler': {
+                    tip: dict(self._sayaclar[tip], kayit=kayit_sayilari[tip])
+                    for tip in sorted(tipler)
+                },
+            }
+
+
+class SinirliKume:
+    """En fazla `max_boyut` elemanı tutan, en eski eklenenleri atan küme (log tekilleştirme için)."""
+
+    def __init__(self, max_boyut):
+        self.max_boyut = max_boyut
+        self._elemanlar = OrderedDict()
+        self._kilit = threading.Lock()
+
+    def ekle(self, eleman):
+        """Eleman yeni eklendiyse True, zaten varsa False döndürür."""
+        with self._kilit:
+            if eleman in self._elemanlar:
+                self._elemanlar.move_to_end(eleman)
+                return False
+            self._elemanlar[eleman] = None
+            if len(self._elemanlar) > self.max_boyut:
+                self._elemanlar.popitem(last=False)
+            return True
+
+    def __contains__(self, eleman):
+        return eleman in self._elemanlar
+
+    def __len__(self):
+        return len(self._elemanlar)
+
+
+def _veri_kodla(veri):
+    """Fiyat sözlüğünü (Decimal/datetime içerebilir) JSON metnine çevirir."""
+    def kodla(deger):
+        if isinstance(deger, Decimal):
+            return {'__decimal__': str(deger)}
+        if isinstance(deger, datetime):
+            return {'__datetime__': deger.isoformat()}
+        return deger
+    return json.dumps({k: kodla(v) for k, v in veri.items()})
+
+
+def _veri_coz(metin):
+    def coz(deger):
+        if isinstance(deger, dict):
+            if '__decimal__' in deger:
+                return Decimal(deger['__decimal__'])
+            if '__datetime__' in deger:
+                return datetime.fromisoformat(deger['__datetime__'])
+        return deger
+    return {k: coz(v) for k, v in json.loads(metin).items()}
+
+
+class KaliciFiyatDeposu:
+    """Fiyat cache kayıtlarını ayrı bir SQLite dosyasında saklar.
+
+    Okumalar doğrudan (read-through), yazmalar kuyruk üzerinden arka plandaki
+    tek bir thread ile toplu olarak (write-behind) yapılır. Her kayıt ilk
+    çekildiği zamanın damgasını korur; TTL kontrolü çağıranın işidir.
+    """
+
+    YAZMA_PARTI_BOYUTU = 200
+
+    def __init__(self, yol):
+        self.yol = yol
+        self._kuyruk = queue.Queue()
+        with self._baglan() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS fiyat_cache ("
+                "anahtar TEXT PRIMARY KEY, veri TEXT NOT NULL, ts REAL NOT NULL)"
+            )
+        self._yazici = threading.Thread(target=self._yazma_dongusu, name='fiyat-cache-yazici', daemon=True)
+        self._yazici.start()
+        atexit.register(self.bosalt)
+
+    @contextlib.contextmanager
+    def _baglan(self):
+        conn = sqlite3.connect(self.yol, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def oku(self, anahtar):
+        """Anahtarın (veri, ts) kaydını döndürür; yoksa None."""
+        try:
+            with self._baglan() as conn:
+                satir = conn.execute(
+                    "SELECT veri, ts FROM fiyat_cache WHERE anahtar = ?", (anahtar,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Kalıcı fiyat cache okuma hatası ({anahtar}): {e}")
+            return None
+        if not satir:
+            return None
+        return _veri_coz(satir[0]), satir[1]
+
+    def yukle(self, anahtarlar):
+        """Verilen anahtarlardan diskte bulunanları {anahtar: (veri, ts)} olarak döndürür."""
+        anahtarlar = list(anahtarlar)
+        sonuc = {}
+        try:
+            with self._baglan() as conn:
+                for i in range(0, len(anahtarlar), 500):
+                    parca = anahtarlar[i:i + 500]
+                    yer_tutucular = ','.join('?' * len(parca))
+                    for anahtar, veri, ts in conn.execute(
+                        f"SELECT anahtar, veri, ts FROM fiyat_cache WHERE anahtar IN ({yer_tutucular})", parca
+                    ):
+                        sonuc[anahtar] = (_veri_coz(veri), ts)
+        except sqlite3.Error as e:
+            logger.warning(f"Kalıcı fiyat cache yükleme hatası: {e}")
+        return sonuc
+
+    def yaz(self, anahtar, veri, ts):
+        """Kaydı arka plan yazıcısı için kuyruğa ekler."""
+        self._kuyruk.put((anahtar, _veri_kodla(veri), ts))
+
+    def temizle(self, max_yas):
+        """`max_yas` saniyeden eski kayıtları siler."""
+        try:
+            with self._baglan() as conn:
+                conn.execute("DELETE FROM fiyat_cache WHERE ts < ?", (time.time() - max_yas,))
+        except sqlite3.Error as e:
+            logger.warning(f"Kalıcı fiyat cache temizleme hatası: {e}")
+
+    def _yaz_parti(self, parti):
+        try:
+            with self._baglan() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO fiyat_cache (anahtar, veri, ts) VALUES (?, ?, ?)", parti
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Kalıcı fiyat cache yazma hatası ({len(parti)} kayıt): {e}")
+
+    def _yazma_dongusu(self):
+        while True:
+            parti = [self._kuyruk.get()]
+            while len(parti) < self.YAZMA_PARTI_BOYUTU:
+                try:
+                    parti.append(self._kuyruk.get_nowait())
+                except queue.Empty:
+                    break
+            self._yaz_parti(parti)
+            for _ in parti:
+                self._kuyruk.task_done()
+
+    def bosalt(self):
+        """Kuyruktaki tüm yazmaların diske geçmesini bekler."""
+        self._kuyruk.join()
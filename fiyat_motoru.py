@@ -0,0 +1,119 @@
+"""Toplu fiyat çekimi için asyncio tabanlı motor.
+
+Her (tip, kod) isteği, o tipin sağlayıcısına ait host'un eşzamanlılık sınırı
+altında çalıştırılır ve tüm toplu işlem tek bir süre sınırına tabidir. Süre
+dolduğunda biten istekler döndürülür; bitmeyenler sonuçta yer almaz ve çağıran
+onları ertelenmiş sayıp sonra yeniden isteyebilir. Host'lar ve
+eşzamanlılık sınırları sağlayıcı kaydından (bkz. saglayicilar.py) gelir.
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Toplu çekimin tamamı için saniye cinsinden üst süre
+TOPLU_CEKIM_SURE_LIMITI = float(os.environ.get("TOPLU_CEKIM_SURE_LIMITI", "45"))
+
+
+async def _cagri_calistir(fn, kodlar, semafor, executor):
+    async with semafor:
+        loop = asyncio.get_running_loop()
+        # Çağıranın context değişkenleri (ör. bütçeli zaman aşımı) worker thread'inde de geçerli olsun
+        baglam = contextvars.copy_context()
+        return await loop.run_in_executor(executor, functools.partial(baglam.run, fn, kodlar))
+
+
+async def _toplu_cek(istekler, kayit, sure_limiti, executor):
+    semaforlar = {}
+    gorevler = {}  # gorev -> o görevin sonuçlandıracağı (tip, kod) listesi
+    sonuclar = {}
+
+    def semafor_al(saglayici):
+        if saglayici.host not in semaforlar:
+            semaforlar[saglayici.host] = asyncio.Semaphore(saglayici.eszamanlilik)
+        return semaforlar[saglayici.host]
+
+    partiler = {}
+    for tip, kod in istekler:
+        saglayici = kayit.al(tip)
+        if saglayici is None:
+            logger.warning(f"'{tip}' için kayıtlı fiyat sağlayıcısı yok ({kod})")
+            sonuclar[(tip, kod)] = (False, None)
+        elif saglayici.toplu:
+            partiler.setdefault(tip, []).append(kod)
+        else:
+            gorev = asyncio.create_task(
+                _cagri_calistir(saglayici.fetch_many, [kod], semafor_al(saglayici), executor)
+            )
+            gorevler[gorev] = [(tip, kod)]
+
+    for tip, kodlar in partiler.items():
+        saglayici = kayit.al(tip)
+        boyut = saglayici.parti_boyutu or len(kodlar)
+        for i in range(0, len(kodlar), boyut):
+            parti = kodlar[i:i + boyut]
+            gorev = asyncio.create_task(
+                _cagri_calistir(saglayici.fetch_many, parti, semafor_al(saglayici), executor)
+            )
+            gorevler[gorev] = [(tip, kod) for kod in parti]
+
+    if not gorevler:
+        return sonuclar
+
+    _, bekleyenler = await asyncio.wait(gorevler, timeout=sure_limiti)
+    for gorev in bekleyenler:
+        gorev.cancel()
+
+    for gorev, anahtarlar in gorevler.items():
+        etiket = ', '.join(f"{tip}:{kod}" for tip, kod in anahtarlar)
+        if gorev in bekleyenler:
+            logger.warning(f"Toplu fiyat çekimi süre sınırını aştı, ertelendi ({etiket})")
+            continue
+
+        hata = gorev.exception()
+        if hata is not None:
+            logger.error(f"Toplu fiyat çekme hatası ({etiket}): {hata}")
+            sonuclar.update({anahtar: (False, None) for anahtar in anahtarlar})
+            continue
+
+        veriler = gorev.result()
+        for tip, kod in anahtarlar:
+            veri = veriler.get(kod.upper())
+            sonuclar[(tip, kod)] = (veri is not None, veri)
+    return sonuclar
+
+
+def toplu_fiyat_cek(istekler, kayit, sure_limiti=None):
+    """(tip, kod) listesini sağlayıcı kaydındaki sınırlarla paralel çeker.
+
+    Toplu çekim destekleyen sağlayıcılara o tipin kodları `parti_boyutu`
+    kadarlık çağrılarla (belirtilmemişse tek çağrıda), diğerlerine kod başına
+    bir `fetch_many([kod])` çağrısı gönderilir. Sonuç
+    `{(tip, kod): (basarili, veri)}` sözlüğüdür; süre sınırında bitmeyen
+    istekler sözlükte yer almaz.
+    """
+    istekler = list(dict.fromkeys(istekler))
+    if not istekler:
+        return {}
+
+    if sure_limiti is None:
+        sure_limiti = TOPLU_CEKIM_SURE_LIMITI
+
+    hostlar = {}
+    for tip, _ in istekler:
+        saglayici = kayit.al(tip)
+        if saglayici is not None:
+            hostlar.setdefault(saglayici.host, saglayici.eszamanlilik)
+    executor = ThreadPoolExecutor(
+        max_workers=max(1, sum(hostlar.values())),
+        thread_name_prefix='fiyat-motoru'
+    )
+    try:
+        return asyncio.run(_toplu_cek(istekler, kayit, sure_limiti, executor))
+    finally:
+        # Süresi dolan istekleri bekleme; arka planda bitip cache'i doldurabilirler
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,436 @@
+"""Fiyat sağlayıcılarına giden HTTP istekleri için ortak katman.
+
+`SaglayiciAdapter`, paylaşılan requests oturumuna takılır ve her isteği
+sırasıyla host'un devre kesicisinden ve hız sınırlayıcısından geçirir.
+`KosulluGetirici`, değişmeyen kaynakları (TCMB kur dosyaları gibi) koşullu
+isteklerle (ETag/Last-Modified) doğrular ve 304'te yeniden parse etmez.
+`KayitOynatici`, yanıtları fixture dizinine kaydeder veya canlı servisler
+yerine oradan (isteğe bağlı gecikme ve hata enjeksiyonuyla) sunar.
+"""
+import base64
+import hashlib
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3.connection import HTTPConnection
+
+from saglayicilar import DevreAcik
+
+logger = logging.getLogger(__name__)
+
+# Host -> (saniyedeki istek, kova kapasitesi). HTTP_HIZ_LIMITLERI ile değiştirilebilir:
+#   HTTP_HIZ_LIMITLERI="www.tefas.gov.tr=10/20,www.tcmb.gov.tr=2/4"
+VARSAYILAN_HIZ_LIMITLERI = {
+    'www.tefas.gov.tr': (5.0, 10),
+    'www.isyatirim.com.tr': (4.0, 8),
+    'data.altinkaynak.com': (1.0, 2),
+    'www.tcmb.gov.tr': (2.0, 5),
+}
+
+
+# Boşta bekleyen bağlantıların sunucu/NAT tarafından sessizce düşürülmemesi için TCP keep-alive
+KEEPALIVE_SOKET_AYARLARI = HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+
+
+def havuz_boyutlarini_oku(varsayilanlar, metin=None):
+    """Host başına havuz boyutlarını HTTP_HAVUZ_BOYUTLARI="host=N,..." ile birleştirir."""
+    boyutlar = dict(varsayilanlar)
+    metin = os.environ.get("HTTP_HAVUZ_BOYUTLARI", "") if metin is None else metin
+    for parca in filter(None, (p.strip() for p in metin.split(','))):
+        try:
+            host, boyut = parca.split('=', 1)
+            boyutlar[host.strip()] = max(1, int(boyut))
+        except ValueError:
+            logger.warning(f"Geçersiz HTTP_HAVUZ_BOYUTLARI girdisi atlandı: {parca}")
+    return boyutlar
+
+
+def havuz_istatistikleri(session):
+    """Oturumdaki bağlantı havuzlarının host bazında kullanım sayaçları.
+
+    - `baglanti`: açılan bağlantı sayısı (HTTPS'te TLS el sıkışması sayısı)
+    - `istek`: bu bağlantılar üzerinden yapılan istek sayısı
+    - `yeniden_kullanim`: mevcut bir keep-alive bağlantısıyla yapılan istekler
+    - `bosta`: havuzda bekleyen boş bağlantı, `max`: havuz boyutu
+    """
+    sonuc = {}
+    for adapter in {id(a): a for a in session.adapters.values()}.values():
+        havuzlar = getattr(getattr(adapter, 'poolmanager', None), 'pools', None)
+        if havuzlar is None:
+            continue
+        for anahtar in havuzlar.keys():
+            havuz = havuzlar.get(anahtar)
+            if havuz is None:
+                continue
+            sayac = sonuc.setdefault(havuz.host, {
+                'baglanti': 0, 'el_sikisma': 0, 'istek': 0, 'yeniden_kullanim': 0, 'bosta': 0, 'max': 0
+            })
+            sayac['baglanti'] += havuz.num_connections
+            if havuz.scheme == 'https':
+                sayac['el_sikisma'] += havuz.num_connections
+            sayac['istek'] += havuz.num_requests
+            sayac['yeniden_kullanim'] += max(0, havuz.num_requests - havuz.num_connections)
+            # Kuyruk boş yuvaları None ile tutar; yalnızca gerçek bağlantılar sayılır
+            sayac['bosta'] += sum(1 for baglanti in list(havuz.pool.queue) if baglanti is not None) if havuz.pool is not None else 0
+            sayac['max'] += havuz.pool.maxsize if havuz.pool is not None else 0
+    for sayac in sonuc.values():
+        sayac['baglanti_basina_istek'] = sayac['istek'] / sayac['baglanti'] if sayac['baglanti'] else 0.0
+    return sonuc
+
+
+def hiz_limitlerini_oku(metin=None):
+    """Varsayılan limitleri HTTP_HIZ_LIMITLERI ortam değişkeniyle birleştirir."""
+    limitler = dict(VARSAYILAN_HIZ_LIMITLERI)
+    metin = os.environ.get("HTTP_HIZ_LIMITLERI", "") if metin is None else metin
+    for parca in filter(None, (p.strip() for p in metin.split(','))):
+        try:
+            host, deger = parca.split('=', 1)
+            hiz, _, kapasite = deger.partition('/')
+            hiz = float(hiz)
+            limitler[host.strip()] = (hiz, int(kapasite) if kapasite else max(1, int(hiz)))
+        except ValueError:
+            logger.warning(f"Geçersiz HTTP_HIZ_LIMITLERI girdisi atlandı: {parca}")
+    return limitler
+
+
+class TokenKovasi:
+    """Thread-safe token kovası; `al()` gerekirse sıradaki jeton gelene kadar bekletir.
+
+    Jetonlar rezervasyonla dağıtılır: kova boşken gelen her çağrı bir sonraki
+    jetonu ayırtır ve kendi payı kadar uyur, böylece bekleyenler sırayla geçer.
+    """
+
+    def __init__(self, hiz, kapasite):
+        self.hiz = hiz
+        self.kapasite = kapasite
+        self._jeton = float(kapasite)
+        self._son = time.monotonic()
+        self._kilit = threading.Lock()
+
+    def al(self):
+        """Bir jeton alır ve beklenen süreyi (sn) döndürür."""
+        with self._kilit:
+            simdi = time.monotonic()
+            self._jeton = min(self.kapasite, self._jeton + (simdi - self._son) * self.hiz)
+            self._son = simdi
+            self._jeton -= 1
+            bekleme = -self._jeton / self.hiz if self._jeton < 0 else 0.0
+        if bekleme:
+            time.sleep(bekleme)
+        return bekleme
+
+
+class HizSinirlayici:
+    """Host başına token kovaları ve kuyruk bekleme metrikleri."""
+
+    def __init__(self, limitler=None):
+        self._kovalar = {
+            host: TokenKovasi(hiz, kapasite)
+            for host, (hiz, kapasite) in (limitler if limitler is not None else hiz_limitlerini_oku()).items()
+        }
+        self._kilit = threading.Lock()
+        self._sayaclar = defaultdict(lambda: {
+            'istek': 0, 'bekleyen_istek': 0, 'kuyrukta': 0, 'toplam_bekleme': 0.0, 'max_bekleme': 0.0
+        })
+
+    def bekle(self, host):
+        """Host'un kovasından jeton alır; host sınırlı değilse hemen döner."""
+        kova = self._kovalar.get(host)
+        if kova is None:
+            return 0.0
+
+        with self._kilit:
+            self._sayaclar[host]['kuyrukta'] += 1
+        bekleme = kova.al()
+        with self._kilit:
+            sayac = self._sayaclar[host]
+            sayac['kuyrukta'] -= 1
+            sayac['istek'] += 1
+            if bekleme:
+                sayac['bekleyen_istek'] += 1
+                sayac['toplam_bekleme'] += bekleme
+                sayac['max_bekleme'] = max(sayac['max_bekleme'], bekleme)
+        return bekleme
+
+    def istatistikler(self, host):
+        kova = self._kovalar.get(host)
+        if kova is None:
+            return None
+        with self._kilit:
+            sayac = dict(self._sayaclar[host])
+        sayac['ortalama_bekleme'] = sayac['toplam_bekleme'] / sayac['istek'] if sayac['istek'] else 0.0
+        return dict(sayac, hiz=kova.hiz, kapasite=kova.kapasite)
+
+
+# Fixture'a yazılmayan başlıklar: gövde kayıtta zaten çözülmüş olarak saklanır
+_KAYIT_DISI_BASLIKLAR = {'content-encoding', 'content-length', 'transfer-encoding', 'set-cookie', 'connection'}
+
+
+def _govde_baytlari(govde):
+    if govde is None:
+        return b''
+    return govde.encode('utf-8') if isinstance(govde, str) else govde
+
+
+class KayitOynatici:
+    """HTTP yanıtlarını fixture dizinine kaydeder (`kaydet`) veya oradan sunar (`oynat`).
+
+    Her yanıt bir JSON dosyasıdır; dosya adı yöntem + URL + istek gövdesi
+    özetinden türetilir. İstek gövdesi ve başlıkları (kimlik bilgisi
+    içerebilir) kaydedilmez. Oynatmada birebir eşleşme yoksa aynı yöntem ve
+    URL'nin en son kaydı kullanılır (ör. tarih içeren TEFAS POST gövdeleri).
+    Oynatma modunda `gecikme_ms` aralığında gecikme ve `hata_orani`
+    olasılıkla bağlantı hatası enjekte edilir.
+    """
+
+    def __init__(self, dizin, mod, gecikme_ms=(0, 0), hata_orani=0.0):
+        if mod not in ('kaydet', 'oynat'):
+            raise ValueError(f"Geçersiz kayıt modu: {mod}")
+        self.dizin = dizin
+        self.mod = mod
+        self.gecikme_ms = gecikme_ms
+        self.hata_orani = hata_orani
+        self._kilit = threading.Lock()
+        self._sayaclar = defaultdict(int)
+        self._url_dizini = {}
+        os.makedirs(dizin, exist_ok=True)
+        if mod == 'oynat':
+            self._url_dizinini_yukle()
+
+    @classmethod
+    def ortamdan(cls, varsayilan_dizin):
+        """HTTP_KAYIT_MODU ayarlıysa ortam değişkenlerinden bir örnek oluşturur, değilse None."""
+        mod = os.environ.get("HTTP_KAYIT_MODU", "").strip()
+        if not mod:
+            return None
+        gecikme = os.environ.get("HTTP_OYNATMA_GECIKME_MS", "0")
+        alt, _, ust = gecikme.partition('-')
+        return cls(
+            os.environ.get("HTTP_KAYIT_DIZINI", varsayilan_dizin),
+            mod,
+            gecikme_ms=(float(alt), float(ust or alt)),
+            hata_orani=float(os.environ.get("HTTP_OYNATMA_HATA_ORANI", "0")),
+        )
+
+    @staticmethod
+    def _url_anahtari(request):
+        return f"{request.method} {request.url}"
+
+    def _dosya_yolu(self, request):
+        govde_ozeti = hashlib.sha256(_govde_baytlari(request.body)).hexdigest()
+        anahtar = f"{self._url_anahtari(request)} {govde_ozeti}"
+        return os.path.join(self.dizin, hashlib.sha1(anahtar.encode('utf-8')).hexdigest()[:20] + '.json')
+
+    def _url_dizinini_yukle(self):
+        kayitlar = []
+        for ad in os.listdir(self.dizin):
+            if not ad.endswith('.json'):
+                continue
+            yol = os.path.join(self.dizin, ad)
+            try:
+                with open(yol, encoding='utf-8') as f:
+                    kayit = json.load(f)
+                kayitlar.append((kayit.get('kayit_zamani', ''), f"{kayit['method']} {kayit['url']}", yol))
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Bozuk HTTP fixture atlandı ({yol}): {e}")
+        for _, url_anahtari, yol in sorted(kayitlar):
+            self._url_dizini[url_anahtari] = yol
+        logger.info(f"HTTP oynatma modu: {len(kayitlar)} fixture yüklendi ({self.dizin})")
+
+    def kaydet(self, request, response):
+        kayit = {
+            'method': request.method,
+            'url': request.url,
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': {k: v for k, v in response.headers.items() if k.lower() not in _KAYIT_DISI_BASLIKLAR},
+            'govde': base64.b64encode(response.content).decode('ascii'),
+            'kayit_zamani': datetime.now().isoformat(),
+        }
+        yol = self._dosya_yolu(request)
+        with open(yol, 'w', encoding='utf-8') as f:
+            json.dump(kayit, f, ensure_ascii=False, indent=1)
+        with self._kilit:
+            self._url_dizini[self._url_anahtari(request)] = yol
+            self._sayaclar['kaydedilen'] += 1
+
+    def oynat(self, request):
+        """Kayıtlı yanıtı döndürür; kayıt yoksa 404 yanıtı üretir."""
+        alt, ust = self.gecikme_ms
+        if ust > 0:
+            time.sleep(random.uniform(alt, ust) / 1000)
+        if self.hata_orani and random.random() < self.hata_orani:
+            with self._kilit:
+                self._sayaclar['enjekte_hata'] += 1
+            raise requests.exceptions.ConnectionError("Oynatma modu: enjekte edilmiş bağlantı hatası", request=request)
+
+        yol = self._dosya_yolu(request)
+        if not os.path.exists(yol):
+            yol = self._url_dizini.get(self._url_anahtari(request))
+        kayit = None
+        if yol:
+            with open(yol, encoding='utf-8') as f:
+                kayit = json.load(f)
+
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        if kayit is None:
+            logger.warning(f"HTTP fixture bulunamadı: {self._url_anahtari(request)}")
+            response.status_code = 404
+            response.reason = 'Fixture Not Found'
+            response.headers = CaseInsensitiveDict()
+            response._content = b''
+        else:
+            response.status_code = kayit['status']
+            response.reason = kayit.get('reason')
+            response.headers = CaseInsensitiveDict(kayit['headers'])
+            response._content = base64.b64decode(kayit['govde'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        with self._kilit:
+            self._sayaclar['oynatilan' if kayit else 'bulunamayan'] += 1
+        return response
+
+    def istatistikler(self):
+        with self._kilit:
+            return dict(self._sayaclar, mod=self.mod, dizin=self.dizin)
+
+
+class SaglayiciAdapter(HTTPAdapter):
+    """İstekleri host'un devre kesicisinden ve hız sınırlayıcısından geçirir.
+
+    Devre açıksa istek ağa çıkmadan (ve jeton harcamadan) `DevreAcik` ile
+    reddedilir. Bağlantı hataları, tükenen retry'lar ve 5xx/429 yanıtları
+    devre kesicide hata sayılır. `kayit_oynatici` verilmişse yanıtlar
+    kaydedilir ya da ağa çıkmadan fixture'lardan oynatılır. Bağlantılar TCP
+    keep-alive ile açılır.
+    """
+
+    def __init__(self, devre_kesici_bul, hiz_sinirlayici, kayit_oynatici=None, **kwargs):
+        self._devre_kesici_bul = devre_kesici_bul
+        self._hiz_sinirlayici = hiz_sinirlayici
+        self._kayit_oynatici = kayit_oynatici
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        pool_kwargs.setdefault('socket_options', KEEPALIVE_SOKET_AYARLARI)
+        super().init_poolmanager(connections, maxsize, block=block, **pool_kwargs)
+
+    def _gonder(self, request, **kwargs):
+        if self._kayit_oynatici is None:
+            return super().send(request, **kwargs)
+        if self._kayit_oynatici.mod == 'oynat':
+            return self._kayit_oynatici.oynat(request)
+        response = super().send(request, **kwargs)
+        self._kayit_oynatici.kaydet(request, response)
+        return response
+
+    def send(self, request, **kwargs):
+        host = urlsplit(request.url).hostname
+        devre = self._devre_kesici_bul(host)
+        if devre is not None and not devre.istek_izni():
+            raise DevreAcik(f"{devre.ad} geçici olarak devre dışı", request=request)
+
+        self._hiz_sinirlayici.bekle(host)
+        if devre is None:
+            return self._gonder(request, **kwargs)
+
+        try:
+            response = self._gonder(request, **kwargs)
+        except Exception:
+            devre.basarisiz()
+            raise
+        if response.status_code >= 500 or response.status_code == 429:
+            devre.basarisiz()
+        else:
+            devre.basarili()
+        return response
+
+
+class _KosulluKayit:
+    __slots__ = ('etag', 'son_degisiklik', 'govde_boyutu', 'sonuc', 'degismez')
+
+    def __init__(self, etag, son_degisiklik, govde_boyutu, sonuc, degismez):
+        self.etag = etag
+        self.son_degisiklik = son_degisiklik
+        self.govde_boyutu = govde_boyutu  # Yalnızca tasarruf sayacı için; gövdenin kendisi tutulmaz
+        self.sonuc = sonuc
+        self.degismez = degismez
+
+
+class KosulluGetirici:
+    """URL başına doğrulayıcıları (ETag, Last-Modified), parse sonucunu ve gövde boyutunu saklar.
+
+    `getir()` kayıtlı doğrulayıcılarla koşullu GET yapar; sunucu 304 dönerse
+    gövde yeniden indirilmez ve parse edilmez, saklanan sonuç döner.
+    `degismez=True` ile getirilen URL'ler (ör. geçmiş tarihli kur dosyaları)
+    bir kez indirildikten sonra hiç istek yapılmadan kalıcı olarak sunulur.
+    """
+
+    def __init__(self, session, max_kayit=None):
+        self.session = session
+        self.max_kayit = max_kayit or int(os.environ.get("HTTP_KOSULLU_MAX_KAYIT", "256"))
+        self._kayitlar = OrderedDict()
+        self._kilit = threading.Lock()
+        self._sayaclar = defaultdict(int)
+
+    def _say(self, ad, miktar=1):
+        with self._kilit:
+            self._sayaclar[ad] += miktar
+
+    def getir(self, url, ayristir, degismez=False, **kwargs):
+        """URL'yi getirip `ayristir(govde)` sonucunu döndürür: (durum_kodu, sonuc).
+
+        200 dışındaki (ve saklı kaydı olmayan 304) yanıtlarda sonuç None'dır.
+        """
+        with self._kilit:
+            kayit = self._kayitlar.get(url)
+            if kayit is not None:
+                self._kayitlar.move_to_end(url)
+        if kayit is not None and kayit.degismez:
+            self._say('degismez_isabet')
+            self._say('tasarruf_bayt', kayit.govde_boyutu)
+            return 200, kayit.sonuc
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        if kayit is not None:
+            if kayit.etag:
+                headers['If-None-Match'] = kayit.etag
+            if kayit.son_degisiklik:
+                headers['If-Modified-Since'] = kayit.son_degisiklik
+
+        response = self.session.get(url, headers=headers, **kwargs)
+        if response.status_code == 304 and kayit is not None:
+            self._say('dogrulandi_304')
+            self._say('tasarruf_bayt', kayit.govde_boyutu)
+            return 304, kayit.sonuc
+        if response.status_code != 200:
+            return response.status_code, None
+
+        self._say('indirildi')
+        sonuc = ayristir(response.content)
+        etag = response.headers.get('ETag')
+        son_degisiklik = response.headers.get('Last-Modified')
+        if degismez or etag or son_degisiklik:
+            with self._kilit:
+                self._kayitlar[url] = _KosulluKayit(etag, son_degisiklik, len(response.content), sonuc, degismez)
+                self._kayitlar.move_to_end(url)
+                while len(self._kayitlar) > self.max_kayit:
+                    self._kayitlar.popitem(last=False)
+        return 200, sonuc
+
+    def istatistikler(self):
+        with self._kilit:
+            return dict(self._sayaclar, kayit=len(self._kayitlar), max_kayit=self.max_kayit)
@@ -29,7 +29,7 @@ except ImportError:
     PYSTRAY_AVAILABLE = False
     print("📋 pystray mevcut değil, sistem tepsisi devre dışı")
 
-from app import app  # Flask app
+from app import app, zamanlayici  # Flask app, arka plan fiyat zamanlayıcısı
 
 # ===========================
 # GÖMÜLÜ BASE64 İKONLAR
@@ -128,6 +128,7 @@ def run_flask(port):
 
 def stop_flask():
     global flask_server
+    zamanlayici.durdur()
     if flask_server:
         try:
             flask_server.shutdown()
@@ -554,6 +555,7 @@ if __name__ == "__main__":
         print(f"🚀 Sunucu başlatılıyor - Port: {port}")
         flask_thread = threading.Thread(target=run_flask, args=(port,), daemon=False)
         flask_thread.start()
+        zamanlayici.baslat()
 
         check_result = check_flask_ready(port)
         if check_result:
@@ -0,0 +1,43 @@
+"""varlik bazinda paylasilan fiyat gecmisi
+
+Revision ID: b4d1c2e9a7f3
+Revises: 73ea3e635137
+Create Date: 2026-10-17 10:12:41.503118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4d1c2e9a7f3'
+down_revision = '73ea3e635137'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Uygulama açılışında db.create_all() tabloyu önceden oluşturmuş olabilir
+    if not sa.inspect(op.get_bind()).has_table('varlik_fiyat_gecmisi'):
+        op.create_table(
+            'varlik_fiyat_gecmisi',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('tip', sa.String(length=20), nullable=False),
+            sa.Column('kod', sa.String(length=30), nullable=False),
+            sa.Column('tarih', sa.DateTime(), nullable=False),
+            sa.Column('fiyat', sa.Numeric(precision=20, scale=6), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('tip', 'kod', 'tarih', name='uq_varlik_fiyat_gecmisi_tip_kod_tarih')
+        )
+
+    # Kalem bazlı kayıtları varlık bazına taşı; aynı (tip, kod, tarih) tekrarları atlanır
+    op.execute(
+        "INSERT OR IGNORE INTO varlik_fiyat_gecmisi (tip, kod, tarih, fiyat) "
+        "SELECT y.tip, UPPER(y.kod), fg.tarih, fg.fiyat "
+        "FROM fiyat_gecmisi fg JOIN yatirim y ON y.id = fg.yatirim_id "
+        "ORDER BY fg.tarih"
+    )
+
+
+def downgrade():
+    op.drop_table('varlik_fiyat_gecmisi')
@@ -0,0 +1,52 @@
+"""varlik bazinda gunluk OHLC fiyat ozeti
+
+Revision ID: d3f8b1a6e2c4
+Revises: b4d1c2e9a7f3
+Create Date: 2026-10-17 11:48:03.217904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3f8b1a6e2c4'
+down_revision = 'b4d1c2e9a7f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Uygulama açılışında db.create_all() tabloyu önceden oluşturmuş olabilir
+    if not sa.inspect(op.get_bind()).has_table('varlik_gunluk_fiyat'):
+        op.create_table(
+            'varlik_gunluk_fiyat',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('tip', sa.String(length=20), nullable=False),
+            sa.Column('kod', sa.String(length=30), nullable=False),
+            sa.Column('gun', sa.Date(), nullable=False),
+            sa.Column('acilis', sa.Numeric(precision=20, scale=6), nullable=False),
+            sa.Column('yuksek', sa.Numeric(precision=20, scale=6), nullable=False),
+            sa.Column('dusuk', sa.Numeric(precision=20, scale=6), nullable=False),
+            sa.Column('kapanis', sa.Numeric(precision=20, scale=6), nullable=False),
+            sa.Column('ilk_guncelleme', sa.DateTime(), nullable=False),
+            sa.Column('son_guncelleme', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('tip', 'kod', 'gun', name='uq_varlik_gunluk_fiyat_tip_kod_gun')
+        )
+
+    # Mevcut geçmişten günlük özetleri oluştur
+    op.execute(
+        "INSERT OR IGNORE INTO varlik_gunluk_fiyat "
+        "(tip, kod, gun, acilis, yuksek, dusuk, kapanis, ilk_guncelleme, son_guncelleme) "
+        "SELECT tip, kod, gun, acilis, MAX(fiyat), MIN(fiyat), kapanis, MIN(tarih), MAX(tarih) FROM ("
+        "  SELECT tip, kod, date(tarih) AS gun, tarih, fiyat,"
+        "    FIRST_VALUE(fiyat) OVER (PARTITION BY tip, kod, date(tarih) ORDER BY tarih) AS acilis,"
+        "    FIRST_VALUE(fiyat) OVER (PARTITION BY tip, kod, date(tarih) ORDER BY tarih DESC) AS kapanis"
+        "  FROM varlik_fiyat_gecmisi"
+        ") GROUP BY tip, kod, gun"
+    )
+
+
+def downgrade():
+    op.drop_table('varlik_gunluk_fiyat')
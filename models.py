@@ -72,6 +72,43 @@ class FiyatGecmisi(db.Model):
     def __repr__(self):
         return f'<FiyatGecmisi {self.yatirim_id} {self.tarih}>'
 
+class VarlikFiyatGecmisi(db.Model):
+    """Varlık bazında fiyat geçmişi; aynı (tip, kod) tüm kalemler ve kullanıcılar arasında paylaşılır."""
+    __tablename__ = 'varlik_fiyat_gecmisi'
+    __table_args__ = (
+        db.UniqueConstraint('tip', 'kod', 'tarih', name='uq_varlik_fiyat_gecmisi_tip_kod_tarih'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    tip = db.Column(db.String(20), nullable=False)
+    kod = db.Column(db.String(30), nullable=False)
+    tarih = db.Column(db.DateTime, nullable=False)
+    fiyat = db.Column(db.Numeric(precision=20, scale=6), nullable=False)
+
+    def __repr__(self):
+        return f'<VarlikFiyatGecmisi {self.tip} {self.kod} {self.tarih}>'
+
+class VarlikGunlukFiyat(db.Model):
+    """Varlık başına günlük açılış/en yüksek/en düşük/kapanış özeti; fiyat yazılırken güncellenir."""
+    __tablename__ = 'varlik_gunluk_fiyat'
+    __table_args__ = (
+        db.UniqueConstraint('tip', 'kod', 'gun', name='uq_varlik_gunluk_fiyat_tip_kod_gun'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    tip = db.Column(db.String(20), nullable=False)
+    kod = db.Column(db.String(30), nullable=False)
+    gun = db.Column(db.Date, nullable=False)
+    acilis = db.Column(db.Numeric(precision=20, scale=6), nullable=False)
+    yuksek = db.Column(db.Numeric(precision=20, scale=6), nullable=False)
+    dusuk = db.Column(db.Numeric(precision=20, scale=6), nullable=False)
+    kapanis = db.Column(db.Numeric(precision=20, scale=6), nullable=False)
+    ilk_guncelleme = db.Column(db.DateTime, nullable=False)  # Açılış fiyatının tarihi
+    son_guncelleme = db.Column(db.DateTime, nullable=False)  # Kapanış fiyatının tarihi
+
+    def __repr__(self):
+        return f'<VarlikGunlukFiyat {self.tip} {self.kod} {self.gun}>'
+
 class PaylasilanPortfoy(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     baslik = db.Column(db.String(200), nullable=False)
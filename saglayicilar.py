@@ -0,0 +1,248 @@
+"""Varlık tipi bazında fiyat sağlayıcı kaydı.
+
+Her varlık tipi (fon, hisse, altin, doviz, ...) kendi sağlayıcısını kaydeder;
+route'lar, toplu çekim motoru ve zamanlayıcı tip dallanması yapmadan bu kayıt
+üzerinden çalışır. Yeni bir varlık tipi eklemek için bir `FiyatSaglayici`
+kaydetmek yeterlidir.
+
+Her sağlayıcının bir devre kesicisi vardır: host'a yapılan istekler art arda
+başarısız olunca devre açılır ve sağlayıcı süre dolana kadar ağa çıkmadan hemen
+başarısız döner; ardından tek bir deneme isteğiyle (yarı açık) toparlanıp
+toparlanmadığı yoklanır. Hatasız yanıt alınmış ama fiyat bulunamamış kodlar
+(ör. yanlış yazılmış fon kodu) kısa süreli negatif cache'te tutulur.
+"""
+import logging
+import os
+import threading
+import time
+
+import requests
+
+from fiyat_cache import FiyatCache
+
+logger = logging.getLogger(__name__)
+
+DEVRE_KESICI_ESIK = int(os.environ.get("DEVRE_KESICI_ESIK", "5"))
+DEVRE_KESICI_ACIK_SURE = int(os.environ.get("DEVRE_KESICI_ACIK_SURE", "60"))
+NEGATIF_CACHE_TTL = int(os.environ.get("NEGATIF_CACHE_TTL", "600"))
+NEGATIF_CACHE_MAX_KAYIT = 1000
+
+
+class DevreAcik(requests.exceptions.ConnectionError):
+    """Devre kesicisi açık olan bir host'a istek yapılmak istendi."""
+
+
+class DevreKesici:
+    """Ardışık hatalarda açılan, süre dolunca tek deneme isteğine izin veren devre kesici."""
+
+    KAPALI = 'kapali'
+    ACIK = 'acik'
+    YARI_ACIK = 'yari_acik'
+
+    def __init__(self, ad, esik=None, acik_sure=None):
+        self.ad = ad
+        self.esik = esik or DEVRE_KESICI_ESIK
+        self.acik_sure = acik_sure or DEVRE_KESICI_ACIK_SURE
+        self._kilit = threading.Lock()
+        self._durum = self.KAPALI
+        self._ardisik_hata = 0
+        self._acilma_ani = 0.0
+        self._deneme_suruyor = False
+        self.toplam_hata = 0
+        self.toplam_red = 0     # Devre kapalı değilken reddedilen istekler
+
+    def _guncel_durum(self):
+        if self._durum == self.ACIK and time.time() - self._acilma_ani >= self.acik_sure:
+            self._durum = self.YARI_ACIK
+            self._deneme_suruyor = False
+        return self._durum
+
+    @property
+    def durum(self):
+        with self._kilit:
+            return self._guncel_durum()
+
+    def acik_mi(self):
+        return self.durum == self.ACIK
+
+    def istek_izni(self):
+        """İstek yapılabilir mi? Yarı açık durumda aynı anda yalnızca bir deneme isteğine izin verir."""
+        with self._kilit:
+            durum = self._guncel_durum()
+            if durum == self.KAPALI:
+                return True
+            if durum == self.YARI_ACIK and not self._deneme_suruyor:
+                self._deneme_suruyor = True
+                return True
+            self.toplam_red += 1
+            return False
+
+    def basarili(self):
+        with self._kilit:
+            if self._durum != self.KAPALI:
+                logger.info(f"{self.ad} devre kesicisi kapandı, sağlayıcı yeniden erişilebilir")
+            self._durum = self.KAPALI
+            self._ardisik_hata = 0
+            self._deneme_suruyor = False
+
+    def basarisiz(self):
+        with self._kilit:
+            self.toplam_hata += 1
+            self._ardisik_hata += 1
+            durum = self._guncel_durum()
+            if durum == self.YARI_ACIK or (durum == self.KAPALI and self._ardisik_hata >= self.esik):
+                logger.warning(
+                    f"{self.ad} devre kesicisi açıldı ({self._ardisik_hata} ardışık hata); "
+                    f"{self.acik_sure} sn boyunca istek yapılmayacak"
+                )
+                self._durum = self.ACIK
+                self._acilma_ani = time.time()
+                self._deneme_suruyor = False
+
+    def istatistikler(self):
+        with self._kilit:
+            durum = self._guncel_durum()
+            kalan = self.acik_sure - (time.time() - self._acilma_ani) if durum == self.ACIK else 0
+            return {
+                'durum': durum,
+                'ardisik_hata': self._ardisik_hata,
+                'toplam_hata': self.toplam_hata,
+                'toplam_red': self.toplam_red,
+                'kalan_sn': max(0, int(kalan)),
+            }
+
+
+class FiyatSaglayici:
+    """Bir varlık tipinin fiyat kaynağı ve çekim politikası.
+
+    - `fetch_one(kod)` veya `fetch_many(kodlar)` en az biri verilmelidir.
+      `fetch_many` verilmişse sağlayıcı toplu çekimi kendisi yapar ve motor
+      o tipin kodlarını toplu çağrılarla gönderir.
+    - `parti_boyutu`: bir toplu çağrıya konacak en fazla kod (None: hepsi tek
+      çağrıda). Motor her partinin sonucunu ayrı toplar; süre sınırı dolduğunda
+      biten partiler yazılabilir.
+    - `eszamanlilik`: aynı anda en fazla kaç çağrı yapılacağı (host başına).
+    - `zaman_asimi`: tek HTTP isteği için saniye cinsinden süre.
+    - `cache_ttl`: fiyatın cache'te taze sayılacağı süre (None: varsayılan TTL).
+    - `hazir`: sağlayıcının ayarlarının tamam olup olmadığını söyleyen çağrı.
+    - `yerel(kod)`: ağa çıkmadan verilebilen fiyat (cache, bellekteki indeks) ya
+      da None; devre açıkken kodlar önce buradan aranır.
+    - `kaynak`: kullanıcıya gösterilen veri kaynağı adı (ör. "TEFAS").
+    """
+
+    def __init__(self, tip, host, fetch_one=None, fetch_many=None, eszamanlilik=2,
+                 zaman_asimi=15, cache_ttl=None, etiket=None, hazir=None, hazir_degil_mesaji=None,
+                 kaynak=None, negatif_ttl=None, yerel=None, parti_boyutu=None):
+        if fetch_one is None and fetch_many is None:
+            raise ValueError(f"{tip} sağlayıcısı için fetch_one veya fetch_many gerekli")
+        self.tip = tip
+        self.host = host
+        self._fetch_one = fetch_one
+        self._fetch_many = fetch_many
+        self.eszamanlilik = eszamanlilik
+        self.parti_boyutu = parti_boyutu
+        self.zaman_asimi = zaman_asimi
+        self.cache_ttl = cache_ttl
+        self.etiket = etiket or tip
+        self._hazir = hazir
+        self._yerel = yerel
+        self.hazir_degil_mesaji = hazir_degil_mesaji
+        self.kaynak = kaynak or host
+        self.devre = DevreKesici(self.kaynak)
+        self.negatif_ttl = negatif_ttl or NEGATIF_CACHE_TTL
+        self._bulunamayanlar = FiyatCache(NEGATIF_CACHE_MAX_KAYIT, lambda: self.negatif_ttl)
+
+    @property
+    def toplu(self):
+        """Sağlayıcı birden çok kodu tek çağrıda çekebiliyor mu?"""
+        return self._fetch_many is not None
+
+    def hazir_mi(self):
+        return self._hazir() if self._hazir else True
+
+    def kullanilabilir_mi(self):
+        """Devre açıksa False; sağlayıcı hemen başarısız döner."""
+        return not self.devre.acik_mi()
+
+    def _bulunamadi_mi(self, kod):
+        return self._bulunamayanlar.al(f"{self.tip}:{kod}", self.negatif_ttl) is not None
+
+    def _cek(self, kodlar):
+        if self._fetch_many is not None and (len(kodlar) > 1 or self._fetch_one is None):
+            veriler = self._fetch_many(kodlar)
+            return {kod: veriler.get(kod) for kod in kodlar}
+        return {kod: self._fetch_one(kod) for kod in kodlar}
+
+    def fetch_many(self, kodlar):
+        """Kodları çeker; {KOD: veri veya None} döndürür."""
+        kodlar = [kod.upper() for kod in kodlar]
+        sonuc = dict.fromkeys(kodlar)
+        if not self.kullanilabilir_mi():
+            # Devre yalnızca ağ çağrılarını keser; yerelde bulunan fiyatlar yine sunulur
+            if self._yerel is not None:
+                sonuc.update((kod, self._yerel(kod)) for kod in kodlar)
+            return sonuc
+
+        cekilecekler = [kod for kod in kodlar if not self._bulunamadi_mi(kod)]
+        if not cekilecekler:
+            return sonuc
+
+        devre = self.devre
+        kapali_oncesi = devre.durum == DevreKesici.KAPALI
+        sayaclar_oncesi = (devre.toplam_hata, devre.toplam_red)
+        veriler = self._cek(cekilecekler)
+        # Boş dönen kodlar yalnızca devre çekim boyunca kapalı kaldıysa ve hiçbir
+        # istek hata vermediyse ya da reddedilmediyse gerçekten bulunamamıştır
+        hatasiz = (
+            kapali_oncesi
+            and devre.durum == DevreKesici.KAPALI
+            and (devre.toplam_hata, devre.toplam_red) == sayaclar_oncesi
+        )
+        for kod in cekilecekler:
+            sonuc[kod] = veriler.get(kod)
+            if sonuc[kod] is None and hatasiz:
+                self._bulunamayanlar.kaydet(f"{self.tip}:{kod}", True, time.time())
+        return sonuc
+
+    def fetch_one(self, kod):
+        return self.fetch_many([kod])[kod.upper()]
+
+    def istatistikler(self):
+        return {
+            'kaynak': self.kaynak,
+            'devre': self.devre.istatistikler(),
+            'bulunamayan_kod': len(self._bulunamayanlar),
+        }
+
+
+class SaglayiciKaydi:
+    """Varlık tipi -> `FiyatSaglayici` eşlemesi."""
+
+    def __init__(self):
+        self._saglayicilar = {}
+
+    def kaydet(self, saglayici):
+        self._saglayicilar[saglayici.tip] = saglayici
+        return saglayici
+
+    def al(self, tip):
+        return self._saglayicilar.get(tip)
+
+    def devre_kesici(self, host):
+        """Host'a ait sağlayıcının devre kesicisini döndürür; host kayıtlı değilse None."""
+        for saglayici in self._saglayicilar.values():
+            if saglayici.host == host:
+                return saglayici.devre
+        return None
+
+    def istatistikler(self):
+        return {tip: saglayici.istatistikler() for tip, saglayici in self._saglayicilar.items()}
+
+    def tipler(self):
+        return list(self._saglayicilar)
+
+    def __contains__(self, tip):
+        return tip in self._saglayicilar
+
+    def __iter__(self):
+        return iter(self._saglayicilar.values())
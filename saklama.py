@@ -0,0 +1,192 @@
+"""Fiyat geçmişi için saklama ve sıkıştırma politikası.
+
+- Son `FIYAT_GECMISI_TAM_GUN` gün tam çözünürlükte tutulur.
+- Daha eski günlerden varlık başına günün son kaydı (kapanış) kalır; günlük
+  açılış/en yüksek/en düşük değerleri zaten `varlik_gunluk_fiyat` özetindedir.
+- Kalan kayıtlarda aynı fiyatın ardışık tekrarları silinir, ilki kalır; her an
+  için "o ana kadarki son fiyat" değişmez.
+
+Silme varlık varlık ve en fazla `FIYAT_SAKLAMA_PARTI` satırlık kısa
+transaction'larla yapılır (tek yazıcı etkinse onun üzerinden), partiler
+arasında beklenir; WAL modunda okuyucular engellenmez. Sonunda boş sayfalar
+`incremental_vacuum` ile geri verilir.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import DateTime, bindparam, text
+
+logger = logging.getLogger(__name__)
+
+ISTANBUL = ZoneInfo('Europe/Istanbul')
+
+FIYAT_GECMISI_TAM_GUN = int(os.environ.get("FIYAT_GECMISI_TAM_GUN", "30"))
+FIYAT_SAKLAMA_PARTI = int(os.environ.get("FIYAT_SAKLAMA_PARTI", "2000"))
+FIYAT_SAKLAMA_BEKLEME = float(os.environ.get("FIYAT_SAKLAMA_BEKLEME", "0.05"))   # partiler arası (sn)
+FIYAT_SAKLAMA_SAATI = os.environ.get("FIYAT_SAKLAMA_SAATI", "03:30")
+FIYAT_SAKLAMA_VACUUM_SAYFA = int(os.environ.get("FIYAT_SAKLAMA_VACUUM_SAYFA", "1000"))
+# auto_vacuum kapalıysa bir kereye mahsus tam VACUUM ile INCREMENTAL moda geçilir
+FIYAT_SAKLAMA_TAM_VACUUM = os.environ.get("FIYAT_SAKLAMA_TAM_VACUUM", "1") == "1"
+
+# Önce eski günler günün son kaydına indirilir, ardından kalanlarda ardışık
+# aynı fiyatlar ayıklanır; ikisi aynı taramada ama bu sırayla değerlendirilir.
+_SILINECEKLER_SQL = text(
+    "WITH kayitlar AS ("
+    "  SELECT id, tarih, fiyat,"
+    "    ROW_NUMBER() OVER (PARTITION BY date(tarih) ORDER BY tarih DESC, id DESC) AS gun_sira"
+    "  FROM varlik_fiyat_gecmisi WHERE tip = :tip AND kod = :kod"
+    "), kalanlar AS ("
+    "  SELECT id, fiyat, LAG(fiyat) OVER (ORDER BY tarih, id) AS onceki_fiyat"
+    "  FROM kayitlar WHERE NOT (tarih < :sinir AND gun_sira > 1)"
+    ") "
+    "SELECT id FROM kayitlar WHERE tarih < :sinir AND gun_sira > 1 "
+    "UNION ALL "
+    "SELECT id FROM kalanlar WHERE fiyat = onceki_fiyat "
+    "LIMIT :parti"
+).bindparams(bindparam('sinir', type_=DateTime))
+
+
+class FiyatGecmisiSaklama:
+    """Saklama politikasını elle (`calistir`) veya günlük arka plan thread'iyle uygular."""
+
+    def __init__(self, app=None, db=None, yazici=None):
+        self.app = None
+        self.db = None
+        self.yazici = None
+        self._durdur = threading.Event()
+        self._thread = None
+        self._calisma_kilidi = threading.Lock()
+        self._son_sonuc = None
+        if app is not None:
+            self.init_app(app, db, yazici)
+
+    def init_app(self, app, db, yazici=None):
+        self.app = app
+        self.db = db
+        self.yazici = yazici
+        app.extensions['fiyat_saklama'] = self
+
+    def _sil(self, idler):
+        tablo = self.db.metadata.tables['varlik_fiyat_gecmisi']
+
+        def islem():
+            return self.db.session.execute(tablo.delete().where(tablo.c.id.in_(idler))).rowcount
+
+        if self.yazici is not None:
+            return self.yazici.gonder(islem)
+        sonuc = islem()
+        self.db.session.commit()
+        return sonuc
+
+    def _varligi_sikistir(self, tip, kod, sinir):
+        silinen = 0
+        while not self._durdur.is_set():
+            idler = [satir[0] for satir in self.db.session.execute(
+                _SILINECEKLER_SQL, {'tip': tip, 'kod': kod, 'sinir': sinir, 'parti': FIYAT_SAKLAMA_PARTI}
+            )]
+            # Okuma transaction'ını bırak; silme kendi kısa transaction'ında yapılır
+            self.db.session.rollback()
+            if not idler:
+                break
+            silinen += self._sil(idler)
+            time.sleep(FIYAT_SAKLAMA_BEKLEME)
+        return silinen
+
+    def _alani_geri_ver(self, silinen):
+        """Boş sayfaları dosyaya geri verir; geri verilen sayfa sayısını döndürür."""
+        engine = self.db.engine
+        if engine.dialect.name != 'sqlite':
+            return 0
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            bos_sayfa = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+            if not bos_sayfa:
+                return 0
+            if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() != 2:
+                if not (FIYAT_SAKLAMA_TAM_VACUUM and silinen):
+                    return 0
+                logger.info("auto_vacuum INCREMENTAL moda alınıyor (tek seferlik tam VACUUM)")
+                conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+                conn.exec_driver_sql("VACUUM")
+                return bos_sayfa
+            geri_verilen = 0
+            while bos_sayfa and not self._durdur.is_set():
+                conn.exec_driver_sql(f"PRAGMA incremental_vacuum({FIYAT_SAKLAMA_VACUUM_SAYFA})")
+                kalan = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+                geri_verilen += bos_sayfa - kalan
+                if kalan >= bos_sayfa:
+                    break
+                bos_sayfa = kalan
+                time.sleep(FIYAT_SAKLAMA_BEKLEME)
+            return geri_verilen
+
+    def calistir(self, simdi=None):
+        """Politikayı tüm varlıklara uygular; {'varlik', 'silinen', 'geri_verilen_sayfa', 'sure'} döndürür."""
+        if not self._calisma_kilidi.acquire(blocking=False):
+            logger.info("Fiyat geçmişi sıkıştırma zaten çalışıyor, atlandı")
+            return None
+        baslangic = time.monotonic()
+        try:
+            with self.app.app_context():
+                sinir = (simdi or datetime.now()) - timedelta(days=FIYAT_GECMISI_TAM_GUN)
+                varliklar = self.db.session.execute(
+                    text("SELECT DISTINCT tip, kod FROM varlik_fiyat_gecmisi")
+                ).all()
+                self.db.session.rollback()
+                silinen = sum(self._varligi_sikistir(tip, kod, sinir) for tip, kod in varliklar)
+                geri_verilen = self._alani_geri_ver(silinen)
+        finally:
+            self._calisma_kilidi.release()
+
+        sonuc = {
+            'varlik': len(varliklar),
+            'silinen': silinen,
+            'geri_verilen_sayfa': geri_verilen,
+            'sure': round(time.monotonic() - baslangic, 2),
+        }
+        self._son_sonuc = dict(sonuc, zaman=datetime.now(ISTANBUL))
+        logger.info(
+            f"Fiyat geçmişi sıkıştırıldı: {len(varliklar)} varlık, {silinen} kayıt silindi, "
+            f"{geri_verilen} sayfa geri verildi ({sonuc['sure']} sn)"
+        )
+        return sonuc
+
+    def _sonraki_calisma(self):
+        saat, dakika = (int(parca) for parca in FIYAT_SAKLAMA_SAATI.split(':'))
+        simdi = datetime.now(ISTANBUL)
+        hedef = simdi.replace(hour=saat, minute=dakika, second=0, microsecond=0)
+        if hedef <= simdi:
+            hedef += timedelta(days=1)
+        return hedef
+
+    def baslat(self):
+        """Her gün `FIYAT_SAKLAMA_SAATI`nde çalışan thread'i başlatır."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._durdur.clear()
+        self._thread = threading.Thread(target=self._dongu, name='fiyat-saklama', daemon=True)
+        self._thread.start()
+        logger.info(f"Fiyat geçmişi saklama görevi başlatıldı (her gün {FIYAT_SAKLAMA_SAATI})")
+
+    def durdur(self):
+        self._durdur.set()
+
+    def _dongu(self):
+        while not self._durdur.is_set():
+            bekleme = (self._sonraki_calisma() - datetime.now(ISTANBUL)).total_seconds()
+            if self._durdur.wait(max(bekleme, 0)):
+                break
+            try:
+                self.calistir()
+            except Exception as e:
+                logger.error(f"Fiyat geçmişi sıkıştırma hatası: {e}", exc_info=True)
+
+    def durum(self):
+        return {
+            'tam_cozunurluk_gun': FIYAT_GECMISI_TAM_GUN,
+            'calisiyor': self._calisma_kilidi.locked(),
+            'son_calisma': self._son_sonuc,
+        }
@@ -0,0 +1,143 @@
+"""SQLite yazmaları için isteğe bağlı tek yazıcı (single-writer) kuyruğu.
+
+Etkinken (`TEK_YAZICI=1`) yazma işlemleri tek bir thread'e kuyruklanır; bu
+thread kuyruktaki işlemleri gruplayıp tek transaction'da commit eder. Böylece
+istek thread'leri SQLite yazma kilidi için yarışmaz. Kapalıyken işlem çağıran
+thread'de çalıştırılıp hemen commit edilir (eski davranış).
+
+İşlemler argümansız çağrılardır ve yazıcının kendi app context'inde/session'ında
+çalışır; bu yüzden istek session'ındaki ORM nesneleri değil, id'ler ve düz
+değerler kullanılmalıdır.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+TEK_YAZICI = os.environ.get("TEK_YAZICI", "0") == "1"
+TEK_YAZICI_PARTI_BOYUTU = int(os.environ.get("TEK_YAZICI_PARTI_BOYUTU", "64"))
+TEK_YAZICI_ZAMAN_ASIMI = float(os.environ.get("TEK_YAZICI_ZAMAN_ASIMI", "30"))
+
+
+class TekYazici:
+    """Yazma işlemlerini tek thread'de, gruplanmış transaction'larla çalıştırır.
+
+    Bir partideki işlemlerden biri hata verirse parti geri alınır ve işlemler
+    tek tek kendi transaction'larında yeniden çalıştırılır; böylece hatalı
+    işlem diğerlerini etkilemez.
+    """
+
+    def __init__(self, app=None, db=None, etkin=None):
+        self.etkin = TEK_YAZICI if etkin is None else etkin
+        self.app = None
+        self.db = None
+        self._kuyruk = queue.Queue()
+        self._thread = None
+        self._baslatma_kilidi = threading.Lock()
+        self._sayaclar = {'islem': 0, 'parti': 0, 'hata': 0, 'tekrar_denenen_parti': 0}
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        self.app = app
+        self.db = db
+        app.extensions['tek_yazici'] = self
+        if self.etkin:
+            atexit.register(self.bosalt)
+
+    def _baslat(self):
+        with self._baslatma_kilidi:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._dongu, name='sqlite-tek-yazici', daemon=True)
+                self._thread.start()
+
+    def gonder(self, islem, bekle=True, zaman_asimi=None):
+        """`islem()`'i yazıcıda çalıştırır.
+
+        `bekle=True` ise commit edilene kadar bekleyip işlemin dönüş değerini
+        döndürür (hata varsa yükseltir) ve çağıranın session'ını expire eder;
+        böylece ardından yapılan sorgular yeni yazılanı görür. `bekle=False`
+        ise bir `Future` döndürür.
+        """
+        if not self.etkin:
+            try:
+                sonuc = islem()
+                self.db.session.commit()
+            except Exception:
+                self.db.session.rollback()
+                raise
+            if bekle:
+                return sonuc
+            future = Future()
+            future.set_result(sonuc)
+            return future
+
+        self._baslat()
+        future = Future()
+        self._kuyruk.put((islem, future))
+        if not bekle:
+            return future
+        sonuc = future.result(timeout=zaman_asimi or TEK_YAZICI_ZAMAN_ASIMI)
+        self.db.session.expire_all()
+        return sonuc
+
+    def _parti_al(self):
+        parti = [self._kuyruk.get()]
+        while len(parti) < TEK_YAZICI_PARTI_BOYUTU:
+            try:
+                parti.append(self._kuyruk.get_nowait())
+            except queue.Empty:
+                break
+        return parti
+
+    def _parti_calistir(self, parti):
+        session = self.db.session
+        sonuclar = []
+        try:
+            for islem, _ in parti:
+                sonuclar.append(islem())
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            if len(parti) == 1:
+                self._sayaclar['hata'] += 1
+                parti[0][1].set_exception(e)
+                return
+            # Hatalı işlemi ayırmak için her işlemi kendi transaction'ında yeniden dene
+            self._sayaclar['tekrar_denenen_parti'] += 1
+            for oge in parti:
+                self._parti_calistir([oge])
+            return
+        finally:
+            session.close()
+
+        for (_, future), sonuc in zip(parti, sonuclar):
+            future.set_result(sonuc)
+
+    def _dongu(self):
+        with self.app.app_context():
+            while True:
+                parti = self._parti_al()
+                try:
+                    self._parti_calistir(parti)
+                except Exception as e:
+                    logger.error(f"Tek yazıcı parti hatası: {e}", exc_info=True)
+                    for _, future in parti:
+                        if not future.done():
+                            future.set_exception(e)
+                self._sayaclar['islem'] += len(parti)
+                self._sayaclar['parti'] += 1
+                for _ in parti:
+                    self._kuyruk.task_done()
+
+    def bosalt(self):
+        """Kuyruktaki tüm yazmaların commit edilmesini bekler."""
+        if self._thread is not None and self._thread.is_alive():
+            self._kuyruk.join()
+
+    def istatistikler(self):
+        return dict(self._sayaclar, etkin=self.etkin, kuyrukta=self._kuyruk.qsize())
@@ -0,0 +1,10 @@
+"""Testler uygulamayı geçici bir veritabanıyla ve kalıcı cache olmadan yükler."""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+_test_db_dizini = tempfile.TemporaryDirectory(prefix='finans-test-')
+os.environ.setdefault("FINANS_DB_YOLU", os.path.join(_test_db_dizini.name, "finans_takip.db"))
+os.environ.setdefault("FIYAT_CACHE_KALICI", "0")
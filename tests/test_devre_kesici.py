@@ -0,0 +1,33 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+import app as uygulama
+from saglayicilar import DevreKesici
+
+
+@pytest.fixture
+def acik_fon_devresi(monkeypatch):
+    saglayici = uygulama.saglayici_kaydi.al('fon')
+    monkeypatch.setattr(saglayici, 'devre', DevreKesici('TEFAS-test'))
+    for _ in range(saglayici.devre.esik):
+        saglayici.devre.basarisiz()
+    assert not saglayici.kullanilabilir_mi()
+    return saglayici
+
+
+def test_acik_devre_cachedeki_fiyati_sunar(acik_fon_devresi):
+    veri = {'isim': 'ABC Fonu', 'guncel_fiyat': Decimal('1.25'), 'tarih': datetime.now()}
+    uygulama.cache_kaydet('fon', 'ABC', veri)
+
+    assert uygulama.fiyat_verisi_cek_by_tip_kod('fon', 'ABC') == (True, veri)
+    assert uygulama.fiyat_verisi_cek_by_tip_kod('fon', 'YOK') == (False, None)
+
+
+def test_acik_devre_toplu_indeksteki_fiyati_sunar(acik_fon_devresi, monkeypatch):
+    satir = {'isim': 'XYZ Fonu', 'guncel_fiyat': Decimal('3.5'), 'fiyat_tarihi': datetime.now()}
+    monkeypatch.setitem(uygulama._tefas_toplu_indeks, 'indeks', {'XYZ': satir})
+
+    basarili, veri = uygulama.fiyat_verisi_cek_by_tip_kod('fon', 'xyz')
+    assert basarili and veri['guncel_fiyat'] == Decimal('3.5')
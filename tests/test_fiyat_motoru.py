@@ -0,0 +1,31 @@
+import time
+
+from fiyat_motoru import toplu_fiyat_cek
+from saglayicilar import FiyatSaglayici, SaglayiciKaydi
+
+
+def _yavas_kayit(parti_boyutu):
+    def fetch_many(kodlar):
+        sonuc = {}
+        for kod in kodlar:
+            time.sleep(0.05)
+            sonuc[kod] = {'kod': kod}
+        return sonuc
+
+    kayit = SaglayiciKaydi()
+    kayit.kaydet(FiyatSaglayici('hisse', 'ornek.test', fetch_many=fetch_many,
+                                eszamanlilik=1, parti_boyutu=parti_boyutu))
+    return kayit
+
+
+def test_sure_dolunca_biten_partiler_doner():
+    istekler = [('hisse', f'S{i:02d}') for i in range(20)]
+    sonuclar = toplu_fiyat_cek(istekler, _yavas_kayit(parti_boyutu=2), sure_limiti=0.5)
+
+    assert 0 < len(sonuclar) < len(istekler)
+    assert all(basarili for basarili, _ in sonuclar.values())
+
+
+def test_bolunmeyen_parti_sure_dolunca_tumden_ertelenir():
+    istekler = [('hisse', f'S{i:02d}') for i in range(20)]
+    assert toplu_fiyat_cek(istekler, _yavas_kayit(parti_boyutu=None), sure_limiti=0.5) == {}
@@ -0,0 +1,39 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+import app as uygulama
+from models import db, User, Yatirim
+
+
+@pytest.fixture
+def yatirim_id():
+    with uygulama.app.app_context():
+        user = User(username='sirali-yazma', email='sirali@ornek', password_hash='-')
+        db.session.add(user)
+        db.session.flush()
+        yatirim = Yatirim(tip='fon', kod='ABC', alis_tarihi=datetime(2025, 1, 1),
+                          alis_fiyati=Decimal('1'), miktar=Decimal('10'), user_id=user.id)
+        db.session.add(yatirim)
+        db.session.commit()
+        yield yatirim.id
+        db.session.delete(yatirim)
+        db.session.delete(user)
+        db.session.commit()
+
+
+def _yaz(yatirim_id, fiyat, tarih):
+    sonuc = {('fon', 'ABC'): (True, {'guncel_fiyat': Decimal(fiyat), 'tarih': tarih})}
+    with uygulama.app.app_context():
+        uygulama.fiyatlari_kaydet([yatirim_id], sonuc)
+
+
+def test_eski_tarihli_fiyat_yenisinin_uzerine_yazilmaz(yatirim_id):
+    _yaz(yatirim_id, '2.00', datetime(2026, 1, 2, 14, 0))
+    _yaz(yatirim_id, '1.00', datetime(2026, 1, 2, 10, 0))
+
+    with uygulama.app.app_context():
+        yatirim = db.session.get(Yatirim, yatirim_id)
+        assert yatirim.guncel_fiyat == Decimal('2.00')
+        assert yatirim.son_guncelleme == datetime(2026, 1, 2, 14, 0)
@@ -0,0 +1,76 @@
+"""SQLite bağlantı ayarları: WAL, pragmalar, busy-timeout ve bağlantı havuzu.
+
+Pragmalar engine'in her yeni DBAPI bağlantısında uygulanır; havuz ayarları
+`SQLALCHEMY_ENGINE_OPTIONS` üzerinden verilir. Değerler ortam değişkenleriyle
+değiştirilebilir.
+"""
+import logging
+import os
+import sqlite3
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+SQLITE_JOURNAL_MODE = os.environ.get("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_KB = int(os.environ.get("SQLITE_CACHE_KB", "20000"))           # ~20 MB sayfa cache'i
+SQLITE_MMAP_BOYUTU = int(os.environ.get("SQLITE_MMAP_BOYUTU", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+# Yeni veritabanlarında geçerlidir; mevcut dosya ilk VACUUM'da bu moda geçer (bkz. saklama.py)
+SQLITE_AUTO_VACUUM = os.environ.get("SQLITE_AUTO_VACUUM", "INCREMENTAL")
+SQLITE_HAVUZ_BOYUTU = int(os.environ.get("SQLITE_HAVUZ_BOYUTU", "10"))
+SQLITE_HAVUZ_TASMA = int(os.environ.get("SQLITE_HAVUZ_TASMA", "20"))
+
+
+def sqlite_engine_secenekleri():
+    """Threaded sunucular için `SQLALCHEMY_ENGINE_OPTIONS` değerini döndürür.
+
+    Bağlantılar thread'ler arasında havuzdan paylaşıldığı için
+    `check_same_thread` kapatılır; sqlite3'ün kendi bekleme süresi de
+    busy_timeout ile aynı tutulur.
+    """
+    return {
+        'connect_args': {
+            'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000,
+            'check_same_thread': False,
+        },
+        'pool_size': SQLITE_HAVUZ_BOYUTU,
+        'max_overflow': SQLITE_HAVUZ_TASMA,
+        'pool_timeout': 30,
+    }
+
+
+def _pragmalari_uygula(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA auto_vacuum={SQLITE_AUTO_VACUUM}")
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_KB}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_BOYUTU}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA foreign_keys=ON")
+    finally:
+        cursor.close()
+
+
+def sqlite_pragmalarini_bagla(engine):
+    """Engine'in açacağı her bağlantıya pragmaları uygular; mevcut havuz bağlantıları yenilenir."""
+    if engine.dialect.name != 'sqlite':
+        return
+    if not event.contains(engine, 'connect', _pragmalari_uygula):
+        event.listen(engine, 'connect', _pragmalari_uygula)
+        engine.dispose()
+        logger.info(
+            f"SQLite ayarları etkin: journal_mode={SQLITE_JOURNAL_MODE}, synchronous={SQLITE_SYNCHRONOUS}, "
+            f"busy_timeout={SQLITE_BUSY_TIMEOUT_MS}ms"
+        )
+
+
+def init_app(app, db):
+    """Flask-SQLAlchemy engine'ine SQLite pragmalarını bağlar (db.init_app'ten sonra çağrılır)."""
+    with app.app_context():
+        sqlite_pragmalarini_bagla(db.engine)
@@ -0,0 +1,154 @@
+"""Piyasa saatlerine göre arka planda fiyat yenileyen zamanlayıcı.
+
+Her varlık tipi kendi takvimine göre yenilenir:
+- hisse: BIST seansı boyunca (hafta içi 10:00-18:10) aralıklı, kapanıştan sonra bir kez
+- fon: TEFAS fiyatları günde bir kez yayımlandığı için hafta içi günde bir kez
+- doviz: TCMB kur dosyası 15:30'da yayımlandığı için hafta içi 15:35'te
+- altin: serbest piyasa saatlerinde (Pzt-Cmt 09:00-20:00) aralıklı
+
+Resmi tatiller takvime dahil değildir; o günlerdeki yenilemeler cache'ten
+veya sağlayıcının son fiyatından karşılanır.
+"""
+import logging
+import random
+import threading
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+ISTANBUL = ZoneInfo('Europe/Istanbul')
+HAFTA_ICI = (0, 1, 2, 3, 4)
+PAZARTESI_CUMARTESI = (0, 1, 2, 3, 4, 5)
+
+
+def _sonraki_gunluk(simdi, saat, dakika, gunler):
+    """`simdi`den sonraki, `gunler` içindeki ilk saat:dakika anı."""
+    aday = simdi.replace(hour=saat, minute=dakika, second=0, microsecond=0)
+    if aday <= simdi:
+        aday += timedelta(days=1)
+    while aday.weekday() not in gunler:
+        aday += timedelta(days=1)
+    return aday
+
+
+def _sonraki_seans(simdi, acilis, kapanis, aralik, gunler):
+    """Seans içindeyse `aralik` sonrası (en geç kapanıştan 5 dk sonra), değilse sonraki açılış."""
+    if simdi.weekday() in gunler:
+        acilis_ani = simdi.replace(hour=acilis[0], minute=acilis[1], second=0, microsecond=0)
+        kapanis_ani = simdi.replace(hour=kapanis[0], minute=kapanis[1], second=0, microsecond=0)
+        if acilis_ani <= simdi < kapanis_ani:
+            return min(simdi + aralik, kapanis_ani + timedelta(minutes=5))
+    return _sonraki_gunluk(simdi, acilis[0], acilis[1], gunler)
+
+
+# Varlık tipi -> simdi'den sonraki planlı yenileme anını veren takvim
+TAKVIMLER = {
+    'hisse': lambda simdi: _sonraki_seans(simdi, (10, 0), (18, 10), timedelta(minutes=15), HAFTA_ICI),
+    'fon': lambda simdi: _sonraki_gunluk(simdi, 10, 30, HAFTA_ICI),
+    'doviz': lambda simdi: _sonraki_gunluk(simdi, 15, 35, HAFTA_ICI),
+    'altin': lambda simdi: _sonraki_seans(simdi, (9, 0), (20, 0), timedelta(minutes=15), PAZARTESI_CUMARTESI),
+}
+
+
+class FiyatZamanlayici:
+    """Tüm kullanıcıların elindeki varlıkları takvime göre yenileyen arka plan thread'i.
+
+    `gorev(tipler)` çağrısı `{tip: {'basarili': n, 'hata': m}}` döndürmelidir.
+    Hiçbir kaydı güncellenemeyen tipler üstel geri çekilme ile yeniden denenir.
+    """
+
+    JITTER = 90              # Her planlı çalışmaya eklenen en fazla rastgele gecikme (sn)
+    ILK_CALISMA = (5, 30)    # Başlangıçtaki ilk yenileme için gecikme aralığı (sn)
+    GERI_CEKILME_TABAN = 60
+    GERI_CEKILME_TAVAN = 3600
+
+    def __init__(self, app=None, gorev=None):
+        self._gorev = gorev
+        self._durdur = threading.Event()
+        self._thread = None
+        self._kilit = threading.Lock()
+        self._sonraki = {}
+        self._son_calisma = {}
+        self._hata_sayisi = {}
+        if app is not None:
+            self.init_app(app, gorev)
+
+    def init_app(self, app, gorev=None):
+        if gorev is not None:
+            self._gorev = gorev
+        app.extensions['fiyat_zamanlayici'] = self
+
+    def _simdi(self):
+        return datetime.now(ISTANBUL)
+
+    def _planla(self, tip, simdi, basarisiz=False):
+        plan = TAKVIMLER[tip](simdi)
+        if basarisiz:
+            hata = self._hata_sayisi.get(tip, 0)
+            bekleme = min(self.GERI_CEKILME_TABAN * 2 ** hata, self.GERI_CEKILME_TAVAN)
+            plan = min(plan, simdi + timedelta(seconds=bekleme))
+            self._hata_sayisi[tip] = hata + 1
+        else:
+            self._hata_sayisi[tip] = 0
+        self._sonraki[tip] = plan + timedelta(seconds=random.uniform(0, self.JITTER))
+
+    def baslat(self):
+        """Zamanlayıcı thread'ini başlatır (zaten çalışıyorsa bir şey yapmaz)."""
+        if self._thread and self._thread.is_alive():
+            return
+        simdi = self._simdi()
+        with self._kilit:
+            for tip in TAKVIMLER:
+                self._sonraki[tip] = simdi + timedelta(seconds=random.uniform(*self.ILK_CALISMA))
+        self._durdur.clear()
+        self._thread = threading.Thread(target=self._dongu, name='fiyat-zamanlayici', daemon=True)
+        self._thread.start()
+        logger.info("Fiyat zamanlayıcısı başlatıldı")
+
+    def durdur(self):
+        self._durdur.set()
+
+    def durum(self):
+        """Tip bazında sonraki/son çalışma ve ardışık hata sayısını döndürür."""
+        with self._kilit:
+            return {
+                tip: {
+                    'sonraki': self._sonraki.get(tip),
+                    'son_calisma': self._son_calisma.get(tip),
+                    'ardisik_hata': self._hata_sayisi.get(tip, 0),
+                }
+                for tip in TAKVIMLER
+            }
+
+    def _dongu(self):
+        while not self._durdur.is_set():
+            with self._kilit:
+                en_yakin = min(self._sonraki.values())
+            bekleme = (en_yakin - self._simdi()).total_seconds()
+            if bekleme > 0 and self._durdur.wait(min(bekleme, 300)):
+                break
+
+            simdi = self._simdi()
+            with self._kilit:
+                zamani_gelen = [tip for tip, zaman in self._sonraki.items() if zaman <= simdi]
+            if not zamani_gelen:
+                continue
+
+            try:
+                sonuclar = self._gorev(zamani_gelen) or {}
+            except Exception as e:
+                logger.error(f"Zamanlanmış fiyat yenileme hatası ({', '.join(zamani_gelen)}): {e}", exc_info=True)
+                sonuclar = {tip: {'basarili': 0, 'hata': 1} for tip in zamani_gelen}
+
+            simdi = self._simdi()
+            with self._kilit:
+                for tip in zamani_gelen:
+                    sayac = sonuclar.get(tip, {'basarili': 0, 'hata': 0})
+                    basarisiz = sayac['hata'] > 0 and sayac['basarili'] == 0
+                    self._son_calisma[tip] = simdi
+                    self._planla(tip, simdi, basarisiz=basarisiz)
+                    logger.info(
+                        f"Zamanlanmış {tip} yenilemesi: {sayac['basarili']} başarılı, {sayac['hata']} hatalı; "
+                        f"sonraki {self._sonraki[tip]:%d.%m %H:%M}"
+                    )